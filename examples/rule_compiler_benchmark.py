@@ -0,0 +1,126 @@
+"""
+规则编译微基准
+对比逐条件解释求值（RuleMatcher.match_rule）与编译函数（RuleCompiler）两条匹配路径的耗时
+"""
+
+import random
+import time
+import argparse
+from typing import Dict, List, Any
+
+from src.core import (
+    RuleEngine,
+    EngineRule,
+    RuleCondition,
+    RuleAction
+)
+
+
+FIELDS = [f"field_{i}" for i in range(50)]
+OPERATORS = ['eq', 'ne', 'gt', 'lt', 'gte', 'lte', 'in', 'contains', 'regex']
+
+
+def build_rule(index: int, rng: random.Random) -> EngineRule:
+    """生成随机规则"""
+    conditions = []
+    for _ in range(rng.randint(2, 8)):
+        operator = rng.choice(OPERATORS)
+        if operator == 'in':
+            value = [rng.randint(0, 10) for _ in range(4)]
+        elif operator == 'contains':
+            value = rng.choice(['ab', 'cd', 'x'])
+        elif operator == 'regex':
+            value = rng.choice([r'^a\w+', r'\d{2}', r'(ab|cd)$'])
+        else:
+            value = rng.randint(0, 10)
+        conditions.append(RuleCondition(
+            field=rng.choice(FIELDS),
+            operator=operator,
+            value=value,
+            weight=rng.choice([0.5, 1.0, 2.0])
+        ))
+
+    return EngineRule(
+        rule_id=f"bench_rule_{index}",
+        name=f"Benchmark Rule {index}",
+        description="基准测试规则",
+        conditions=conditions,
+        actions=[RuleAction(action_type='process', parameters={'processor': 'noop'})],
+        priority=rng.random(),
+        confidence=0.8,
+        created_at=time.time(),
+        updated_at=time.time()
+    )
+
+
+def build_input(rng: random.Random) -> Dict[str, Any]:
+    """生成随机输入"""
+    data = {}
+    for field_name in rng.sample(FIELDS, 30):
+        data[field_name] = rng.choice([rng.randint(0, 10), 'abcd', 'a12', 'xcd'])
+    return data
+
+
+def run_benchmark(rule_count: int, input_count: int, seed: int = 42) -> Dict[str, float]:
+    """运行基准测试，返回两条路径的耗时（秒）"""
+    rng = random.Random(seed)
+    engine = RuleEngine()
+    for index in range(rule_count):
+        engine.add_rule(build_rule(index, rng))
+
+    library = engine.rule_library
+    rules: List[EngineRule] = library.get_enabled_rules()
+    inputs = [build_input(rng) for _ in range(input_count)]
+    predicates = [library.get_compiled_predicate(rule.rule_id) for rule in rules]
+
+    # 解释求值：每个条件一次操作符字典查找和方法调用
+    start_time = time.perf_counter()
+    interpreted_matches = 0
+    for data in inputs:
+        for rule in rules:
+            if engine.matcher.match_rule(rule, data)[0]:
+                interpreted_matches += 1
+    interpreted_time = time.perf_counter() - start_time
+
+    # 编译函数：每个规则一次函数调用
+    start_time = time.perf_counter()
+    compiled_matches = 0
+    for data in inputs:
+        memo = {}
+        for predicate in predicates:
+            if predicate(data, memo)[0]:
+                compiled_matches += 1
+    compiled_time = time.perf_counter() - start_time
+
+    assert interpreted_matches == compiled_matches, "两条路径的匹配结果不一致"
+
+    return {
+        'interpreted_time': interpreted_time,
+        'compiled_time': compiled_time,
+        'matches': compiled_matches,
+        'speedup': interpreted_time / compiled_time if compiled_time > 0 else 0.0
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="规则编译微基准")
+    parser.add_argument('--rules', type=int, default=2000, help="规则数量")
+    parser.add_argument('--inputs', type=int, default=200, help="输入数量")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.rules, args.inputs)
+    evaluations = args.rules * args.inputs
+
+    print("规则编译微基准")
+    print("=" * 50)
+    print(f"规则数量: {args.rules}, 输入数量: {args.inputs}, 匹配次数: {result['matches']}")
+    print(f"解释求值: {result['interpreted_time']:.3f}秒 "
+          f"({result['interpreted_time'] / evaluations * 1e6:.2f}微秒/规则)")
+    print(f"编译函数: {result['compiled_time']:.3f}秒 "
+          f"({result['compiled_time'] / evaluations * 1e6:.2f}微秒/规则)")
+    print(f"加速比: {result['speedup']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,17 @@ from fastapi import FastAPI, HTTPException, Depends, Query, Body
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from typing import Dict, List, Any, Optional
+import os
 import logging
 import time
+import threading
+from dataclasses import replace
 from datetime import datetime
 
 from ..core.rule_engine import RuleEngine, EngineRule, RuleCondition, RuleAction
 from ..core.rule_priority_manager import RulePriorityManager
 from ..core.rule_cache_manager import RuleCacheManager
+from ..core.shared_cache import SharedMemoryCache
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +31,62 @@ app = FastAPI(
 # 全局实例
 rule_engine = RuleEngine()
 priority_manager = RulePriorityManager()
-cache_manager = RuleCacheManager()
+# 结果缓存：GDSF 分片缓存，可选磁盘二级缓存（WHOTOMAENS_RULE_CACHE_DIR）和跨进程共享缓存（WHOTOMAENS_SHARED_CACHE）
+cache_dir = os.environ.get("WHOTOMAENS_RULE_CACHE_DIR")
+shared_cache_name = os.environ.get("WHOTOMAENS_SHARED_CACHE")
+cache_manager = RuleCacheManager(result_cache_policy='gdsf', num_shards=16, buffered_reads=True,
+                                 l2_dir=cache_dir,
+                                 access_log_path=os.path.join(cache_dir, "access_log.json") if cache_dir else None)
+# 设置 WHOTOMAENS_RULES_FILE（JSON 规则文件）时启动时导入规则
+rules_file = os.environ.get("WHOTOMAENS_RULES_FILE")
+result_cache_activated = False
+activation_lock = threading.Lock()
+
+
+def activate_result_cache():
+    """规则加载完成后启用结果缓存并开始预热（只执行一次）
+    
+    启用时以当前规则库哈希为准丢弃磁盘二级缓存中的旧条目，
+    若在规则库为空时启用，上次运行持久化的条目会全部被丢弃，预热也找不到规则。
+    """
+    global result_cache_activated
+    with activation_lock:
+        if result_cache_activated:
+            return
+        # 规则执行结果走读穿透缓存，规则变更时由规则库监听器自动失效
+        rule_engine.enable_result_cache(cache_manager)
+        # 限速预热，不与线上请求争抢
+        cache_manager.start_warmup(rule_engine.rule_library.get_rule)
+        result_cache_activated = True
+        logger.info(f"结果缓存已启用，规则数量: {len(rule_engine.rule_library.rules)}")
+
+
+@app.on_event("startup")
+def load_rules_and_activate_cache():
+    """启动时挂载共享缓存、启动过期清理线程、导入规则文件并启用结果缓存；
+    没有规则文件但配置了磁盘缓存时，等到首次导入规则后再启用结果缓存"""
+    if shared_cache_name and cache_manager.shared_cache is None:
+        cache_manager.shared_cache = SharedMemoryCache(shared_cache_name)
+    cache_manager.start_expiry_sweeper()
+    
+    if rules_file:
+        try:
+            with open(rules_file, 'r', encoding='utf-8') as f:
+                imported_count = rule_engine.import_rules(f.read(), "json")
+            logger.info(f"启动时导入规则 {imported_count} 个: {rules_file}")
+        except Exception as e:
+            logger.error(f"启动时导入规则失败: {e}")
+    
+    if rules_file or not cache_dir:
+        activate_result_cache()
+    else:
+        logger.info("等待首次导入规则后启用结果缓存")
+
+
+@app.on_event("shutdown")
+def close_cache_manager():
+    """关闭时停止清理线程，保存访问日志，并把缓存条目写入磁盘二级缓存"""
+    cache_manager.close()
 
 
 # Pydantic模型
@@ -293,13 +352,14 @@ async def update_rule(rule_id: str, rule_data: RuleUpdateModel):
         if not existing_rule:
             raise HTTPException(status_code=404, detail="规则不存在")
         
-        # 更新字段
+        # 在副本上更新字段，校验失败时规则库中的规则保持不变
+        changes: Dict[str, Any] = {}
         if rule_data.name is not None:
-            existing_rule.name = rule_data.name
+            changes['name'] = rule_data.name
         if rule_data.description is not None:
-            existing_rule.description = rule_data.description
+            changes['description'] = rule_data.description
         if rule_data.conditions is not None:
-            existing_rule.conditions = [
+            changes['conditions'] = [
                 RuleCondition(
                     field=c.field,
                     operator=c.operator,
@@ -308,7 +368,7 @@ async def update_rule(rule_id: str, rule_data: RuleUpdateModel):
                 ) for c in rule_data.conditions
             ]
         if rule_data.actions is not None:
-            existing_rule.actions = [
+            changes['actions'] = [
                 RuleAction(
                     action_type=a.action_type,
                     parameters=a.parameters,
@@ -316,23 +376,23 @@ async def update_rule(rule_id: str, rule_data: RuleUpdateModel):
                 ) for a in rule_data.actions
             ]
         if rule_data.priority is not None:
-            existing_rule.priority = rule_data.priority
+            changes['priority'] = rule_data.priority
         if rule_data.confidence is not None:
-            existing_rule.confidence = rule_data.confidence
+            changes['confidence'] = rule_data.confidence
         if rule_data.tags is not None:
-            existing_rule.tags = rule_data.tags
+            changes['tags'] = rule_data.tags
         if rule_data.enabled is not None:
-            existing_rule.enabled = rule_data.enabled
+            changes['enabled'] = rule_data.enabled
         
-        existing_rule.updated_at = time.time()
+        updated_rule = replace(existing_rule, updated_at=time.time(), **changes)
         
         # 更新规则
-        success = rule_engine.update_rule(existing_rule)
+        success = rule_engine.update_rule(updated_rule)
         
         if success:
             # 更新缓存
             cache_manager.invalidate_rule(rule_id)
-            cache_manager.cache_rule(existing_rule)
+            cache_manager.cache_rule(updated_rule)
             
             return {
                 "success": True,
@@ -379,7 +439,7 @@ async def execute_rules(request: ExecutionRequestModel):
     try:
         start_time = time.time()
         
-        # 执行规则
+        # 执行规则（先查结果缓存，未命中时匹配执行并写入缓存）
         results = rule_engine.execute_rules(
             data=request.data,
             context=request.context,
@@ -400,9 +460,6 @@ async def execute_rules(request: ExecutionRequestModel):
                     output_size=len(str(result.output))
                 )
         
-        # 缓存结果
-        cache_manager.cache_result(request.data, results)
-        
         # 转换结果格式
         result_list = []
         for result in results:
@@ -558,6 +615,11 @@ async def trigger_optimization(request: OptimizationRequestModel):
             cache_manager.optimize_caches(request.target_memory_mb)
             optimization_results["cache_optimization"] = "completed"
         
+        # TTL优化：按条目平均访问间隔调整TTL，由后台时间轮到期清理
+        if request.optimize_ttl:
+            adjusted = cache_manager.optimize_ttl()
+            optimization_results["ttl_optimization"] = f"adjusted {adjusted} entries"
+        
         # 规则优先级优化
         enabled_rules = rule_engine.rule_library.get_enabled_rules()
         optimized_rules = priority_manager.optimize_rule_order(enabled_rules)
@@ -596,6 +658,8 @@ async def import_rules(rules_data: str = Body(..., media_type="application/json"
     """导入规则"""
     try:
         imported_count = rule_engine.import_rules(rules_data, "json")
+        # 首次批量导入后规则库才完整，此时启用结果缓存（已启用时无操作）
+        activate_result_cache()
         
         return {
             "success": True,
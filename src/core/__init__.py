@@ -29,21 +29,34 @@ from .adaptive_optimizer import (
 from .rule_engine import (
     RuleCondition,
     RuleAction,
+    FrozenParameters,
     EngineRule,
     RuleMatch,
     ExecutionResult,
+    HistoryRecord,
+    ExecutionHistory,
+    ConditionStatistics,
+    LazyMatchedConditions,
     RuleMatcher,
     RuleExecutor,
+    ConditionNode,
+    RuleNetwork,
+    RuleCompiler,
     RuleLibrary,
     RuleEngine
 )
 
+# 并行规则匹配模块
+from .parallel_rule_matcher import ParallelRuleMatcher
+
 # 规则优先级管理模块
 from .rule_priority_manager import (
     PriorityFactors,
     PriorityWeights,
     RuleUsageRecord,
     ContextProfile,
+    UsageAggregateTable,
+    UsageRecordStore,
     UsageTracker,
     ComplexityAnalyzer,
     ContextRelevanceAnalyzer,
@@ -55,14 +68,36 @@ from .rule_priority_manager import (
 from .rule_cache_manager import (
     CacheEntry,
     CacheStats,
+    PickleSizer,
+    RecursiveSizer,
+    SampledSizer,
+    EvictionPolicy,
+    LRUPolicy,
+    LFUPolicy,
+    ARCPolicy,
+    CountMinSketch,
+    WTinyLFUPolicy,
+    GDSFPolicy,
+    create_eviction_policy,
+    TimingWheel,
+    ExpirySweeper,
     LRUCache,
+    ShardedLRUCache,
     RuleCache,
     ResultCache,
+    AccessLog,
     CachePreloader,
     CacheOptimizer,
-    RuleCacheManager
+    RuleCacheManager,
+    compute_fingerprint
 )
 
+# 磁盘二级缓存模块
+from .disk_cache import DiskCache
+
+# 跨进程共享缓存模块
+from .shared_cache import SharedMemoryCache
+
 # 其他核心模块
 from .content_analyzer import ContentAnalyzer
 from .feature_extractor import FeatureExtractor
@@ -92,19 +127,30 @@ __all__ = [
     # 规则引擎
     'RuleCondition',
     'RuleAction',
+    'FrozenParameters',
     'EngineRule',
     'RuleMatch',
     'ExecutionResult',
+    'HistoryRecord',
+    'ExecutionHistory',
+    'ConditionStatistics',
+    'LazyMatchedConditions',
     'RuleMatcher',
     'RuleExecutor',
+    'ConditionNode',
+    'RuleNetwork',
+    'RuleCompiler',
     'RuleLibrary',
     'RuleEngine',
+    'ParallelRuleMatcher',
     
     # 规则优先级管理
     'PriorityFactors',
     'PriorityWeights',
     'RuleUsageRecord',
     'ContextProfile',
+    'UsageAggregateTable',
+    'UsageRecordStore',
     'UsageTracker',
     'ComplexityAnalyzer',
     'ContextRelevanceAnalyzer',
@@ -114,12 +160,30 @@ __all__ = [
     # 规则缓存管理
     'CacheEntry',
     'CacheStats',
+    'PickleSizer',
+    'RecursiveSizer',
+    'SampledSizer',
+    'EvictionPolicy',
+    'LRUPolicy',
+    'LFUPolicy',
+    'ARCPolicy',
+    'CountMinSketch',
+    'WTinyLFUPolicy',
+    'GDSFPolicy',
+    'create_eviction_policy',
+    'TimingWheel',
+    'ExpirySweeper',
     'LRUCache',
+    'ShardedLRUCache',
     'RuleCache',
     'ResultCache',
+    'AccessLog',
     'CachePreloader',
     'CacheOptimizer',
     'RuleCacheManager',
+    'compute_fingerprint',
+    'DiskCache',
+    'SharedMemoryCache',
     
     # 其他核心模块
     'ContentAnalyzer',
@@ -0,0 +1,514 @@
+"""
+磁盘二级缓存模块
+以追加写日志保存缓存条目，内存中只保留键索引，读取通过内存映射完成；
+支持崩溃后截断损坏尾部、原子替换式压缩，以及按版本（规则库哈希）丢弃过期条目；
+多个进程可共享同一日志文件，操作期间持有 fcntl 文件锁
+"""
+
+import os
+import mmap
+import time
+import zlib
+import struct
+import pickle
+from typing import Dict, List, Any, Optional, Tuple
+from collections import defaultdict
+from threading import Lock
+import logging
+
+try:
+    import fcntl
+except ImportError:  # 非 POSIX 平台无法跨进程加锁，各进程使用独立的日志文件
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'RCL2\x01'  # 文件标识与格式版本
+# 记录头：crc32, 键长度, 版本长度, 负载长度, 标志；crc32 覆盖记录头其余部分和记录体
+_RECORD_HEADER = struct.Struct('<IIHIB')
+_FLAG_PUT = 0
+_FLAG_DELETE = 1
+
+
+class DiskCache:
+    """追加写日志结构的磁盘缓存
+    
+    记录格式为 [记录头][键][版本][负载]，负载为 pickle 后的 (value, tags, expire_at, cost)。
+    打开时顺序扫描日志重建索引，遇到校验失败或不完整的记录即视为崩溃时的残缺写入并截断；
+    失效字节超过 compaction_ratio 时把存活记录写入临时文件、fsync 后 os.replace 原子替换；
+    auto_compact 为 False 时写入不触发压缩，由调用方在后台调用 compact_if_needed。
+    索引同时记录各条目的标签，按标签失效与一级缓存（LRUCache）的语义一致。
+    
+    同一路径可由多个进程（如多个 uvicorn 工作进程）同时打开：每个操作都持有 path + '.lock'
+    上的排他文件锁，并先与文件同步——文件被其他进程压缩替换（文件标识变化）时重建索引，
+    被其他进程追加时只扫描新增的尾部记录。读取时校验记录中的键与请求的键一致。
+    """
+    
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024,
+                 compaction_ratio: float = 0.5, min_compaction_bytes: int = 1024 * 1024,
+                 auto_compact: bool = True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compaction_ratio = compaction_ratio
+        self.min_compaction_bytes = min_compaction_bytes
+        self.auto_compact = auto_compact
+        # key -> (记录偏移, 记录长度, 版本, 标签)，按写入顺序排列
+        self.index: Dict[str, Tuple[int, int, str, Tuple[str, ...]]] = {}
+        self.tag_index: Dict[str, set] = defaultdict(set)  # 标签反向索引，用于按标签失效
+        self.live_bytes = 0
+        self.file_size = 0
+        self.hit_count = 0
+        self.miss_count = 0
+        self.lock = Lock()
+        self._writer = None
+        self._map: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+        self._file_id: Optional[Tuple[int, int]] = None  # 当前打开的日志文件的 (设备号, inode)
+        self._lock_file = None
+        if fcntl is None:
+            self.path = f"{path}.{os.getpid()}"
+            logger.warning(f"fcntl不可用，磁盘缓存使用进程独立的文件: {self.path}")
+        self._open()
+    
+    def get(self, key: str, version: Optional[str] = None) -> Optional[Tuple[Any, List[str], Optional[float], float]]:
+        """读取条目，返回 (value, tags, expire_at, cost)；版本不一致或已过期时返回 None"""
+        with self._locked():
+            location = self.index.get(key)
+            if location is None or (version is not None and location[2] != version):
+                self.miss_count += 1
+                return None
+            
+            record = self._read_record(location[0], location[1])
+            parsed = self._parse_record(record) if record is not None else None
+            if parsed is None or parsed[0] != key or parsed[2] != _FLAG_PUT:
+                logger.warning(f"磁盘缓存记录损坏或与索引不一致，已丢弃: {key}")
+                self._drop(key)
+                self.miss_count += 1
+                return None
+            
+            try:
+                payload = pickle.loads(parsed[3])
+                value, tags, expire_at = payload[:3]
+                cost = payload[3] if len(payload) > 3 else 0.0
+            except Exception as e:
+                logger.warning(f"磁盘缓存记录反序列化失败: {e}")
+                self._drop(key)
+                self.miss_count += 1
+                return None
+            
+            if expire_at is not None and expire_at <= time.time():
+                self._drop(key)
+                self.miss_count += 1
+                return None
+            
+            self.hit_count += 1
+            return value, tags, expire_at, cost
+    
+    def put(self, key: str, value: Any, version: str = '', tags: Optional[List[str]] = None,
+            expire_at: Optional[float] = None, cost: float = 0.0) -> bool:
+        """写入条目（追加一条记录），cost 为计算该值耗费的时间（秒）"""
+        try:
+            payload = pickle.dumps((value, list(tags or []), expire_at, cost), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.warning(f"磁盘缓存序列化失败: {e}")
+            return False
+        
+        with self._locked():
+            self._unindex(key)
+            offset, length = self._append(key, version, payload, _FLAG_PUT)
+            self._index(key, (offset, length, version, tuple(tags or ())))
+            
+            # 超出容量时按写入顺序丢弃最早的条目
+            while self.live_bytes > self.max_bytes and len(self.index) > 1:
+                self._drop(next(iter(self.index)))
+            
+            self._maybe_compact()
+            return True
+    
+    def delete(self, key: str) -> bool:
+        """删除条目（追加一条删除记录）"""
+        with self._locked():
+            if key not in self.index:
+                return False
+            self._drop(key)
+            self._maybe_compact()
+            return True
+    
+    def discard_stale(self, version: str) -> int:
+        """丢弃版本与 version 不一致的条目，返回丢弃数量"""
+        with self._locked():
+            stale = [key for key, location in self.index.items() if location[2] != version]
+            for key in stale:
+                self._unindex(key)
+            if stale:
+                # 直接压缩，不为每个过期键追加删除记录
+                self._compact()
+            return len(stale)
+    
+    def remove_by_tags(self, tags: List[str]) -> int:
+        """删除带有任一指定标签的条目，返回删除数量"""
+        with self._locked():
+            keys = set()
+            for tag in tags:
+                tagged_keys = self.tag_index.get(tag)
+                if tagged_keys:
+                    keys.update(tagged_keys)
+            for key in keys:
+                self._drop(key)
+            if keys:
+                self._maybe_compact()
+            return len(keys)
+    
+    def remove_by_tag_weights(self, tag_weights: Dict[str, float], min_weight: float) -> int:
+        """删除所带标签权重之和不低于 min_weight 的条目，返回删除数量"""
+        with self._locked():
+            accumulated: Dict[str, float] = {}
+            for tag, weight in tag_weights.items():
+                tagged_keys = self.tag_index.get(tag)
+                if tagged_keys:
+                    for key in tagged_keys:
+                        accumulated[key] = accumulated.get(key, 0.0) + weight
+            keys = [key for key, total in accumulated.items() if total >= min_weight]
+            for key in keys:
+                self._drop(key)
+            if keys:
+                self._maybe_compact()
+            return len(keys)
+    
+    def compact_if_needed(self) -> bool:
+        """失效字节超过比例时压缩日志，返回是否压缩"""
+        with self._locked():
+            return self._compact_if_needed()
+    
+    def compact(self, version: Optional[str] = None):
+        """压缩日志，只保留存活记录；指定 version 时把存活记录的版本改写为 version"""
+        with self._locked():
+            self._compact(version)
+    
+    def clear(self):
+        """清空磁盘缓存"""
+        with self._locked():
+            if not self.index and self.file_size <= len(_MAGIC):
+                return
+            self.index.clear()
+            self.tag_index.clear()
+            self.live_bytes = 0
+            self._compact()
+    
+    def close(self):
+        """关闭文件"""
+        with self.lock:
+            self._close_files()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+    
+    def __len__(self) -> int:
+        return len(self.index)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._locked():
+            total = self.hit_count + self.miss_count
+            return {
+                'path': self.path,
+                'entries': len(self.index),
+                'live_bytes': self.live_bytes,
+                'file_bytes': self.file_size,
+                'hit_count': self.hit_count,
+                'miss_count': self.miss_count,
+                'hit_rate': self.hit_count / total if total > 0 else 0.0
+            }
+    
+    def _open(self):
+        """打开日志并重建索引，截断残缺的尾部记录"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        if fcntl is not None:
+            self._lock_file = open(self.path + '.lock', 'a+b')
+        
+        with self._locked(sync=False):
+            # 上次压缩中断留下的临时文件（持有文件锁时不会有其他进程正在压缩）
+            if os.path.exists(self.path + '.tmp'):
+                os.remove(self.path + '.tmp')
+            self._reload()
+        logger.info(f"磁盘缓存已加载: {self.path}，{len(self.index)} 个条目")
+    
+    def _locked(self, sync: bool = True) -> '_LogLock':
+        """线程锁 + 文件锁，进入后先与日志文件同步"""
+        return _LogLock(self, sync)
+    
+    def _sync(self):
+        """与其他进程对日志文件的修改同步（需持有锁）"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._reload()
+            return
+        if (stat.st_dev, stat.st_ino) != self._file_id or stat.st_size < self.file_size:
+            # 文件被压缩替换或截断，偏移全部失效
+            self._reload()
+        elif stat.st_size > self.file_size:
+            self._apply_log(self.file_size)
+    
+    def _reload(self):
+        """从头扫描日志重建索引（需持有锁）"""
+        self._close_files()
+        self.index.clear()
+        self.tag_index.clear()
+        self.live_bytes = 0
+        
+        fresh = not os.path.exists(self.path) or os.path.getsize(self.path) < len(_MAGIC)
+        if not fresh:
+            with open(self.path, 'rb') as f:
+                if f.read(len(_MAGIC)) != _MAGIC:
+                    logger.warning(f"磁盘缓存文件格式不匹配，重新创建: {self.path}")
+                    fresh = True
+        if fresh:
+            with open(self.path, 'wb') as f:
+                f.write(_MAGIC)
+                f.flush()
+                os.fsync(f.fileno())
+        
+        self.file_size = len(_MAGIC)
+        self._apply_log(len(_MAGIC))
+        self._writer = open(self.path, 'ab')
+        stat = os.fstat(self._writer.fileno())
+        self._file_id = (stat.st_dev, stat.st_ino)
+        self._remap()
+    
+    def _apply_log(self, start: int):
+        """把 start 之后的记录应用到索引（需持有锁），截断残缺的尾部"""
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            valid_size = self._load_index(f, start, size)
+        
+        if valid_size < size:
+            logger.warning(f"磁盘缓存尾部记录不完整，截断到 {valid_size} 字节")
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_size)
+        self.file_size = valid_size
+    
+    def _load_index(self, f, start: int, size: int) -> int:
+        """从 start 起顺序扫描记录更新索引，返回最后一条完整记录的结束位置"""
+        if size <= start:
+            return start
+        
+        now = time.time()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = start
+            while position + _RECORD_HEADER.size <= size:
+                _, key_length, version_length, payload_length, _ = _RECORD_HEADER.unpack_from(data, position)
+                length = _RECORD_HEADER.size + key_length + version_length + payload_length
+                if position + length > size:
+                    break
+                parsed = self._parse_record(data[position:position + length])
+                if parsed is None:
+                    break
+                
+                key, version, flags, payload = parsed
+                self._unindex(key)
+                if flags == _FLAG_PUT:
+                    try:
+                        _, tags, expire_at = pickle.loads(payload)[:3]
+                    except Exception:
+                        expire_at = now
+                    if expire_at is None or expire_at > now:
+                        self._index(key, (position, length, version, tuple(tags)))
+                position += length
+        return position
+    
+    @staticmethod
+    def _encode_record(key: str, version: str, payload: bytes, flags: int) -> bytes:
+        key_bytes = key.encode('utf-8', 'surrogatepass')
+        version_bytes = version.encode('utf-8')
+        body = key_bytes + version_bytes + payload
+        header_rest = _RECORD_HEADER.pack(0, len(key_bytes), len(version_bytes), len(payload), flags)[4:]
+        crc = zlib.crc32(body, zlib.crc32(header_rest))
+        return struct.pack('<I', crc) + header_rest + body
+    
+    @staticmethod
+    def _parse_record(record: bytes) -> Optional[Tuple[str, str, int, bytes]]:
+        """校验并解析记录，返回 (key, version, flags, payload)，损坏时返回 None"""
+        if len(record) < _RECORD_HEADER.size:
+            return None
+        crc, key_length, version_length, payload_length, flags = _RECORD_HEADER.unpack_from(record, 0)
+        if _RECORD_HEADER.size + key_length + version_length + payload_length != len(record):
+            return None
+        view = memoryview(record)
+        if zlib.crc32(view[_RECORD_HEADER.size:], zlib.crc32(view[4:_RECORD_HEADER.size])) != crc:
+            return None
+        start = _RECORD_HEADER.size
+        key = bytes(view[start:start + key_length]).decode('utf-8', 'surrogatepass')
+        start += key_length
+        version = bytes(view[start:start + version_length]).decode('utf-8')
+        start += version_length
+        return key, version, flags, bytes(view[start:])
+    
+    def _append(self, key: str, version: str, payload: bytes, flags: int) -> Tuple[int, int]:
+        """追加记录（需持有锁），返回 (偏移, 长度)"""
+        record = self._encode_record(key, version, payload, flags)
+        offset = self.file_size
+        self._writer.write(record)
+        self._writer.flush()
+        self.file_size += len(record)
+        return offset, len(record)
+    
+    def _index(self, key: str, location: Tuple[int, int, str, Tuple[str, ...]]):
+        """登记存活记录（需持有锁）"""
+        self.index[key] = location
+        self.live_bytes += location[1]
+        tag_index = self.tag_index
+        for tag in location[3]:
+            tag_index[tag].add(key)
+    
+    def _unindex(self, key: str) -> bool:
+        """从索引移除条目（需持有锁），不写删除记录"""
+        location = self.index.pop(key, None)
+        if location is None:
+            return False
+        self.live_bytes -= location[1]
+        tag_index = self.tag_index
+        for tag in location[3]:
+            tagged_keys = tag_index.get(tag)
+            if tagged_keys is not None:
+                tagged_keys.discard(key)
+                if not tagged_keys:
+                    del tag_index[tag]
+        return True
+    
+    def _drop(self, key: str):
+        """从索引移除并追加删除记录（需持有锁）"""
+        if self._unindex(key):
+            self._append(key, '', b'', _FLAG_DELETE)
+    
+    def _read_record(self, offset: int, length: int) -> Optional[bytes]:
+        """通过内存映射读取记录（需持有锁），映射不足时重新映射"""
+        if offset + length > self._mapped_size:
+            self._remap()
+            if offset + length > self._mapped_size:
+                return None
+        return self._map[offset:offset + length]
+    
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._mapped_size = 0
+        if self._writer is not None:
+            self._writer.flush()
+        size = os.path.getsize(self.path)
+        if size > 0:
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped_size = size
+    
+    def _maybe_compact(self):
+        if self.auto_compact:
+            self._compact_if_needed()
+    
+    def _compact_if_needed(self) -> bool:
+        dead_bytes = self.file_size - len(_MAGIC) - self.live_bytes
+        if dead_bytes > self.min_compaction_bytes and dead_bytes > self.compaction_ratio * self.file_size:
+            self._compact()
+            return True
+        return False
+    
+    def _compact(self, new_version: Optional[str] = None):
+        """把存活记录写入临时文件后原子替换原文件（需持有锁）"""
+        temp_path = self.path + '.tmp'
+        new_index: Dict[str, Tuple[int, int, str, Tuple[str, ...]]] = {}
+        position = len(_MAGIC)
+        
+        self._remap()
+        with open(temp_path, 'wb') as f:
+            f.write(_MAGIC)
+            for key, (offset, length, version, tags) in self.index.items():
+                record = self._read_record(offset, length)
+                parsed = self._parse_record(record) if record is not None else None
+                if parsed is None or parsed[0] != key:
+                    continue
+                if new_version is not None and new_version != version:
+                    version = new_version
+                    record = self._encode_record(key, version, parsed[3], _FLAG_PUT)
+                    length = len(record)
+                f.write(record)
+                new_index[key] = (position, length, version, tags)
+                position += length
+            f.flush()
+            os.fsync(f.fileno())
+        
+        self._close_files()
+        os.replace(temp_path, self.path)
+        self._fsync_directory()
+        
+        self.index = new_index
+        self.tag_index = defaultdict(set)
+        for key, location in new_index.items():
+            for tag in location[3]:
+                self.tag_index[tag].add(key)
+        self.live_bytes = position - len(_MAGIC)
+        self.file_size = position
+        self._writer = open(self.path, 'ab')
+        stat = os.fstat(self._writer.fileno())
+        self._file_id = (stat.st_dev, stat.st_ino)
+        self._remap()
+    
+    def _fsync_directory(self):
+        """持久化目录项，保证替换后的文件名在崩溃后可见"""
+        try:
+            directory_fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(directory_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(directory_fd)
+    
+    def _close_files(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._mapped_size = 0
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class _LogLock:
+    """磁盘缓存的操作锁：进程内线程锁加上锁文件的 fcntl 排他锁，进入后与日志文件同步"""
+    
+    __slots__ = ('cache', 'sync')
+    
+    def __init__(self, cache: DiskCache, sync: bool):
+        self.cache = cache
+        self.sync = sync
+    
+    def __enter__(self):
+        cache = self.cache
+        cache.lock.acquire()
+        try:
+            if cache._lock_file is not None:
+                fcntl.flock(cache._lock_file, fcntl.LOCK_EX)
+            if self.sync:
+                cache._sync()
+        except BaseException:
+            self._release()
+            raise
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._release()
+    
+    def _release(self):
+        cache = self.cache
+        try:
+            if cache._lock_file is not None:
+                fcntl.flock(cache._lock_file, fcntl.LOCK_UN)
+        finally:
+            cache.lock.release()
@@ -0,0 +1,217 @@
+"""
+并行规则匹配模块
+将规则库按分区常驻在工作进程中，请求时并发匹配各分区并按优先级确定性地合并结果
+"""
+
+import zlib
+import multiprocessing
+from typing import Dict, List, Any, Optional, Tuple
+import logging
+from threading import Lock
+
+from .rule_engine import EngineRule, RuleCondition, RuleLibrary, LazyMatchedConditions
+
+logger = logging.getLogger(__name__)
+
+
+def _full_match_score(match_score: float, matched_conditions: List[RuleCondition]) -> float:
+    """短路匹配的得分为下界，由惰性条件列表补齐为完整得分"""
+    if isinstance(matched_conditions, LazyMatchedConditions):
+        return matched_conditions.match_score
+    return match_score
+
+
+def _partition_worker(connection, short_circuit: bool):
+    """分区工作进程：维护本分区的规则库副本，按顺序处理增量和匹配请求
+    
+    增量处理失败后副本已与主进程的规则库不一致，之后的匹配请求都回复错误。
+    """
+    library = RuleLibrary()
+    error: Optional[str] = None
+    
+    while True:
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):
+            break
+        
+        if message is None:
+            break
+        
+        command = message[0]
+        try:
+            if command == 'add':
+                library.add_rule(message[1])
+            elif command == 'update':
+                library.update_rule(message[1])
+            elif command == 'remove':
+                library.remove_rule(message[1])
+            elif command == 'match':
+                if error is not None:
+                    connection.send(('error', error))
+                    continue
+                _, data, max_rules = message
+                matches = library.find_matches(data, max_rules, short_circuit)
+                # 惰性条件列表无法跨进程传递，在工作进程中补齐条件和完整得分
+                connection.send(('ok', [
+                    (rule.rule_id, _full_match_score(match_score, matched_conditions), list(matched_conditions))
+                    for rule, match_score, matched_conditions in matches
+                ]))
+        except Exception as e:
+            logger.error(f"分区工作进程处理失败: {e}")
+            if command == 'match':
+                connection.send(('error', str(e)))
+            elif error is None:
+                error = f"规则增量 {command} 处理失败: {e}"
+    
+    connection.close()
+
+
+class ParallelRuleMatcher:
+    """并行规则匹配器
+    
+    规则按 rule_id 的稳定哈希分配到各分区，每个分区由一个常驻工作进程持有规则库副本。
+    规则的添加、更新、删除通过规则库监听器以增量方式发送到所属分区，请求时只需传输输入数据。
+    各分区返回本分区内按优先级排序的前 max_rules 个匹配，主进程按规则库的优先级视图合并，
+    结果与串行匹配一致。
+    
+    所有请求共用一组管道，由一把锁串行化，并发请求之间没有额外的加速；并行只发生在单个请求内部。
+    任一分区通信失败、在 timeout 秒内没有响应或回复错误（如增量处理失败）时，工作进程池被终止
+    （未读取的响应随之丢弃），匹配器永久停用，之后的请求回退到串行匹配。
+    """
+    
+    def __init__(self, library: RuleLibrary, num_partitions: int = 4, short_circuit: bool = False,
+                 start_method: Optional[str] = None, timeout: float = 5.0):
+        if num_partitions < 1:
+            raise ValueError("分区数量必须大于0")
+        
+        self.library = library
+        self.num_partitions = num_partitions
+        self.short_circuit = short_circuit
+        self.timeout = timeout
+        self.failed = False  # 工作进程池已因故障终止
+        self.connections = []
+        self.processes = []
+        self.lock = Lock()  # 保证管道上的增量消息与请求/响应不交错
+        
+        context = multiprocessing.get_context(start_method)
+        for _ in range(num_partitions):
+            parent_connection, child_connection = context.Pipe()
+            process = context.Process(
+                target=_partition_worker,
+                args=(child_connection, short_circuit),
+                daemon=True
+            )
+            process.start()
+            child_connection.close()
+            self.connections.append(parent_connection)
+            self.processes.append(process)
+        
+        # 按添加顺序分发现有规则，各分区内同优先级规则的先后顺序与规则库一致
+        library.add_listener(self._on_rule_change, replay=True)
+        logger.info(f"并行匹配已启用，分区数量: {num_partitions}")
+    
+    def partition_of(self, rule_id: str) -> int:
+        """规则所属分区（跨进程稳定）"""
+        return zlib.crc32(rule_id.encode('utf-8')) % self.num_partitions
+    
+    def _on_rule_change(self, event: str, rule_id: str):
+        """将规则变更以增量方式发送到所属分区（在持有规则库锁时调用）"""
+        if event == 'remove':
+            payload: Any = rule_id
+        else:
+            payload = self.library.rules.get(rule_id)
+            if payload is None:
+                return
+        
+        with self.lock:
+            if self.failed or not self.connections:
+                return
+            try:
+                self.connections[self.partition_of(rule_id)].send((event, payload))
+            except (OSError, ValueError) as e:
+                # 分区副本已与规则库不一致，不能继续使用
+                logger.error(f"规则增量发送失败，停用并行匹配: {e}")
+                self._terminate_pool()
+    
+    def match(self, data: Dict[str, Any], max_rules: int) -> List[Tuple[EngineRule, float, List[RuleCondition]]]:
+        """并发匹配所有分区，返回按优先级排序的前 max_rules 个匹配"""
+        replies = None
+        with self.lock:
+            if not self.failed and self.connections:
+                try:
+                    for connection in self.connections:
+                        connection.send(('match', data, max_rules))
+                    replies = []
+                    for partition, connection in enumerate(self.connections):
+                        if not connection.poll(self.timeout):
+                            raise TimeoutError(f"分区 {partition} 在 {self.timeout} 秒内没有响应")
+                        replies.append(connection.recv())
+                except (EOFError, OSError, ValueError) as e:
+                    # 其他分区可能已写入响应，继续使用管道会使请求与响应错位
+                    logger.error(f"并行匹配失败，停用并行匹配并回退到串行匹配: {e}")
+                    self._terminate_pool()
+                    replies = None
+        
+        if replies is None:
+            return self.library.find_matches(data, max_rules, self.short_circuit)
+        
+        errors = [payload for status, payload in replies if status != 'ok']
+        if errors:
+            # 分区副本可能已与规则库不一致，不能继续使用
+            logger.error(f"分区匹配失败，停用并行匹配并回退到串行匹配: {errors[0]}")
+            with self.lock:
+                if not self.failed:
+                    self._terminate_pool()
+            return self.library.find_matches(data, max_rules, self.short_circuit)
+        
+        priority_keys = self.library.priority_keys
+        rules = self.library.rules
+        merged = []
+        for _, payload in replies:
+            for rule_id, match_score, matched_conditions in payload:
+                key = priority_keys.get(rule_id)
+                rule = rules.get(rule_id)
+                if key is not None and rule is not None:
+                    merged.append((key, rule, match_score, matched_conditions))
+        
+        merged.sort(key=lambda item: item[0])
+        return [(rule, match_score, matched_conditions)
+                for _, rule, match_score, matched_conditions in merged[:max_rules]]
+    
+    def _terminate_pool(self):
+        """终止工作进程并关闭管道，丢弃未读取的响应（需持有锁）"""
+        self.failed = True
+        for process in self.processes:
+            if process.is_alive():
+                process.kill()
+        for process in self.processes:
+            process.join(timeout=1)
+        for connection in self.connections:
+            connection.close()
+        self.connections = []
+        self.processes = []
+    
+    def close(self):
+        """关闭工作进程"""
+        self.library.remove_listener(self._on_rule_change)
+        
+        with self.lock:
+            for connection in self.connections:
+                try:
+                    connection.send(None)
+                except (OSError, ValueError):
+                    pass
+            
+            for process in self.processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            
+            for connection in self.connections:
+                connection.close()
+            
+            self.connections = []
+            self.processes = []
+        
+        logger.info("并行匹配已停用")
@@ -3,20 +3,124 @@
 实现LRU缓存、规则和结果缓存、预加载机制、缓存优化等功能
 """
 
+import gc
+import os
+import sys
+import math
 import time
+import types
 import json
+import marshal
 import hashlib
-from typing import Dict, List, Any, Optional, Tuple, Union
+import heapq
+from operator import itemgetter
+from typing import Dict, List, Any, Optional, Tuple, Union, Callable
+from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict, deque
 import logging
-from threading import Lock, RLock
+from threading import Lock, RLock, Event, Thread
+from concurrent.futures import ThreadPoolExecutor
 import pickle
+import numpy as np
 
 from .knowledge_extractor import Rule
+from .disk_cache import DiskCache
+from .shared_cache import SharedMemoryCache
 
 logger = logging.getLogger(__name__)
 
+FINGERPRINT_DIGEST_SIZE = 16  # 128位输入指纹
+_MARSHAL_VERSION = 2  # 版本2不写对象引用标记，输出只取决于值本身
+
+# marshal 可直接序列化且序列化结果与对象身份无关的基本类型
+_PRIMITIVE_TYPES = frozenset({str, int, float, bool, complex, bytes, type(None)})
+# 规范形式中非基本类型值编码为 (Ellipsis, 类型标记, ...) 元组；输入中的 Ellipsis 本身也会被转换，
+# 因此任何输入都不会生成与标记元组相同的规范形式。不支持的类型抛出 TypeError（repr 可能含对象地址，
+# 不能保证相等的输入得到相同的指纹），调用方据此不缓存该输入
+_TAG = Ellipsis
+
+
+def _canonical_dict(value: dict) -> tuple:
+    """字典按键排序为 (标记, 键元组, 值元组)"""
+    try:
+        keys = sorted(value)
+    except TypeError:
+        # 键类型不可比较时，按各项序列化结果排序
+        items = sorted(
+            marshal.dumps((_canonical(key), _canonical(item)), _MARSHAL_VERSION)
+            for key, item in value.items()
+        )
+        return (_TAG, 'dict_items', tuple(items))
+    
+    if len(keys) > 1:
+        values = itemgetter(*keys)(value)
+    else:
+        values = tuple(value[key] for key in keys)
+    
+    if not _PRIMITIVE_TYPES.issuperset(map(type, keys)):
+        keys = [_canonical(key) for key in keys]
+    if not _PRIMITIVE_TYPES.issuperset(map(type, values)):
+        values = [_canonical(item) for item in values]
+    return (_TAG, 'dict', tuple(keys), tuple(values))
+
+
+def _canonical(value: Any) -> Any:
+    """将输入转换为确定性的规范形式，基本类型值原样保留"""
+    value_type = type(value)
+    if value_type in _PRIMITIVE_TYPES:
+        return value
+    if value_type is dict:
+        return _canonical_dict(value)
+    if value_type is list or value_type is tuple:
+        if _PRIMITIVE_TYPES.issuperset(map(type, value)):
+            return value
+        return value_type(_canonical(item) for item in value)
+    
+    if isinstance(value, np.ndarray):
+        shape = tuple(value.shape)
+        if value.dtype.hasobject:
+            return (_TAG, 'ndarray', 'O', shape, tuple(_canonical(item) for item in value.ravel()))
+        # 数值数组直接对缓冲区求摘要（C连续时零拷贝）
+        buffer = value if value.flags.c_contiguous else np.ascontiguousarray(value)
+        digest = hashlib.blake2b(buffer, digest_size=FINGERPRINT_DIGEST_SIZE).digest()
+        return (_TAG, 'ndarray', value.dtype.str, shape, digest)
+    if isinstance(value, np.generic):
+        return (_TAG, 'generic', value.dtype.str, value.tobytes())
+    if isinstance(value, dict):
+        return (_TAG, 'mapping', _type_name(value_type), _canonical_dict(value))
+    if isinstance(value, (set, frozenset)):
+        items = sorted(marshal.dumps(_canonical(item), _MARSHAL_VERSION) for item in value)
+        return (_TAG, 'set', _type_name(value_type), tuple(items))
+    if isinstance(value, (list, tuple)):
+        return (_TAG, 'sequence', _type_name(value_type), tuple(_canonical(item) for item in value))
+    if isinstance(value, (bytearray, memoryview)):
+        return (_TAG, 'buffer', _type_name(value_type), bytes(value))
+    for base in (bool, str, int, float, complex, bytes):
+        if isinstance(value, base):
+            # 基本类型的子类（如枚举）：类型名加基类值
+            return (_TAG, 'subclass', _type_name(value_type), base(value) if base is bool else base.__new__(base, value))
+    if value is Ellipsis:
+        return (_TAG, 'ellipsis')
+    raise TypeError(f"不支持计算指纹的类型: {_type_name(value_type)}")
+
+
+def _type_name(value_type: type) -> str:
+    return f"{value_type.__module__}.{value_type.__qualname__}"
+
+
+def compute_fingerprint(value: Any) -> str:
+    """计算嵌套 dict/list/基本类型/NumPy 输入的结构指纹
+    
+    输入先转换为规范形式（字典按键排序、集合按元素排序、数组以缓冲区摘要代替），
+    再一次性序列化并计算 blake2b-128 摘要；结果区分值的类型且跨进程稳定。
+    输入中含有不支持的类型（如任意自定义对象）时抛出 TypeError。
+    """
+    return hashlib.blake2b(
+        marshal.dumps(_canonical(value), _MARSHAL_VERSION),
+        digest_size=FINGERPRINT_DIGEST_SIZE
+    ).hexdigest()
+
 
 @dataclass
 class CacheEntry:
@@ -28,6 +132,9 @@ class CacheEntry:
     size: int = 0
     ttl: Optional[float] = None  # 生存时间（秒）
     tags: List[str] = field(default_factory=list)
+    version: Optional[int] = None  # 数据版本号（如规则库版本），读取时版本不一致视为过期
+    last_access: float = 0.0  # 最近一次命中时间
+    cost: float = 0.0  # 计算该值耗费的时间（秒），命中时计入节省的计算时间
 
 
 @dataclass
@@ -38,93 +145,1063 @@ class CacheStats:
     hit_count: int = 0
     miss_count: int = 0
     eviction_count: int = 0
+    expired_count: int = 0
+    l2_hit_count: int = 0  # 一级未命中、由磁盘二级缓存提供的次数（计入 hit_count）
+    rejected_count: int = 0  # 缓存已满时被淘汰策略拒绝接纳的写入次数
+    saved_seconds: float = 0.0  # 命中条目的计算代价之和，即缓存节省的计算时间
     avg_access_time: float = 0.0
     hit_rate: float = 0.0
+    policy: str = 'lru'  # 淘汰策略名称
+
+
+# 大小估算时单独处理的类型：数组按 nbytes 计算；类型/模块/函数为共享对象，不计入缓存值大小
+_SKIPPED_TYPES = frozenset({
+    np.ndarray, type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType
+})
+
+
+def _array_size(array: np.ndarray) -> int:
+    """数组大小：视图只含头部，另加数据的 nbytes"""
+    if array.base is None:
+        return sys.getsizeof(array)
+    return sys.getsizeof(array) + array.nbytes
+
+
+class PickleSizer:
+    """按 pickle 序列化长度计算大小（精确但开销大）"""
+    
+    def __call__(self, value: Any) -> int:
+        try:
+            return len(pickle.dumps(value))
+        except Exception:
+            # 如果pickle失败，使用字符串长度估算
+            return len(str(value))
+
+
+class RecursiveSizer:
+    """递归累加 sys.getsizeof 的大小估算器
+    
+    按层遍历对象引用（gc.get_referents，容器元素、__dict__/__slots__ 属性均在其中），
+    同一对象只计一次，类型/模块/函数对象不计入；数组按 nbytes 计算，不再深入数组内部。
+    深度超过 max_depth 的对象不再计入。
+    """
+    
+    def __init__(self, max_depth: int = 8):
+        self.max_depth = max_depth
+    
+    def __call__(self, value: Any) -> int:
+        getsizeof = sys.getsizeof
+        seen = set()
+        size = 0
+        level = [value]
+        
+        for _ in range(self.max_depth + 1):
+            # 以集合运算去重，逐对象的过滤只在本层出现需单独处理的类型时进行
+            objects_by_id = {id(obj): obj for obj in level}
+            new_ids = objects_by_id.keys() - seen
+            if not new_ids:
+                break
+            seen.update(new_ids)
+            batch = list(map(objects_by_id.__getitem__, new_ids))
+            
+            batch_types = set(map(type, batch))
+            if not _SKIPPED_TYPES.isdisjoint(batch_types) or any(issubclass(t, type) for t in batch_types):
+                arrays = [obj for obj in batch if type(obj) is np.ndarray]
+                size += sum(map(_array_size, arrays))
+                batch = [obj for obj in batch if type(obj) not in _SKIPPED_TYPES and not isinstance(obj, type)]
+            
+            size += sum(map(getsizeof, batch))
+            level = gc.get_referents(*batch)
+        return size
+
+
+class SampledSizer:
+    """抽样估算器
+    
+    每种类型每 sample_interval 次只用 base_sizer 实测一次，其余按该类型单元素平均大小
+    乘以元素个数估算，在内存上限大致准确的前提下避免每次写入都完整计算；数组始终按 nbytes 计算。
+    """
+    
+    def __init__(self, base_sizer: Optional[Callable[[Any], int]] = None, sample_interval: int = 16,
+                 smoothing: float = 0.2):
+        self.base_sizer = base_sizer if base_sizer is not None else RecursiveSizer()
+        self.sample_interval = max(1, sample_interval)
+        self.smoothing = smoothing
+        self.samples: Dict[type, List[float]] = {}  # type -> [已计数次数, 单元素平均大小]
+        self.lock = Lock()
+    
+    def __call__(self, value: Any) -> int:
+        if isinstance(value, np.ndarray):
+            return _array_size(value)
+        try:
+            count = max(len(value), 1)
+        except TypeError:
+            count = 1
+        
+        with self.lock:
+            sample = self.samples.get(type(value))
+            if sample is not None:
+                sample[0] += 1
+                if sample[0] % self.sample_interval:
+                    return int(sample[1] * count)
+        
+        size = self.base_sizer(value)
+        per_item = size / count
+        with self.lock:
+            sample = self.samples.get(type(value))
+            if sample is None:
+                self.samples[type(value)] = [1, per_item]
+            else:
+                sample[1] += self.smoothing * (per_item - sample[1])
+        return size
+
+
+class EvictionPolicy(ABC):
+    """淘汰策略基类
+    
+    缓存在命中、未命中、插入和删除时通知策略，需要腾出空间时调用 evict() 取得被淘汰的键。
+    策略方法均在缓存锁内调用。
+    """
+    
+    name = 'base'
+    
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+    
+    @abstractmethod
+    def record_access(self, key: str):
+        """缓存命中"""
+        pass
+    
+    def record_miss(self, key: str):
+        """缓存未命中（频率类策略用于统计访问频率）"""
+        pass
+    
+    @abstractmethod
+    def record_insert(self, key: str):
+        """新条目写入"""
+        pass
+    
+    @abstractmethod
+    def record_remove(self, key: str):
+        """条目被显式删除或过期"""
+        pass
+    
+    @abstractmethod
+    def evict(self) -> Optional[str]:
+        """选出并移除一个淘汰键，无可淘汰条目时返回 None"""
+        pass
+    
+    def record_cost(self, key: str, cost: float, size: int):
+        """新条目的计算代价（秒）和大小，在 record_insert 之前调用（代价感知策略使用）"""
+        pass
+    
+    def should_admit(self, key: str, cost: float, size: int) -> bool:
+        """缓存已满时是否接纳新条目，默认总是接纳"""
+        return True
+    
+    @abstractmethod
+    def clear(self):
+        """清空策略状态"""
+        pass
+
+
+class LRUPolicy(EvictionPolicy):
+    """最近最少使用"""
+    
+    name = 'lru'
+    
+    def __init__(self, capacity: int):
+        super().__init__(capacity)
+        self.order: OrderedDict[str, None] = OrderedDict()
+    
+    def record_access(self, key: str):
+        if key in self.order:
+            self.order.move_to_end(key)
+    
+    def record_insert(self, key: str):
+        self.order[key] = None
+    
+    def record_remove(self, key: str):
+        self.order.pop(key, None)
+    
+    def evict(self) -> Optional[str]:
+        if not self.order:
+            return None
+        return self.order.popitem(last=False)[0]
+    
+    def clear(self):
+        self.order.clear()
+
+
+class LFUPolicy(EvictionPolicy):
+    """带老化的最不经常使用
+    
+    频率相同的条目按最近最少使用淘汰；每累计 aging_interval 次访问，所有频率减半，
+    使过去的热点逐渐让位于新的热点。
+    """
+    
+    name = 'lfu'
+    
+    def __init__(self, capacity: int, aging_interval: Optional[int] = None):
+        super().__init__(capacity)
+        self.aging_interval = aging_interval if aging_interval is not None else 10 * self.capacity
+        self.frequencies: Dict[str, int] = {}
+        self.buckets: Dict[int, OrderedDict] = defaultdict(OrderedDict)  # 频率 -> 键（按最近访问排序）
+        self.min_frequency = 0
+        self.access_count = 0
+    
+    def record_access(self, key: str):
+        frequency = self.frequencies.get(key)
+        if frequency is None:
+            return
+        self._move(key, frequency, frequency + 1)
+        self._tick()
+    
+    def record_insert(self, key: str):
+        self.frequencies[key] = 1
+        self.buckets[1][key] = None
+        self.min_frequency = 1
+        self._tick()
+    
+    def record_remove(self, key: str):
+        frequency = self.frequencies.pop(key, None)
+        if frequency is not None:
+            bucket = self.buckets[frequency]
+            del bucket[key]
+            if not bucket:
+                del self.buckets[frequency]
+    
+    def evict(self) -> Optional[str]:
+        if not self.frequencies:
+            return None
+        bucket = self.buckets.get(self.min_frequency)
+        if not bucket:
+            self.min_frequency = min(self.buckets)
+            bucket = self.buckets[self.min_frequency]
+        key, _ = bucket.popitem(last=False)
+        if not bucket:
+            del self.buckets[self.min_frequency]
+        del self.frequencies[key]
+        return key
+    
+    def clear(self):
+        self.frequencies.clear()
+        self.buckets.clear()
+        self.min_frequency = 0
+        self.access_count = 0
+    
+    def _move(self, key: str, old_frequency: int, new_frequency: int):
+        bucket = self.buckets[old_frequency]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[old_frequency]
+            if self.min_frequency == old_frequency:
+                self.min_frequency = new_frequency
+        self.buckets[new_frequency][key] = None
+        self.frequencies[key] = new_frequency
+    
+    def _tick(self):
+        self.access_count += 1
+        if self.access_count >= self.aging_interval:
+            self._age()
+    
+    def _age(self):
+        """频率减半（至少为1），同频率内保持原有的访问顺序"""
+        self.access_count = 0
+        buckets: Dict[int, OrderedDict] = defaultdict(OrderedDict)
+        for frequency in sorted(self.buckets):
+            aged = max(1, frequency // 2)
+            for key in self.buckets[frequency]:
+                buckets[aged][key] = None
+                self.frequencies[key] = aged
+        self.buckets = buckets
+        self.min_frequency = min(buckets) if buckets else 0
+
+
+class ARCPolicy(EvictionPolicy):
+    """自适应替换缓存（ARC）
+    
+    T1 保存只访问过一次的键，T2 保存多次访问的键，B1/B2 为对应的淘汰历史（幽灵键）；
+    根据幽灵键的命中情况自适应调整 T1 的目标大小 p，兼顾最近性与频率，抵抗一次性扫描。
+    """
+    
+    name = 'arc'
+    
+    def __init__(self, capacity: int):
+        super().__init__(capacity)
+        self.t1: OrderedDict[str, None] = OrderedDict()
+        self.t2: OrderedDict[str, None] = OrderedDict()
+        self.b1: OrderedDict[str, None] = OrderedDict()
+        self.b2: OrderedDict[str, None] = OrderedDict()
+        self.target_t1 = 0.0  # p
+        self._ghost_hit_b2 = False
+    
+    def record_access(self, key: str):
+        if key in self.t1:
+            del self.t1[key]
+            self.t2[key] = None
+        elif key in self.t2:
+            self.t2.move_to_end(key)
+    
+    def record_miss(self, key: str):
+        # 幽灵键命中：调整 T1 目标大小，供随后写入时的淘汰决策使用
+        if key in self.b1:
+            delta = max(len(self.b2) / len(self.b1), 1.0)
+            self.target_t1 = min(float(self.capacity), self.target_t1 + delta)
+            self._ghost_hit_b2 = False
+        elif key in self.b2:
+            delta = max(len(self.b1) / len(self.b2), 1.0)
+            self.target_t1 = max(0.0, self.target_t1 - delta)
+            self._ghost_hit_b2 = True
+    
+    def record_insert(self, key: str):
+        if key in self.b1 or key in self.b2:
+            # 曾被淘汰后再次访问，视为频繁访问
+            self.b1.pop(key, None)
+            self.b2.pop(key, None)
+            self.t2[key] = None
+        else:
+            self.t1[key] = None
+        self._ghost_hit_b2 = False
+        self._trim_ghosts()
+    
+    def record_remove(self, key: str):
+        self.t1.pop(key, None)
+        self.t2.pop(key, None)
+    
+    def evict(self) -> Optional[str]:
+        if self.t1 and (len(self.t1) > self.target_t1 or
+                        (self._ghost_hit_b2 and len(self.t1) >= self.target_t1) or not self.t2):
+            key, _ = self.t1.popitem(last=False)
+            self.b1[key] = None
+        elif self.t2:
+            key, _ = self.t2.popitem(last=False)
+            self.b2[key] = None
+        else:
+            return None
+        self._trim_ghosts()
+        return key
+    
+    def clear(self):
+        self.t1.clear()
+        self.t2.clear()
+        self.b1.clear()
+        self.b2.clear()
+        self.target_t1 = 0.0
+        self._ghost_hit_b2 = False
+    
+    def _trim_ghosts(self):
+        """幽灵键总数不超过容量：|T1|+|B1| <= c，|B1|+|B2| <= c"""
+        while self.b1 and len(self.t1) + len(self.b1) > self.capacity:
+            self.b1.popitem(last=False)
+        while len(self.b1) + len(self.b2) > self.capacity:
+            if self.b2:
+                self.b2.popitem(last=False)
+            else:
+                self.b1.popitem(last=False)
+
+
+class CountMinSketch:
+    """计数最小草图：以固定内存近似统计键的访问频率（4位饱和计数，定期减半老化）"""
+    
+    MAX_COUNT = 15
+    # 计数减半的字节转换表
+    _HALVE_TABLE = bytes(value >> 1 for value in range(256))
+    _SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+    
+    def __init__(self, capacity: int, depth: int = 4):
+        width = 1
+        while width < max(16, capacity):
+            width <<= 1
+        self.width = width
+        self.mask = width - 1
+        self.depth = min(depth, len(self._SEEDS))
+        self.counters = bytearray(width * self.depth)
+        self.sample_size = 10 * max(1, capacity)
+        self.additions = 0
+    
+    def _indexes(self, key: str) -> List[int]:
+        key_hash = hash(key)
+        width = self.width
+        mask = self.mask
+        return [row * width + (((key_hash ^ seed) * 0x2545F4914F6CDD1D) >> 17 & mask)
+                for row, seed in enumerate(self._SEEDS[:self.depth])]
+    
+    def increment(self, key: str):
+        counters = self.counters
+        max_count = self.MAX_COUNT
+        for index in self._indexes(key):
+            if counters[index] < max_count:
+                counters[index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.reset()
+    
+    def frequency(self, key: str) -> int:
+        counters = self.counters
+        return min(counters[index] for index in self._indexes(key))
+    
+    def reset(self):
+        """所有计数减半"""
+        self.counters = bytearray(self.counters.translate(self._HALVE_TABLE))
+        self.additions //= 2
+    
+    def clear(self):
+        self.counters = bytearray(len(self.counters))
+        self.additions = 0
+
+
+class WTinyLFUPolicy(EvictionPolicy):
+    """W-TinyLFU
+    
+    新条目先进入约占容量1%的LRU窗口；窗口溢出时，窗口淘汰候选与主区（分段LRU，
+    试用段约20%、保护段约80%）的淘汰候选按计数最小草图估计的访问频率比较，频率低者被淘汰。
+    一次性访问的键频率很低，无法挤掉热点条目。
+    """
+    
+    name = 'tinylfu'
+    
+    def __init__(self, capacity: int, window_ratio: float = 0.01, protected_ratio: float = 0.8):
+        super().__init__(capacity)
+        self.window_capacity = max(1, int(self.capacity * window_ratio))
+        self.main_capacity = max(1, self.capacity - self.window_capacity)
+        self.protected_capacity = max(1, int(self.main_capacity * protected_ratio))
+        self.window: OrderedDict[str, None] = OrderedDict()
+        self.probation: OrderedDict[str, None] = OrderedDict()
+        self.protected: OrderedDict[str, None] = OrderedDict()
+        self.sketch = CountMinSketch(self.capacity)
+    
+    def record_access(self, key: str):
+        self.sketch.increment(key)
+        if key in self.window:
+            self.window.move_to_end(key)
+        elif key in self.probation:
+            # 试用段命中晋升保护段，保护段溢出时降级其最久未用条目
+            del self.probation[key]
+            self.protected[key] = None
+            if len(self.protected) > self.protected_capacity:
+                demoted, _ = self.protected.popitem(last=False)
+                self.probation[demoted] = None
+        elif key in self.protected:
+            self.protected.move_to_end(key)
+    
+    def record_miss(self, key: str):
+        self.sketch.increment(key)
+    
+    def record_insert(self, key: str):
+        self.window[key] = None
+        # 主区未满时窗口溢出的条目直接进入试用段
+        if (len(self.window) > self.window_capacity and
+                len(self.probation) + len(self.protected) < self.main_capacity):
+            moved, _ = self.window.popitem(last=False)
+            self.probation[moved] = None
+    
+    def record_remove(self, key: str):
+        self.window.pop(key, None)
+        self.probation.pop(key, None)
+        self.protected.pop(key, None)
+    
+    def evict(self) -> Optional[str]:
+        # 淘汰发生在新条目写入窗口之前：窗口已满时其最久未用条目将被挤出，
+        # 与主区候选比较访问频率，频率高者进入试用段，低者被淘汰
+        if len(self.window) >= self.window_capacity and (self.probation or self.protected):
+            candidate, _ = self.window.popitem(last=False)
+            victim_segment = self.probation if self.probation else self.protected
+            victim = next(iter(victim_segment))
+            if self.sketch.frequency(candidate) > self.sketch.frequency(victim):
+                del victim_segment[victim]
+                self.probation[candidate] = None
+                return victim
+            return candidate
+        
+        for segment in (self.probation, self.protected, self.window):
+            if segment:
+                return segment.popitem(last=False)[0]
+        return None
+    
+    def clear(self):
+        self.window.clear()
+        self.probation.clear()
+        self.protected.clear()
+        self.sketch.clear()
+
+
+class GDSFPolicy(EvictionPolicy):
+    """GreedyDual-Size-Frequency：按计算代价、大小和访问频率淘汰
+    
+    条目优先级 H = L + 频率 × 代价 / 大小，淘汰 H 最小的条目并把膨胀值 L 提升到该 H，
+    长期未被访问的条目随 L 上涨而相对贬值。缓存已满时，新条目按计数最小草图估计的频率计算优先级，
+    低于当前最小优先级则不接纳：计算便宜的结果不会挤掉计算昂贵的结果。
+    优先级堆采用惰性删除，过期的堆元素在淘汰时跳过。
+    """
+    
+    name = 'gdsf'
+    DEFAULT_COST = 0.001  # 未记录代价的条目按1毫秒计
+    
+    def __init__(self, capacity: int):
+        super().__init__(capacity)
+        self.inflation = 0.0
+        self.cost_ratios: Dict[str, float] = {}  # key -> 代价 / 大小
+        self.frequencies: Dict[str, int] = {}
+        self.priorities: Dict[str, Tuple[float, int]] = {}  # key -> (H, 堆元素序号)
+        self.heap: List[Tuple[float, int, str]] = []
+        self.sketch = CountMinSketch(self.capacity)
+        self._seq = 0
+    
+    def record_access(self, key: str):
+        self.sketch.increment(key)
+        frequency = self.frequencies.get(key)
+        if frequency is not None:
+            self.frequencies[key] = frequency + 1
+            self._push(key)
+    
+    def record_miss(self, key: str):
+        self.sketch.increment(key)
+    
+    def record_cost(self, key: str, cost: float, size: int):
+        self.cost_ratios[key] = self._cost_ratio(cost, size)
+    
+    def record_insert(self, key: str):
+        self.cost_ratios.setdefault(key, self._cost_ratio(0.0, 1))
+        self.frequencies[key] = 1
+        self._push(key)
+    
+    def record_remove(self, key: str):
+        self.priorities.pop(key, None)
+        self.frequencies.pop(key, None)
+        self.cost_ratios.pop(key, None)
+    
+    def should_admit(self, key: str, cost: float, size: int) -> bool:
+        lowest = self._peek()
+        if lowest is None:
+            return True
+        frequency = max(1, self.sketch.frequency(key))
+        return self.inflation + frequency * self._cost_ratio(cost, size) >= lowest
+    
+    def evict(self) -> Optional[str]:
+        lowest = self._peek()
+        if lowest is None:
+            return None
+        _, _, key = heapq.heappop(self.heap)
+        self.inflation = lowest
+        self.record_remove(key)
+        return key
+    
+    def clear(self):
+        self.inflation = 0.0
+        self.cost_ratios.clear()
+        self.frequencies.clear()
+        self.priorities.clear()
+        self.heap.clear()
+        self.sketch.clear()
+    
+    def _cost_ratio(self, cost: float, size: int) -> float:
+        return (cost if cost > 0 else self.DEFAULT_COST) / max(size, 1)
+    
+    def _push(self, key: str):
+        priority = self.inflation + self.frequencies[key] * self.cost_ratios[key]
+        self._seq += 1
+        self.priorities[key] = (priority, self._seq)
+        heapq.heappush(self.heap, (priority, self._seq, key))
+        # 过期元素过多时重建堆
+        if len(self.heap) > 4 * len(self.priorities) + 64:
+            self.heap = [(priority, seq, item_key) for item_key, (priority, seq) in self.priorities.items()]
+            heapq.heapify(self.heap)
+    
+    def _peek(self) -> Optional[float]:
+        """最小的有效优先级，顺带弹出堆顶的过期元素"""
+        heap = self.heap
+        priorities = self.priorities
+        while heap:
+            priority, seq, key = heap[0]
+            if priorities.get(key) == (priority, seq):
+                return priority
+            heapq.heappop(heap)
+        return None
+
+
+EVICTION_POLICIES: Dict[str, type] = {
+    LRUPolicy.name: LRUPolicy,
+    LFUPolicy.name: LFUPolicy,
+    ARCPolicy.name: ARCPolicy,
+    WTinyLFUPolicy.name: WTinyLFUPolicy,
+    GDSFPolicy.name: GDSFPolicy
+}
+
+
+def create_eviction_policy(policy: Union[str, EvictionPolicy, Callable[[int], EvictionPolicy]],
+                           capacity: int) -> EvictionPolicy:
+    """按名称（'lru'/'lfu'/'arc'/'tinylfu'/'gdsf'）创建淘汰策略
+    
+    传入策略实例时原样返回；传入策略类或工厂函数时以 capacity 调用。
+    """
+    if isinstance(policy, EvictionPolicy):
+        return policy
+    if callable(policy):
+        return policy(capacity)
+    policy_class = EVICTION_POLICIES.get(policy)
+    if policy_class is None:
+        raise ValueError(f"未知的淘汰策略: {policy}")
+    return policy_class(capacity)
+
+
+class TimingWheel:
+    """分层时间轮
+    
+    每层 2**wheel_bits 个槽，第0层每槽一个时钟刻度，上层每槽覆盖下层一整圈；
+    到期时间超出所有层范围的键放入溢出表。调度、取消均为 O(1)，推进时每个刻度处理一个槽，
+    上层槽在下层转完一圈时整体下放（级联）。方法本身不加锁，由调用方保证互斥。
+    """
+    
+    def __init__(self, tick_interval: float = 1.0, wheel_bits: int = 6, levels: int = 4,
+                 start_time: Optional[float] = None):
+        self.tick_interval = tick_interval
+        self.wheel_bits = wheel_bits
+        self.wheel_mask = (1 << wheel_bits) - 1
+        self.levels = levels
+        self.wheels: List[List[Dict[str, int]]] = [
+            [{} for _ in range(1 << wheel_bits)] for _ in range(levels)
+        ]
+        self.overflow: Dict[str, int] = {}
+        self.locations: Dict[str, Tuple[int, int]] = {}  # key -> (层, 槽)，溢出表为 (-1, 0)
+        self.current_tick = int((start_time if start_time is not None else time.time()) // tick_interval)
+    
+    def __len__(self) -> int:
+        return len(self.locations)
+    
+    def schedule(self, key: str, expire_at: float):
+        """安排键在 expire_at 时刻到期（已安排的键重新安排）"""
+        self.cancel(key)
+        expire_tick = max(math.ceil(expire_at / self.tick_interval), self.current_tick + 1)
+        self._place(key, expire_tick)
+    
+    def cancel(self, key: str) -> bool:
+        """取消键的到期安排"""
+        location = self.locations.pop(key, None)
+        if location is None:
+            return False
+        level, slot = location
+        if level < 0:
+            del self.overflow[key]
+        else:
+            del self.wheels[level][slot][key]
+        return True
+    
+    def advance(self, now: Optional[float] = None) -> List[str]:
+        """推进到 now，返回期间到期的键"""
+        target_tick = int((now if now is not None else time.time()) // self.tick_interval)
+        expired = []
+        while self.current_tick < target_tick:
+            self.current_tick += 1
+            self._cascade()
+            slot = self.wheels[0][self.current_tick & self.wheel_mask]
+            if slot:
+                expired.extend(slot)
+                for key in slot:
+                    del self.locations[key]
+                slot.clear()
+        return expired
+    
+    def clear(self):
+        for wheel in self.wheels:
+            for slot in wheel:
+                slot.clear()
+        self.overflow.clear()
+        self.locations.clear()
+    
+    def _place(self, key: str, expire_tick: int):
+        """放入与当前刻度处于同一上层区间的最低层"""
+        current_tick = self.current_tick
+        for level in range(self.levels):
+            shift = self.wheel_bits * (level + 1)
+            if expire_tick >> shift == current_tick >> shift:
+                slot = (expire_tick >> (self.wheel_bits * level)) & self.wheel_mask
+                self.wheels[level][slot][key] = expire_tick
+                self.locations[key] = (level, slot)
+                return
+        self.overflow[key] = expire_tick
+        self.locations[key] = (-1, 0)
+    
+    def _cascade(self):
+        """当前刻度进入上层新槽时，从最高层开始把该槽的键下放到低层"""
+        tick = self.current_tick
+        top_level = 0
+        while top_level < self.levels and not tick & ((1 << (self.wheel_bits * (top_level + 1))) - 1):
+            top_level += 1
+        
+        if top_level == self.levels and self.overflow:
+            pending = list(self.overflow.items())
+            self.overflow.clear()
+            for key, expire_tick in pending:
+                self._place(key, expire_tick)
+        
+        for level in range(min(top_level, self.levels - 1), 0, -1):
+            slot = self.wheels[level][(tick >> (self.wheel_bits * level)) & self.wheel_mask]
+            if slot:
+                pending = list(slot.items())
+                slot.clear()
+                for key, expire_tick in pending:
+                    self._place(key, expire_tick)
+
+
+class ExpirySweeper:
+    """后台过期清理线程：按固定间隔推进各缓存的时间轮并删除到期条目，
+    同时把各缓存排队的二级缓存写入落盘（见 LRUCache.flush_l2），不占用请求路径"""
+    
+    def __init__(self, caches: List[Any], interval: float = 1.0):
+        self.caches = caches
+        self.interval = interval
+        self.stop_event = Event()
+        self.thread: Optional[Thread] = None
+        self.expired_count = 0
+    
+    def start(self):
+        """启动清理线程"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        for cache in self.caches:
+            cache.enable_expiry_wheel(self.interval)
+        self.stop_event.clear()
+        self.thread = Thread(target=self._run, name="cache-expiry-sweeper", daemon=True)
+        self.thread.start()
+    
+    def stop(self, timeout: Optional[float] = None):
+        """停止清理线程"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+    
+    def sweep(self) -> int:
+        """执行一次清理，返回删除的条目数"""
+        removed = 0
+        for cache in self.caches:
+            try:
+                removed += cache.expire_entries()
+            except Exception as e:
+                logger.error(f"缓存过期清理失败: {e}")
+            try:
+                cache.flush_l2()
+            except Exception as e:
+                logger.error(f"二级缓存写入失败: {e}")
+        self.expired_count += removed
+        return removed
+    
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sweep()
 
 
 class LRUCache:
-    """LRU缓存实现"""
+    """LRU缓存实现（淘汰策略可选：'lru'/'lfu'/'arc'/'tinylfu'，默认LRU）
+    
+    buffered_reads 为 True 时命中读取不加锁：命中记录先写入读缓冲，累计到阈值后
+    尝试加锁批量回放到淘汰策略和统计中（获取锁失败则留待下次），降低锁竞争。
     
-    def __init__(self, max_size: int = 1000, max_memory_mb: int = 100):
+    挂载磁盘二级缓存（attach_l2）后，被驱逐的条目写入二级缓存，一级未命中时从二级缓存读取并
+    提升回一级；删除和按标签失效同时作用于两级，同一个键只保留在一级中。
+    驱逐写入和删除标记先进入待写队列，由后台线程（ExpirySweeper）调用 flush_l2 落盘；
+    二级缓存的读取在分片锁外进行，先查待写队列再读磁盘，请求路径上不持锁做磁盘 I/O。
+    """
+    
+    READ_BUFFER_THRESHOLD = 64
+    # 待写队列超过此长度时（如未启动后台线程）由写入方在锁外自行落盘
+    L2_PENDING_LIMIT = 4096
+    L2_FLUSH_BATCH = 256
+    
+    def __init__(self, max_size: int = 1000, max_memory_mb: int = 100,
+                 sizer: Optional[Callable[[Any], int]] = None,
+                 eviction_policy: Union[str, EvictionPolicy, Callable[[int], EvictionPolicy]] = 'lru',
+                 buffered_reads: bool = False):
         self.max_size = max_size
         self.max_memory_bytes = max_memory_mb * 1024 * 1024
-        self.cache: OrderedDict[str, CacheEntry] = OrderedDict()
-        self.stats = CacheStats()
+        # 大小估算器，put 未指定 size 时使用
+        self.sizer = sizer if sizer is not None else RecursiveSizer()
+        self.policy = create_eviction_policy(eviction_policy, max_size)
+        self.cache: Dict[str, CacheEntry] = {}
+        self.stats = CacheStats(policy=self.policy.name)
         self.lock = RLock()
+        self.buffered_reads = buffered_reads
+        self.read_buffer: deque = deque()  # 待回放的命中键
+        # 标签反向索引：tag -> 带有该标签的键，写入/删除/驱逐时维护
+        self.tag_index: Dict[str, set] = defaultdict(set)
+        # 过期时间轮，见 enable_expiry_wheel；未启用时只在读取时惰性过期
+        self.expiry_wheel: Optional[TimingWheel] = None
+        # 磁盘二级缓存及写入条目的版本（规则库内容哈希），见 attach_l2
+        self.l2: Optional[DiskCache] = None
+        self.l2_version: Optional[str] = None
+        # 二级缓存待写队列：key -> (value, version, tags, expire_at, cost)，None 表示删除标记
+        self.l2_pending: OrderedDict[str, Optional[Tuple[Any, str, List[str], Optional[float], float]]] = OrderedDict()
+        self.l2_pending_lock = Lock()
+        # 二级缓存 I/O 锁：串行化本缓存的落盘、读取和按标签删除，获取顺序在 self.lock 之前
+        self.l2_io_lock = RLock()
+        
+    def get(self, key: str, version: Optional[int] = None) -> Optional[Any]:
+        """获取缓存值，指定 version 时版本不一致的条目视为过期"""
+        if self.buffered_reads:
+            entry = self.cache.get(key)
+            if (entry is not None and not (entry.ttl and time.time() - entry.timestamp > entry.ttl) and
+                    (version is None or entry.version == version)):
+                read_buffer = self.read_buffer
+                read_buffer.append(key)
+                if len(read_buffer) >= self.READ_BUFFER_THRESHOLD and self.lock.acquire(blocking=False):
+                    try:
+                        self._drain_read_buffer()
+                    finally:
+                        self.lock.release()
+                return entry.value
         
-    def get(self, key: str) -> Optional[Any]:
-        """获取缓存值"""
         with self.lock:
             if key in self.cache:
                 entry = self.cache[key]
                 
-                # 检查TTL
-                if entry.ttl and time.time() - entry.timestamp > entry.ttl:
+                # 检查TTL和版本
+                now = time.time()
+                if entry.ttl and now - entry.timestamp > entry.ttl:
+                    self._remove_entry(key)
+                    self.stats.expired_count += 1
+                    self.stats.miss_count += 1
+                    return None
+                if version is not None and entry.version != version:
                     self._remove_entry(key)
                     self.stats.miss_count += 1
                     return None
                 
                 # 更新访问信息
                 entry.access_count += 1
-                self.cache.move_to_end(key)
+                entry.last_access = now
+                self.policy.record_access(key)
                 
                 self.stats.hit_count += 1
+                self.stats.saved_seconds += entry.cost
                 return entry.value
-            else:
+            self.policy.record_miss(key)
+            if self.l2 is None:
+                self.stats.miss_count += 1
+                return None
+        
+        record = self._promote_from_l2(key, version)
+        with self.lock:
+            if record is None:
                 self.stats.miss_count += 1
                 return None
+            self.stats.hit_count += 1
+            self.stats.l2_hit_count += 1
+            self.stats.saved_seconds += record[1]
+        self._check_l2_backlog()
+        return record[0]
     
     def put(self, key: str, value: Any, ttl: Optional[float] = None, 
-            tags: Optional[List[str]] = None, size: Optional[int] = None) -> bool:
-        """放入缓存"""
+            tags: Optional[List[str]] = None, size: Optional[int] = None,
+            version: Optional[int] = None, cost: Optional[float] = None) -> bool:
+        """放入缓存，cost 为计算该值耗费的时间（秒）；被淘汰策略拒绝接纳时返回 False"""
         with self.lock:
-            # 计算大小
-            if size is None:
-                size = self._estimate_size(value)
-            
-            # 检查是否需要清理空间
-            if not self._has_space(size):
-                self._evict_entries(size)
-            
-            # 创建缓存条目
-            entry = CacheEntry(
-                key=key,
-                value=value,
-                timestamp=time.time(),
-                size=size,
-                ttl=ttl,
-                tags=tags if tags is not None else []
-            )
-            
-            # 如果键已存在，先移除旧条目
-            if key in self.cache:
-                old_entry = self.cache[key]
-                self.stats.total_size -= old_entry.size
-                self.stats.total_entries -= 1
-            
-            # 添加新条目
-            self.cache[key] = entry
-            self.cache.move_to_end(key)
-            
-            self.stats.total_size += size
-            self.stats.total_entries += 1
+            self._drain_read_buffer()
+            # 新键的旧值可能留在二级缓存中，先使其失效；替换一级中已有的键时二级没有副本
+            if self.l2 is not None and key not in self.cache:
+                self._queue_l2(key, None)
+            inserted = self._insert(key, value, ttl, tags, size, version, cost) is not None
+        self._check_l2_backlog()
+        return inserted
+    
+    def remove(self, key: str) -> bool:
+        """移除缓存条目（包括二级缓存中的副本）"""
+        with self.lock:
+            self._drain_read_buffer()
+            removed = self._remove_entry(key)
+            if self.l2 is not None:
+                removed = key in self.l2 or self.l2_pending.get(key) is not None or removed
+                self._queue_l2(key, None)
+            return removed
+    
+    def remove_by_tags(self, tags: List[str]) -> int:
+        """移除带有任一指定标签的条目，返回移除数量（按标签索引查找，只访问受影响的条目）"""
+        tag_set = set(tags)
+        with self.l2_io_lock:
+            with self.lock:
+                keys = set()
+                for tag in tags:
+                    tagged_keys = self.tag_index.get(tag)
+                    if tagged_keys:
+                        keys.update(tagged_keys)
+                for key in keys:
+                    self._remove_entry(key)
+                removed = len(keys)
+                l2 = self.l2
+                if l2 is not None:
+                    removed += self._discard_pending(lambda record_tags: not tag_set.isdisjoint(record_tags))
+            if l2 is not None:
+                removed += l2.remove_by_tags(tags)
+            return removed
+    
+    def remove_by_tag_weights(self, tag_weights: Dict[str, float], min_weight: float) -> int:
+        """移除所带标签权重之和不低于 min_weight 的条目，返回移除数量"""
+        with self.l2_io_lock:
+            with self.lock:
+                accumulated: Dict[str, float] = {}
+                for tag, weight in tag_weights.items():
+                    tagged_keys = self.tag_index.get(tag)
+                    if tagged_keys:
+                        for key in tagged_keys:
+                            accumulated[key] = accumulated.get(key, 0.0) + weight
+                keys = [key for key, total in accumulated.items() if total >= min_weight]
+                for key in keys:
+                    self._remove_entry(key)
+                removed = len(keys)
+                l2 = self.l2
+                if l2 is not None:
+                    removed += self._discard_pending(
+                        lambda record_tags: sum(tag_weights.get(tag, 0.0) for tag in set(record_tags)) >= min_weight)
+            if l2 is not None:
+                removed += l2.remove_by_tag_weights(tag_weights, min_weight)
+            return removed
+    
+    def enable_expiry_wheel(self, tick_interval: float = 1.0):
+        """启用过期时间轮，此后带TTL的条目可由 expire_entries 主动清理"""
+        with self.lock:
+            if self.expiry_wheel is not None:
+                return
+            self.expiry_wheel = TimingWheel(tick_interval)
+            for key, entry in self.cache.items():
+                if entry.ttl:
+                    self.expiry_wheel.schedule(key, entry.timestamp + entry.ttl)
+    
+    def expire_entries(self, now: Optional[float] = None) -> int:
+        """推进时间轮并删除到期条目，返回删除数量"""
+        now = time.time() if now is None else now
+        with self.lock:
+            wheel = self.expiry_wheel
+            if wheel is None:
+                return 0
             
+            removed = 0
+            for key in wheel.advance(now):
+                entry = self.cache.get(key)
+                if entry is None or not entry.ttl:
+                    continue
+                if now - entry.timestamp >= entry.ttl:
+                    self._remove_entry(key)
+                    self.stats.expired_count += 1
+                    removed += 1
+                else:
+                    wheel.schedule(key, entry.timestamp + entry.ttl)
+            return removed
+    
+    def set_ttl(self, key: str, ttl: float) -> bool:
+        """调整条目TTL：条目从现在起 ttl 秒后过期"""
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is None:
+                return False
+            now = time.time()
+            entry.ttl = now - entry.timestamp + ttl
+            if self.expiry_wheel is not None:
+                self.expiry_wheel.schedule(key, now + ttl)
             return True
     
-    def remove(self, key: str) -> bool:
-        """移除缓存条目"""
+    def get_access_intervals(self) -> Dict[str, float]:
+        """估算被多次访问的条目的平均访问间隔（秒）"""
         with self.lock:
-            return self._remove_entry(key)
+            self._drain_read_buffer()
+            return {
+                key: (entry.last_access - entry.timestamp) / entry.access_count
+                for key, entry in self.cache.items()
+                if entry.access_count > 0 and entry.last_access > entry.timestamp
+            }
     
-    def clear(self):
-        """清空缓存"""
+    def evict_bytes(self, bytes_to_free: int) -> int:
+        """按淘汰策略驱逐条目直到释放指定字节数，返回实际释放的字节数"""
+        freed = 0
+        with self.lock:
+            self._drain_read_buffer()
+            while freed < bytes_to_free and self.cache:
+                freed += self._evict_one()
+        return freed
+    
+    def attach_l2(self, l2: Optional[DiskCache], version: Optional[str] = None):
+        """挂载磁盘二级缓存（None 表示卸载），version 为写入条目的版本（见 set_l2_version）；
+        更换前把待写队列写入原来的二级缓存"""
+        with self.l2_io_lock:
+            self.flush_l2()
+            with self.lock:
+                self.l2 = l2
+                self.l2_version = version
+    
+    def set_l2_version(self, version: str):
+        """设置写入二级缓存的条目版本；设置之前不读取二级缓存（其中可能是旧规则库的条目）"""
+        with self.lock:
+            self.l2_version = version
+    
+    def persist_to_l2(self) -> int:
+        """把一级缓存中的条目写入二级缓存（如关闭前），返回写入数量"""
         with self.lock:
-            self.cache.clear()
-            self.stats = CacheStats()
+            if self.l2 is None:
+                return 0
+            persisted = sum(1 for key, entry in self.cache.items() if self._spill_to_l2(key, entry))
+        self.flush_l2()
+        return persisted
+    
+    def flush_l2(self) -> int:
+        """把待写队列中的驱逐条目和删除标记写入二级缓存，必要时压缩日志，返回写入数量
+        
+        由后台线程或关闭时调用；按批持有 I/O 锁，落盘期间不持有分片锁。
+        """
+        written = 0
+        l2 = None
+        while True:
+            with self.l2_io_lock:
+                l2 = self.l2
+                if l2 is None:
+                    break
+                with self.l2_pending_lock:
+                    pending = self.l2_pending
+                    batch = [pending.popitem(last=False) for _ in range(min(len(pending), self.L2_FLUSH_BATCH))]
+                if not batch:
+                    break
+                for key, record in batch:
+                    if record is None:
+                        l2.delete(key)
+                    else:
+                        l2.put(key, *record)
+                written += len(batch)
+        if written:
+            l2.compact_if_needed()
+        return written
+    
+    def warm(self, key: str) -> bool:
+        """预热条目：不在一级缓存时从二级缓存提升，不计入命中统计；返回条目是否在一级缓存中"""
+        with self.lock:
+            if key in self.cache:
+                return True
+            if self.l2 is None:
+                return False
+        self._promote_from_l2(key, None)
+        with self.lock:
+            return key in self.cache
+    
+    def clear(self):
+        """清空缓存（包括二级缓存）"""
+        with self.l2_io_lock:
+            with self.lock:
+                self.read_buffer.clear()
+                self.cache.clear()
+                self.tag_index.clear()
+                if self.expiry_wheel is not None:
+                    self.expiry_wheel.clear()
+                self.policy.clear()
+                self.stats = CacheStats(policy=self.policy.name)
+                with self.l2_pending_lock:
+                    self.l2_pending.clear()
+                l2 = self.l2
+            if l2 is not None:
+                l2.clear()
     
     def get_stats(self) -> CacheStats:
         """获取缓存统计"""
         with self.lock:
+            self._drain_read_buffer()
+            
             # 计算命中率
             total_requests = self.stats.hit_count + self.stats.miss_count
             if total_requests > 0:
@@ -132,16 +1209,94 @@ class LRUCache:
             
             return self.stats
     
+    def _drain_read_buffer(self):
+        """回放读缓冲中的命中记录（需持有锁）"""
+        read_buffer = self.read_buffer
+        now = time.time()
+        while read_buffer:
+            key = read_buffer.popleft()
+            self.stats.hit_count += 1
+            entry = self.cache.get(key)
+            if entry is not None:
+                entry.access_count += 1
+                entry.last_access = now
+                self.stats.saved_seconds += entry.cost
+                self.policy.record_access(key)
+    
+    def _insert(self, key: str, value: Any, ttl: Optional[float], tags: Optional[List[str]],
+                size: Optional[int], version: Optional[int], cost: Optional[float] = None) -> Optional[CacheEntry]:
+        """写入条目（需持有锁），被淘汰策略拒绝接纳时返回 None"""
+        # 计算大小
+        if size is None:
+            size = self._estimate_size(value)
+        cost = cost if cost is not None else 0.0
+        
+        # 缓存已满时由淘汰策略决定是否接纳新键（替换已有键总是接纳）
+        if key not in self.cache and not self._has_space(size) and not self.policy.should_admit(key, cost, size):
+            self.stats.rejected_count += 1
+            return None
+        
+        # 如果键已存在，先移除旧条目
+        self._remove_entry(key)
+        
+        # 检查是否需要清理空间
+        if not self._has_space(size):
+            self._evict_entries(size)
+        
+        # 创建缓存条目
+        entry = CacheEntry(
+            key=key,
+            value=value,
+            timestamp=time.time(),
+            size=size,
+            ttl=ttl,
+            tags=tags if tags is not None else [],
+            version=version,
+            cost=cost
+        )
+        
+        # 添加新条目
+        self.cache[key] = entry
+        self.policy.record_cost(key, cost, size)
+        self.policy.record_insert(key)
+        if ttl and self.expiry_wheel is not None:
+            self.expiry_wheel.schedule(key, entry.timestamp + ttl)
+        tag_index = self.tag_index
+        for tag in entry.tags:
+            tag_index[tag].add(key)
+        
+        self.stats.total_size += size
+        self.stats.total_entries += 1
+        
+        return entry
+    
     def _remove_entry(self, key: str) -> bool:
-        """移除缓存条目（内部方法）"""
+        """移除一级缓存条目（内部方法），不访问二级缓存
+        
+        一个键的有效值只在一级或二级之一：淘汰时写入二级，提升时从二级删除，
+        因此替换、过期等一级内部的移除无需写二级；显式移除和按标签失效另行处理二级。
+        """
         if key in self.cache:
-            entry = self.cache[key]
+            entry = self.cache.pop(key)
             self.stats.total_size -= entry.size
             self.stats.total_entries -= 1
-            del self.cache[key]
+            self.policy.record_remove(key)
+            self._unindex_tags(key, entry)
             return True
         return False
     
+    def _unindex_tags(self, key: str, entry: CacheEntry):
+        """从标签索引和过期时间轮中移除条目（内部方法）"""
+        if entry.ttl and self.expiry_wheel is not None:
+            self.expiry_wheel.cancel(key)
+        tag_index = self.tag_index
+        for tag in entry.tags:
+            tagged_keys = tag_index.get(tag)
+            if tagged_keys is not None:
+                tagged_keys.discard(key)
+                if not tagged_keys:
+                    del tag_index[tag]
+    
     def _has_space(self, required_size: int) -> bool:
         """检查是否有足够空间"""
         return (self.stats.total_entries < self.max_size and 
@@ -154,27 +1309,256 @@ class LRUCache:
             if not self.cache:
                 break
             
-            # 移除最久未使用的条目
-            key, entry = self.cache.popitem(last=False)
-            self.stats.total_size -= entry.size
-            self.stats.total_entries -= 1
-            self.stats.eviction_count += 1
+            self._evict_one()
+    
+    def _evict_one(self) -> int:
+        """驱逐淘汰策略选出的一个条目，返回释放的字节数"""
+        key = self.policy.evict()
+        entry = self.cache.pop(key, None) if key is not None else None
+        if entry is None:
+            # 策略状态与缓存不一致时退化为驱逐任意条目
+            key = next(iter(self.cache))
+            entry = self.cache.pop(key)
+            self.policy.record_remove(key)
+        self._unindex_tags(key, entry)
+        self.stats.total_size -= entry.size
+        self.stats.total_entries -= 1
+        self.stats.eviction_count += 1
+        if self.l2 is not None:
+            self._spill_to_l2(key, entry)
+        return entry.size
+    
+    def _spill_to_l2(self, key: str, entry: CacheEntry) -> bool:
+        """把条目放入二级缓存待写队列（需持有锁），已过期的条目不写入"""
+        expire_at = entry.timestamp + entry.ttl if entry.ttl else None
+        if expire_at is not None and expire_at <= time.time():
+            return False
+        self._queue_l2(key, (entry.value, self.l2_version or '', list(entry.tags), expire_at, entry.cost))
+        return True
+    
+    def _queue_l2(self, key: str, record: Optional[Tuple[Any, str, List[str], Optional[float], float]]):
+        """把写入或删除标记（record 为 None）放入待写队列，同一个键只保留最后一次操作"""
+        with self.l2_pending_lock:
+            self.l2_pending.pop(key, None)
+            self.l2_pending[key] = record
+    
+    def _discard_pending(self, matches: Callable[[List[str]], bool]) -> int:
+        """把待写队列中标签满足 matches 的写入改为删除标记（需持有锁），返回改写数量
+        
+        改为删除而不是直接丢弃：磁盘上可能还有该键更早的副本。
+        """
+        discarded = 0
+        with self.l2_pending_lock:
+            for key, record in self.l2_pending.items():
+                if record is not None and matches(record[2]):
+                    self.l2_pending[key] = None
+                    discarded += 1
+        return discarded
+    
+    def _check_l2_backlog(self):
+        """待写队列过长时（后台线程未启动或跟不上）在分片锁外自行落盘"""
+        if len(self.l2_pending) > self.L2_PENDING_LIMIT:
+            self.flush_l2()
+    
+    def _promote_from_l2(self, key: str, version: Optional[int]) -> Optional[Tuple[Any, float]]:
+        """从二级缓存读取条目并提升到一级（不能持有分片锁），返回 (值, 计算代价)
+        
+        先查待写队列：删除标记视为未命中，排队中的写入直接使用；否则读磁盘。
+        写入一级后为二级中的副本排队删除标记；淘汰策略拒绝接纳时条目留在二级，值照常返回。
+        读取期间该键在一级或待写队列中有了新的操作时不再提升，避免覆盖更新的值或恢复已删除的条目。
+        只读取标记为当前规则库哈希的条目，共享磁盘文件的其他进程在不同规则库下写入的条目不会被使用。
+        """
+        with self.l2_io_lock:
+            l2, l2_version = self.l2, self.l2_version
+            if l2 is None or l2_version is None:
+                return None
+            with self.l2_pending_lock:
+                queued = key in self.l2_pending
+                pending = self.l2_pending.get(key)
+            if pending is not None:
+                value, record_version, tags, expire_at, cost = pending
+                if record_version != l2_version or (expire_at is not None and expire_at <= time.time()):
+                    return None
+            elif queued:
+                return None
+            else:
+                record = l2.get(key, l2_version)
+                if record is None:
+                    return None
+                value, tags, expire_at, cost = record
+            
+            with self.lock:
+                with self.l2_pending_lock:
+                    changed = (key in self.l2_pending) != queued or self.l2_pending.get(key) is not pending
+                if not changed and key not in self.cache:
+                    ttl = expire_at - time.time() if expire_at is not None else None
+                    if self._insert(key, value, ttl, tags, None, version, cost) is not None:
+                        self._queue_l2(key, None)
+            return value, cost
     
     def _estimate_size(self, value: Any) -> int:
         """估算值的大小"""
         try:
-            # 使用pickle估算大小
-            return len(pickle.dumps(value))
-        except:
-            # 如果pickle失败，使用字符串长度估算
-            return len(str(value))
+            return self.sizer(value)
+        except Exception as e:
+            logger.warning(f"缓存大小估算失败: {e}")
+            return sys.getsizeof(value)
+
+
+class ShardedLRUCache:
+    """分片缓存
+    
+    按键哈希分到 num_shards 个独立的 LRUCache 分片，各分片有自己的锁、淘汰策略和统计，
+    并发请求只在同一分片上竞争；条目数和内存上限按分片均分，全局上限近似保持。
+    接口与 LRUCache 相同，统计在读取时汇总。
+    
+    eviction_policy 为策略名称、策略类或工厂函数，每个分片按分片容量各创建一个策略；
+    策略实例不能在分片间共享，多于一个分片时传入实例会抛出 ValueError。
+    """
+    
+    def __init__(self, max_size: int = 1000, max_memory_mb: int = 100,
+                 sizer: Optional[Callable[[Any], int]] = None,
+                 eviction_policy: Union[str, EvictionPolicy, Callable[[int], EvictionPolicy]] = 'lru',
+                 num_shards: int = 16, buffered_reads: bool = False):
+        self.max_size = max_size
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024
+        self.num_shards = max(1, num_shards)
+        if isinstance(eviction_policy, EvictionPolicy) and self.num_shards > 1:
+            raise ValueError("分片缓存的各分片不能共享同一个淘汰策略实例，请传入策略名称或工厂函数")
+        shard_size = max(1, -(-max_size // self.num_shards))
+        shard_memory = self.max_memory_bytes // self.num_shards
+        sizer = sizer if sizer is not None else RecursiveSizer()
+        self.shards: List[LRUCache] = []
+        for _ in range(self.num_shards):
+            shard = LRUCache(shard_size, 0, sizer, eviction_policy, buffered_reads)
+            shard.max_memory_bytes = shard_memory
+            self.shards.append(shard)
+    
+    def _shard(self, key: str) -> LRUCache:
+        return self.shards[hash(key) % self.num_shards]
+    
+    def get(self, key: str, version: Optional[int] = None) -> Optional[Any]:
+        """获取缓存值"""
+        return self._shard(key).get(key, version)
+    
+    def put(self, key: str, value: Any, ttl: Optional[float] = None, 
+            tags: Optional[List[str]] = None, size: Optional[int] = None,
+            version: Optional[int] = None, cost: Optional[float] = None) -> bool:
+        """放入缓存"""
+        return self._shard(key).put(key, value, ttl, tags, size, version, cost)
+    
+    def remove(self, key: str) -> bool:
+        """移除缓存条目"""
+        return self._shard(key).remove(key)
+    
+    def remove_by_tags(self, tags: List[str]) -> int:
+        """移除带有任一指定标签的条目，返回移除数量"""
+        return sum(shard.remove_by_tags(tags) for shard in self.shards)
+    
+    def remove_by_tag_weights(self, tag_weights: Dict[str, float], min_weight: float) -> int:
+        """移除所带标签权重之和不低于 min_weight 的条目，返回移除数量"""
+        return sum(shard.remove_by_tag_weights(tag_weights, min_weight) for shard in self.shards)
+    
+    def enable_expiry_wheel(self, tick_interval: float = 1.0):
+        """为各分片启用过期时间轮"""
+        for shard in self.shards:
+            shard.enable_expiry_wheel(tick_interval)
+    
+    def expire_entries(self, now: Optional[float] = None) -> int:
+        """逐个分片删除到期条目，返回删除数量"""
+        return sum(shard.expire_entries(now) for shard in self.shards)
+    
+    def set_ttl(self, key: str, ttl: float) -> bool:
+        """调整条目TTL"""
+        return self._shard(key).set_ttl(key, ttl)
+    
+    def get_access_intervals(self) -> Dict[str, float]:
+        """汇总各分片条目的平均访问间隔"""
+        intervals: Dict[str, float] = {}
+        for shard in self.shards:
+            intervals.update(shard.get_access_intervals())
+        return intervals
+    
+    def evict_bytes(self, bytes_to_free: int) -> int:
+        """各分片按比例驱逐条目，返回实际释放的字节数"""
+        freed = 0
+        share = -(-bytes_to_free // self.num_shards)
+        for shard in self.shards:
+            freed += shard.evict_bytes(min(share, bytes_to_free - freed))
+            if freed >= bytes_to_free:
+                return freed
+        # 部分分片不足时由其余分片补足
+        for shard in self.shards:
+            if freed >= bytes_to_free:
+                break
+            freed += shard.evict_bytes(bytes_to_free - freed)
+        return freed
+    
+    def attach_l2(self, l2: Optional[DiskCache], version: Optional[str] = None):
+        """为各分片挂载同一个磁盘二级缓存"""
+        for shard in self.shards:
+            shard.attach_l2(l2, version)
+    
+    def set_l2_version(self, version: str):
+        """设置二级缓存条目版本"""
+        for shard in self.shards:
+            shard.set_l2_version(version)
+    
+    def persist_to_l2(self) -> int:
+        """把各分片的条目写入二级缓存，返回写入数量"""
+        return sum(shard.persist_to_l2() for shard in self.shards)
+    
+    def flush_l2(self) -> int:
+        """把各分片的二级缓存待写队列落盘，返回写入数量"""
+        return sum(shard.flush_l2() for shard in self.shards)
+    
+    def warm(self, key: str) -> bool:
+        """预热条目"""
+        return self._shard(key).warm(key)
+    
+    def clear(self):
+        """清空缓存"""
+        for shard in self.shards:
+            shard.clear()
+    
+    def get_stats(self) -> CacheStats:
+        """汇总各分片统计"""
+        stats = CacheStats(policy=self.shards[0].policy.name)
+        for shard in self.shards:
+            shard_stats = shard.get_stats()
+            stats.total_entries += shard_stats.total_entries
+            stats.total_size += shard_stats.total_size
+            stats.hit_count += shard_stats.hit_count
+            stats.miss_count += shard_stats.miss_count
+            stats.eviction_count += shard_stats.eviction_count
+            stats.expired_count += shard_stats.expired_count
+            stats.l2_hit_count += shard_stats.l2_hit_count
+            stats.rejected_count += shard_stats.rejected_count
+            stats.saved_seconds += shard_stats.saved_seconds
+        
+        total_requests = stats.hit_count + stats.miss_count
+        if total_requests > 0:
+            stats.hit_rate = stats.hit_count / total_requests
+        return stats
+
+
+def _create_cache(max_entries: int, max_memory_mb: int, sizer: Optional[Callable[[Any], int]],
+                  eviction_policy: Union[str, EvictionPolicy, Callable[[int], EvictionPolicy]],
+                  num_shards: int, buffered_reads: bool) -> Union[LRUCache, ShardedLRUCache]:
+    """num_shards 大于1时创建分片缓存，否则创建单个 LRUCache"""
+    if num_shards > 1:
+        return ShardedLRUCache(max_entries, max_memory_mb, sizer, eviction_policy, num_shards, buffered_reads)
+    return LRUCache(max_entries, max_memory_mb, sizer, eviction_policy, buffered_reads)
 
 
 class RuleCache:
     """规则缓存"""
     
-    def __init__(self, max_rules: int = 500, max_memory_mb: int = 50):
-        self.cache = LRUCache(max_rules, max_memory_mb)
+    def __init__(self, max_rules: int = 500, max_memory_mb: int = 50,
+                 sizer: Optional[Callable[[Any], int]] = None,
+                 eviction_policy: Union[str, EvictionPolicy, Callable[[int], EvictionPolicy]] = 'lru',
+                 num_shards: int = 1, buffered_reads: bool = False):
+        self.cache = _create_cache(max_rules, max_memory_mb, sizer, eviction_policy, num_shards, buffered_reads)
         self.rule_hashes: Dict[str, str] = {}  # rule_id -> content_hash
         self.lock = Lock()
     
@@ -218,6 +1602,10 @@ class RuleCache:
         
         return self.cache.remove(f"rule:{rule_id}")
     
+    def warm_rule(self, rule_id: str) -> bool:
+        """从二级缓存预热规则"""
+        return self.cache.warm(f"rule:{rule_id}")
+    
     def _calculate_rule_hash(self, rule: Any) -> str:
         """计算规则内容哈希"""
         try:
@@ -253,64 +1641,258 @@ class RuleCache:
 class ResultCache:
     """结果缓存"""
     
-    def __init__(self, max_results: int = 1000, max_memory_mb: int = 100):
-        self.cache = LRUCache(max_results, max_memory_mb)
+    def __init__(self, max_results: int = 1000, max_memory_mb: int = 100,
+                 sizer: Optional[Callable[[Any], int]] = None,
+                 eviction_policy: Union[str, EvictionPolicy, Callable[[int], EvictionPolicy]] = 'lru',
+                 num_shards: int = 1, buffered_reads: bool = False):
+        # 结果多为同构的 ExecutionResult 列表，默认抽样估算大小
+        self.cache = _create_cache(max_results, max_memory_mb, sizer if sizer is not None else SampledSizer(),
+                                   eviction_policy, num_shards, buffered_reads)
     
-    def cache_result(self, input_hash: str, result: Any, ttl: float = 1800) -> bool:
-        """缓存结果"""
+    def cache_result(self, input_hash: str, result: Any, ttl: float = 1800,
+                     version: Optional[int] = None, rule_ids: Optional[List[str]] = None,
+                     fields: Optional[List[str]] = None, cost: Optional[float] = None) -> bool:
+        """缓存结果
+        
+        rule_ids 为参与产生该结果的规则，fields 为输入中出现的字段，分别记为 rule:/field: 标签，
+        用于规则变更时按依赖失效；cost 为计算该结果耗费的时间（秒），供代价感知淘汰和节省时间统计使用。
+        """
+        tags = ['result']
+        if rule_ids:
+            tags.extend(f"rule:{rule_id}" for rule_id in rule_ids)
+        if fields:
+            tags.extend(f"field:{field_name}" for field_name in fields)
         return self.cache.put(
             key=f"result:{input_hash}",
             value=result,
-            tags=['result'],
-            ttl=ttl
+            tags=tags,
+            ttl=ttl,
+            version=version,
+            cost=cost
         )
     
-    def get_result(self, input_hash: str) -> Optional[Any]:
+    def get_result(self, input_hash: str, version: Optional[int] = None) -> Optional[Any]:
         """获取缓存的结果"""
-        return self.cache.get(f"result:{input_hash}")
+        return self.cache.get(f"result:{input_hash}", version)
     
     def invalidate_by_tags(self, tags: List[str]) -> int:
         """根据标签使缓存失效"""
-        # 这里需要实现标签匹配的失效逻辑
-        # 简化实现，实际应该遍历所有条目检查标签
-        return 0
+        return self.cache.remove_by_tags(tags)
+    
+    def invalidate_rule(self, rule_id: str) -> int:
+        """使规则参与过的缓存结果失效"""
+        return self.invalidate_by_tags([f"rule:{rule_id}"])
+    
+    def invalidate_by_fields(self, field_weights: Dict[str, float], min_weight: float) -> int:
+        """使输入字段权重之和不低于 min_weight 的缓存结果失效（即规则可能匹配的输入）"""
+        return self.cache.remove_by_tag_weights(
+            {f"field:{field_name}": weight for field_name, weight in field_weights.items()}, min_weight
+        )
+    
+    def warm_result(self, input_hash: str) -> bool:
+        """从二级缓存预热结果"""
+        return self.cache.warm(f"result:{input_hash}")
+
+
+class AccessLog:
+    """访问日志：记录规则ID和输入指纹的访问次数，用于启动时预热
+    
+    只保存计数；某类条目超过 max_entries 时保留计数最高的一半并把计数减半，旧热点随之衰减。
+    日志以JSON保存，写入临时文件后原子替换。
+    """
+    
+    def __init__(self, path: Optional[str] = None, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.rule_counts: Dict[str, int] = {}
+        self.result_counts: Dict[str, int] = {}
+        self.lock = Lock()
+        if path is not None and os.path.exists(path):
+            self.load()
+    
+    def record_rule(self, rule_id: str):
+        """记录一次规则访问"""
+        with self.lock:
+            self.rule_counts = self._record(self.rule_counts, rule_id)
+    
+    def record_rules(self, rule_ids: List[str]):
+        """记录多次规则访问"""
+        with self.lock:
+            for rule_id in rule_ids:
+                self.rule_counts = self._record(self.rule_counts, rule_id)
+    
+    def record_result(self, input_hash: str):
+        """记录一次结果访问"""
+        with self.lock:
+            self.result_counts = self._record(self.result_counts, input_hash)
+    
+    def top_rules(self, k: int) -> List[Tuple[str, int]]:
+        """访问最多的 k 个规则ID及次数"""
+        with self.lock:
+            return heapq.nlargest(k, self.rule_counts.items(), key=itemgetter(1))
+    
+    def top_results(self, k: int) -> List[Tuple[str, int]]:
+        """访问最多的 k 个输入指纹及次数"""
+        with self.lock:
+            return heapq.nlargest(k, self.result_counts.items(), key=itemgetter(1))
+    
+    def load(self) -> bool:
+        """从文件加载访问日志"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with self.lock:
+                self.rule_counts = {str(key): int(count) for key, count in data.get('rules', {}).items()}
+                self.result_counts = {str(key): int(count) for key, count in data.get('results', {}).items()}
+            return True
+        except Exception as e:
+            logger.error(f"访问日志加载失败: {e}")
+            return False
+    
+    def save(self) -> bool:
+        """保存访问日志"""
+        if self.path is None:
+            return False
+        try:
+            with self.lock:
+                data = {'rules': dict(self.rule_counts), 'results': dict(self.result_counts)}
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+            return True
+        except Exception as e:
+            logger.error(f"访问日志保存失败: {e}")
+            return False
+    
+    def _record(self, counts: Dict[str, int], key: str) -> Dict[str, int]:
+        """计数加一（需持有锁），超过上限时裁剪，返回（可能替换后的）计数表"""
+        counts[key] = counts.get(key, 0) + 1
+        if len(counts) > self.max_entries:
+            keep = heapq.nlargest(self.max_entries // 2, counts.items(), key=itemgetter(1))
+            counts = {item_key: max(1, count // 2) for item_key, count in keep}
+        return counts
+
+
+class _RateLimiter:
+    """按固定速率放行的限速器（多线程共享）"""
+    
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_time = time.monotonic()
+        self.lock = Lock()
+    
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            scheduled = max(now, self.next_time)
+            self.next_time = scheduled + self.interval
+        if scheduled > now:
+            time.sleep(scheduled - now)
 
 
 class CachePreloader:
-    """缓存预加载器"""
+    """缓存预加载器
     
-    def __init__(self, rule_cache: RuleCache, result_cache: ResultCache):
+    手动预加载队列为按优先级排列的堆；配置访问日志时可按日志中最热的规则和结果在后台预热缓存。
+    """
+    
+    def __init__(self, rule_cache: RuleCache, result_cache: ResultCache,
+                 access_log: Optional[AccessLog] = None):
         self.rule_cache = rule_cache
         self.result_cache = result_cache
-        self.preload_queue: List[Tuple[str, Any]] = []
+        self.access_log = access_log
+        # 堆元素为 (-priority, 序号, rule)，序号保持同优先级规则的添加顺序
+        self.preload_queue: List[Tuple[int, int, Any]] = []
+        self._preload_seq = 0
+        self.warmup_thread: Optional[Thread] = None
         self.lock = Lock()
     
     def add_preload_rule(self, rule: Any, priority: int = 0):
         """添加预加载规则"""
         with self.lock:
-            self.preload_queue.append((rule, priority))
-            # 按优先级排序
-            self.preload_queue.sort(key=lambda x: x[1], reverse=True)
+            heapq.heappush(self.preload_queue, (-priority, self._preload_seq, rule))
+            self._preload_seq += 1
     
     def preload_rules(self, max_rules: int = 50):
         """预加载规则"""
         with self.lock:
-            rules_to_preload = self.preload_queue[:max_rules]
-            self.preload_queue = self.preload_queue[max_rules:]
+            rules_to_preload = [heapq.heappop(self.preload_queue)[2]
+                                for _ in range(min(max_rules, len(self.preload_queue)))]
         
-        for rule, priority in rules_to_preload:
+        for rule in rules_to_preload:
             try:
                 self.rule_cache.cache_rule(rule)
                 logger.info(f"预加载规则: {getattr(rule, 'rule_id', 'unknown')}")
             except Exception as e:
                 logger.error(f"规则预加载失败: {e}")
     
+    def warmup(self, rule_loader: Optional[Callable[[str], Any]] = None, top_k: int = 100,
+               rate: float = 50.0, workers: int = 4) -> int:
+        """按访问日志预热缓存（阻塞），返回预热成功的条目数
+        
+        取访问最多的 top_k 个规则和 top_k 个结果，由 workers 个线程并行回放，整体不超过每秒 rate 个。
+        规则由 rule_loader(rule_id) 加载后缓存，未提供 rule_loader 时从二级缓存提升；
+        结果只能从二级缓存提升（输入指纹无法还原输入）。
+        """
+        if self.access_log is None:
+            return 0
+        
+        tasks: List[Tuple[Callable[[str], bool], str]] = []
+        tasks.extend((lambda rule_id: self._warm_rule(rule_id, rule_loader), rule_id)
+                     for rule_id, _ in self.access_log.top_rules(top_k))
+        tasks.extend((self.result_cache.warm_result, input_hash)
+                     for input_hash, _ in self.access_log.top_results(top_k))
+        if not tasks:
+            return 0
+        
+        limiter = _RateLimiter(rate)
+        
+        def run(task: Tuple[Callable[[str], bool], str]) -> bool:
+            limiter.wait()
+            warm, key = task
+            try:
+                return bool(warm(key))
+            except Exception as e:
+                logger.error(f"缓存预热失败: {e}")
+                return False
+        
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            warmed = sum(executor.map(run, tasks))
+        logger.info(f"缓存预热完成: {warmed}/{len(tasks)}")
+        return warmed
+    
+    def start_warmup(self, rule_loader: Optional[Callable[[str], Any]] = None, top_k: int = 100,
+                     rate: float = 50.0, workers: int = 4) -> Optional[Thread]:
+        """在后台线程中预热缓存"""
+        if self.access_log is None:
+            return None
+        with self.lock:
+            if self.warmup_thread is not None and self.warmup_thread.is_alive():
+                return self.warmup_thread
+            self.warmup_thread = Thread(target=self.warmup, args=(rule_loader, top_k, rate, workers),
+                                        name="cache-warmup", daemon=True)
+            self.warmup_thread.start()
+            return self.warmup_thread
+    
+    def _warm_rule(self, rule_id: str, rule_loader: Optional[Callable[[str], Any]]) -> bool:
+        if rule_loader is not None:
+            rule = rule_loader(rule_id)
+            return rule is not None and self.rule_cache.cache_rule(rule)
+        return self.rule_cache.warm_rule(rule_id)
+    
     def preload_frequent_results(self, input_data_list: List[Dict[str, Any]], 
                                result_generator):
         """预加载频繁使用的结果"""
         for input_data in input_data_list:
             try:
                 input_hash = self._calculate_input_hash(input_data)
+                if input_hash is None:
+                    continue
                 
                 # 检查是否已缓存
                 if self.result_cache.get_result(input_hash) is None:
@@ -322,14 +1904,16 @@ class CachePreloader:
             except Exception as e:
                 logger.error(f"结果预加载失败: {e}")
     
-    def _calculate_input_hash(self, input_data: Dict[str, Any]) -> str:
-        """计算输入数据哈希"""
+    def _calculate_input_hash(self, input_data: Dict[str, Any]) -> Optional[str]:
+        """计算输入数据哈希，失败时返回 None（不缓存）"""
         try:
-            data_str = json.dumps(input_data, sort_keys=True)
-            return hashlib.md5(data_str.encode()).hexdigest()
+            return compute_fingerprint(input_data)
+        except TypeError as e:
+            logger.debug(f"输入含不支持的类型，不缓存: {e}")
+            return None
         except Exception as e:
             logger.error(f"输入哈希计算失败: {e}")
-            return str(hash(str(input_data)))
+            return None
 
 
 class CacheOptimizer:
@@ -359,26 +1943,39 @@ class CacheOptimizer:
         except Exception as e:
             logger.error(f"缓存大小优化失败: {e}")
     
-    def optimize_ttl(self, access_patterns: Dict[str, float]):
-        """优化TTL设置"""
+    def optimize_ttl(self, access_patterns: Optional[Dict[str, float]] = None,
+                     min_ttl: float = 1.0) -> int:
+        """优化TTL设置，返回调整的条目数
+        
+        access_patterns 为 缓存键 -> 平均访问间隔（秒），未给出时从两个缓存的条目访问记录估算。
+        """
+        applied = 0
         try:
+            caches = [self.rule_cache.cache, self.result_cache.cache]
+            if access_patterns is None:
+                access_patterns = {}
+                for cache in caches:
+                    access_patterns.update(cache.get_access_intervals())
+            
             # 根据访问模式调整TTL
             for key, avg_access_interval in access_patterns.items():
                 # 设置TTL为平均访问间隔的2倍
-                optimal_ttl = avg_access_interval * 2
-                
-                # 这里需要实现TTL调整逻辑
-                # 简化实现
-                logger.info(f"建议为 {key} 设置TTL: {optimal_ttl:.2f}秒")
+                optimal_ttl = max(avg_access_interval * 2, min_ttl)
+                if any(cache.set_ttl(key, optimal_ttl) for cache in caches):
+                    applied += 1
+                    logger.debug(f"为 {key} 设置TTL: {optimal_ttl:.2f}秒")
+            
+            logger.info(f"TTL优化完成，调整了 {applied} 个条目")
                 
         except Exception as e:
             logger.error(f"TTL优化失败: {e}")
+        
+        return applied
     
     def _cleanup_least_used(self, bytes_to_free: int):
-        """清理最少使用的条目"""
-        # 这里需要实现基于使用频率的清理逻辑
-        # 简化实现
-        pass
+        """按规则缓存的淘汰策略清理条目，直到释放指定字节数"""
+        freed = self.rule_cache.cache.evict_bytes(bytes_to_free)
+        logger.info(f"按 {self.rule_cache.cache.get_stats().policy} 策略清理规则缓存，释放 {freed} 字节")
     
     def get_optimization_suggestions(self) -> List[Dict[str, Any]]:
         """获取优化建议"""
@@ -405,6 +2002,19 @@ class CacheOptimizer:
                     'suggestion': '考虑增加缓存大小或优化缓存策略'
                 })
             
+            # 节省的计算时间：命中条目的计算代价之和，比命中率更能反映结果缓存的价值
+            if result_stats.hit_count > 0:
+                saved_per_hit_ms = result_stats.saved_seconds / result_stats.hit_count * 1000
+                suggestions.append({
+                    'type': 'compute_saved',
+                    'component': 'result_cache',
+                    'message': (f'结果缓存已节省计算时间 {result_stats.saved_seconds:.3f}秒'
+                                f'（命中 {result_stats.hit_count} 次，平均每次 {saved_per_hit_ms:.2f}毫秒）'),
+                    'saved_seconds': result_stats.saved_seconds,
+                    'suggestion': ('当前淘汰策略已按计算代价淘汰' if result_stats.policy == GDSFPolicy.name
+                                   else '计算代价差异较大时考虑使用代价感知的 gdsf 淘汰策略')
+                })
+            
             # 检查内存使用
             rule_memory_mb = rule_stats.total_size / (1024 * 1024)
             if rule_memory_mb > 50:
@@ -425,12 +2035,36 @@ class RuleCacheManager:
     """规则缓存管理器"""
     
     def __init__(self, max_rules: int = 500, max_results: int = 1000, 
-                 max_memory_mb: int = 200):
-        self.rule_cache = RuleCache(max_rules, max_memory_mb // 2)
-        self.result_cache = ResultCache(max_results, max_memory_mb // 2)
-        self.preloader = CachePreloader(self.rule_cache, self.result_cache)
+                 max_memory_mb: int = 200, sizer: Optional[Callable[[Any], int]] = None,
+                 rule_cache_policy: str = 'lru', result_cache_policy: str = 'lru',
+                 num_shards: int = 1, buffered_reads: bool = False,
+                 l2_dir: Optional[str] = None, l2_max_mb: int = 256,
+                 shared_cache: Optional[SharedMemoryCache] = None,
+                 access_log_path: Optional[str] = None):
+        self.rule_cache = RuleCache(max_rules, max_memory_mb // 2, sizer, rule_cache_policy,
+                                    num_shards, buffered_reads)
+        self.result_cache = ResultCache(max_results, max_memory_mb // 2, sizer, result_cache_policy,
+                                        num_shards, buffered_reads)
+        # 访问日志：记录规则和结果的访问次数，关闭时保存，启动时用于预热（见 start_warmup）
+        self.access_log = AccessLog(access_log_path) if access_log_path is not None else None
+        self.preloader = CachePreloader(self.rule_cache, self.result_cache, self.access_log)
         self.optimizer = CacheOptimizer(self.rule_cache, self.result_cache)
+        self.expiry_sweeper: Optional[ExpirySweeper] = None
         self.lock = Lock()
+        
+        # 磁盘二级缓存：l2_dir 下的 rules.log / results.log，容量各占 l2_max_mb 的一半
+        self.l2_caches: Dict[str, DiskCache] = {}
+        self.library_hash: Optional[str] = None
+        if l2_dir is not None:
+            for name, cache in (('rules', self.rule_cache.cache), ('results', self.result_cache.cache)):
+                # 写入不在请求路径上触发压缩，由后台落盘（flush_l2）或 close 压缩
+                l2 = DiskCache(os.path.join(l2_dir, f"{name}.log"), l2_max_mb * 1024 * 1024 // 2,
+                               auto_compact=False)
+                cache.attach_l2(l2)
+                self.l2_caches[name] = l2
+        
+        # 跨进程共享结果缓存：键带规则库内容哈希，只在规则库内容相同的进程间共享
+        self.shared_cache = shared_cache
     
     def cache_rule(self, rule: Any) -> bool:
         """缓存规则"""
@@ -438,26 +2072,106 @@ class RuleCacheManager:
     
     def get_rule(self, rule_id: str) -> Optional[Any]:
         """获取缓存的规则"""
+        if self.access_log is not None:
+            self.access_log.record_rule(rule_id)
         return self.rule_cache.get_rule(rule_id)
     
-    def cache_result(self, input_data: Dict[str, Any], result: Any, ttl: float = 1800) -> bool:
-        """缓存结果"""
+    def cache_result(self, input_data: Dict[str, Any], result: Any, ttl: float = 1800,
+                     version: Optional[int] = None, rule_ids: Optional[List[str]] = None,
+                     fields: Optional[List[str]] = None, cost: Optional[float] = None) -> bool:
+        """缓存结果，version 为规则库版本号，rule_ids 为参与产生该结果的规则，fields 为输入字段，
+        cost 为计算耗时（秒）"""
         input_hash = self._calculate_input_hash(input_data)
-        return self.result_cache.cache_result(input_hash, result, ttl)
+        if input_hash is None:
+            return False
+        cached = self.result_cache.cache_result(input_hash, result, ttl, version, rule_ids, fields, cost)
+        if self.access_log is not None and rule_ids:
+            self.access_log.record_rules(rule_ids)
+        if self.shared_cache is not None:
+            shared_key = self._shared_key(input_hash)
+            if shared_key is not None:
+                expire_at = time.time() + ttl if ttl else None
+                self.shared_cache.put(shared_key, (result, rule_ids, fields, expire_at, cost), ttl)
+        return cached
     
-    def get_result(self, input_data: Dict[str, Any]) -> Optional[Any]:
-        """获取缓存的结果"""
+    def get_result(self, input_data: Dict[str, Any], version: Optional[int] = None) -> Optional[Any]:
+        """获取缓存的结果，指定 version 时只返回同一规则库版本下缓存的结果
+        
+        本进程缓存未命中时查找共享缓存（只在未指定 version 时），命中的结果连同依赖标签写回本进程缓存。
+        """
         input_hash = self._calculate_input_hash(input_data)
-        return self.result_cache.get_result(input_hash)
+        if input_hash is None:
+            return None
+        if self.access_log is not None:
+            self.access_log.record_result(input_hash)
+        result = self.result_cache.get_result(input_hash, version)
+        if result is None and version is None and self.shared_cache is not None:
+            result = self._get_shared_result(input_hash)
+        return result
     
     def invalidate_rule(self, rule_id: str) -> bool:
         """使规则缓存失效"""
         return self.rule_cache.invalidate_rule(rule_id)
     
+    def invalidate_rule_results(self, rule_id: str, field_weights: Optional[Dict[str, float]] = None,
+                                min_weight: float = 0.0) -> int:
+        """使规则相关的缓存结果失效，返回失效条目数
+        
+        移除规则参与过的结果；给出 field_weights 时，还移除输入字段权重之和不低于 min_weight
+        （规则可能匹配）的结果。
+        """
+        removed = self.result_cache.invalidate_rule(rule_id)
+        if field_weights:
+            removed += self.result_cache.invalidate_by_fields(field_weights, min_weight)
+        return removed
+    
     def clear_all(self):
         """清空所有缓存"""
         self.rule_cache.cache.clear()
         self.result_cache.cache.clear()
+        if self.shared_cache is not None:
+            self.shared_cache.clear()
+    
+    def set_library_hash(self, library_hash: str):
+        """设置规则库内容哈希
+        
+        哈希每次变化时丢弃二级缓存中其他规则库内容下写入的条目（共享同一磁盘文件的其他进程
+        写入的也在内），首次设置之前不读取二级缓存；此后写入二级缓存的条目都标记为当前哈希。
+        应在规则加载完成后首次设置，否则持久化的条目会按空规则库的哈希被全部丢弃。
+        """
+        with self.lock:
+            if library_hash != self.library_hash:
+                self.library_hash = library_hash
+                for name, l2 in self.l2_caches.items():
+                    discarded = l2.discard_stale(library_hash)
+                    if discarded:
+                        logger.info(f"二级缓存 {name} 丢弃了 {discarded} 个规则库变更前的条目")
+            self.rule_cache.cache.set_l2_version(library_hash)
+            self.result_cache.cache.set_l2_version(library_hash)
+    
+    def close(self):
+        """关闭缓存：停止过期清理线程，保存访问日志，把一级缓存条目写入二级缓存并压缩日志，解除共享缓存映射"""
+        self.stop_expiry_sweeper()
+        if self.access_log is not None:
+            self.access_log.save()
+        if self.shared_cache is not None:
+            self.shared_cache.close()
+            self.shared_cache = None
+        if not self.l2_caches:
+            return
+        with self.lock:
+            library_hash = self.library_hash
+        for cache in (self.rule_cache.cache, self.result_cache.cache):
+            if library_hash is not None:
+                cache.persist_to_l2()
+            cache.attach_l2(None)
+        for l2 in self.l2_caches.values():
+            try:
+                # 哈希变化时已丢弃旧条目，存活条目都带有写入时的规则库哈希，压缩时不改写
+                l2.compact()
+            except OSError as e:
+                logger.error(f"二级缓存压缩失败: {e}")
+            l2.close()
     
     def preload_rules(self, rules: List[Any], max_rules: int = 50):
         """预加载规则"""
@@ -469,6 +2183,28 @@ class RuleCacheManager:
         """优化缓存"""
         self.optimizer.optimize_cache_size(target_memory_mb)
     
+    def optimize_ttl(self, access_patterns: Optional[Dict[str, float]] = None) -> int:
+        """按访问间隔调整条目TTL，返回调整的条目数"""
+        return self.optimizer.optimize_ttl(access_patterns)
+    
+    def start_warmup(self, rule_loader: Optional[Callable[[str], Any]] = None, top_k: int = 100,
+                     rate: float = 50.0, workers: int = 4) -> Optional[Thread]:
+        """按访问日志在后台预热缓存（见 CachePreloader.warmup），未配置访问日志时返回 None"""
+        return self.preloader.start_warmup(rule_loader, top_k, rate, workers)
+    
+    def start_expiry_sweeper(self, interval: float = 1.0):
+        """启动后台过期清理线程"""
+        with self.lock:
+            if self.expiry_sweeper is None:
+                self.expiry_sweeper = ExpirySweeper([self.rule_cache.cache, self.result_cache.cache], interval)
+            self.expiry_sweeper.start()
+    
+    def stop_expiry_sweeper(self):
+        """停止后台过期清理线程"""
+        with self.lock:
+            if self.expiry_sweeper is not None:
+                self.expiry_sweeper.stop()
+    
     def get_cache_stats(self) -> Dict[str, Any]:
         """获取缓存统计信息"""
         rule_stats = self.rule_cache.cache.get_stats()
@@ -476,33 +2212,68 @@ class RuleCacheManager:
         
         return {
             'rule_cache': {
+                'policy': rule_stats.policy,
                 'total_entries': rule_stats.total_entries,
                 'total_size_mb': rule_stats.total_size / (1024 * 1024),
                 'hit_rate': rule_stats.hit_rate,
                 'hit_count': rule_stats.hit_count,
                 'miss_count': rule_stats.miss_count,
-                'eviction_count': rule_stats.eviction_count
+                'eviction_count': rule_stats.eviction_count,
+                'expired_count': rule_stats.expired_count,
+                'rejected_count': rule_stats.rejected_count,
+                'l2_hit_count': rule_stats.l2_hit_count,
+                'saved_seconds': rule_stats.saved_seconds
             },
             'result_cache': {
+                'policy': result_stats.policy,
                 'total_entries': result_stats.total_entries,
                 'total_size_mb': result_stats.total_size / (1024 * 1024),
                 'hit_rate': result_stats.hit_rate,
                 'hit_count': result_stats.hit_count,
                 'miss_count': result_stats.miss_count,
-                'eviction_count': result_stats.eviction_count
+                'eviction_count': result_stats.eviction_count,
+                'expired_count': result_stats.expired_count,
+                'rejected_count': result_stats.rejected_count,
+                'l2_hit_count': result_stats.l2_hit_count,
+                'saved_seconds': result_stats.saved_seconds
             },
-            'total_memory_mb': (rule_stats.total_size + result_stats.total_size) / (1024 * 1024)
+            'total_memory_mb': (rule_stats.total_size + result_stats.total_size) / (1024 * 1024),
+            'l2': {name: l2.get_stats() for name, l2 in self.l2_caches.items()},
+            'shared': self.shared_cache.get_stats() if self.shared_cache is not None else None
         }
     
     def get_optimization_suggestions(self) -> List[Dict[str, Any]]:
         """获取优化建议"""
         return self.optimizer.get_optimization_suggestions()
     
-    def _calculate_input_hash(self, input_data: Dict[str, Any]) -> str:
-        """计算输入数据哈希"""
+    def _calculate_input_hash(self, input_data: Dict[str, Any]) -> Optional[str]:
+        """计算输入数据哈希，失败时返回 None（不缓存）"""
         try:
-            data_str = json.dumps(input_data, sort_keys=True)
-            return hashlib.md5(data_str.encode()).hexdigest()
+            return compute_fingerprint(input_data)
+        except TypeError as e:
+            logger.debug(f"输入含不支持的类型，不缓存: {e}")
+            return None
         except Exception as e:
             logger.error(f"输入哈希计算失败: {e}")
-            return str(hash(str(input_data))) 
\ No newline at end of file
+            return None
+    
+    def _shared_key(self, input_hash: str) -> Optional[str]:
+        """共享缓存键：规则库内容哈希 + 输入哈希；规则库哈希未设置时不使用共享缓存"""
+        library_hash = self.library_hash
+        return f"{library_hash}:{input_hash}" if library_hash is not None else None
+    
+    def _get_shared_result(self, input_hash: str) -> Optional[Any]:
+        """从共享缓存读取结果并写回本进程缓存"""
+        shared_key = self._shared_key(input_hash)
+        if shared_key is None:
+            return None
+        record = self.shared_cache.get(shared_key)
+        if record is None:
+            return None
+        result, rule_ids, fields, expire_at, cost = record
+        ttl = expire_at - time.time() if expire_at is not None else None
+        with self.lock:
+            # 读取期间规则库已变更时不写回（set_library_hash 先于失效执行，见 RuleEngine）
+            if self._shared_key(input_hash) == shared_key:
+                self.result_cache.cache_result(input_hash, result, ttl, None, rule_ids, fields, cost)
+        return result
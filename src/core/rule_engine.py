@@ -3,45 +3,155 @@
 实现规则库管理、规则匹配、推理执行、规则学习与更新等功能
 """
 
+import sys
 import time
 import json
 import re
-from typing import Dict, List, Any, Optional, Tuple, Callable
+import heapq
+import itertools
+from array import array
+from bisect import bisect_left, insort
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterable, Iterator
 from dataclasses import dataclass, field
 from collections import defaultdict
+from collections.abc import Sequence
+from functools import lru_cache
 import logging
+import numpy as np
 from threading import Lock
 
+from .rule_cache_manager import compute_fingerprint
+
 logger = logging.getLogger(__name__)
 
+# 规则匹配阈值：至少50%的条件权重匹配
+MATCH_THRESHOLD = 0.5
+
+# 可达得分上界的浮点容差（上界与实际得分的累加顺序不同）
+_SCORE_EPSILON = 1e-9
+
+# 短路求值时排在最后的高开销操作符
+_EXPENSIVE_OPERATORS = {'regex', 'contains'}
+
+# 短路求值计划的刷新间隔（按规则匹配次数计）
+PLAN_REFRESH_INTERVAL = 256
+
+# 预编译正则的缓存容量（在所有规则之间共享）
+PATTERN_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_pattern(pattern: str) -> re.Pattern:
+    """编译正则表达式，相同表达式在规则之间共享同一个编译结果"""
+    return re.compile(pattern)
+
+
+def _try_compile_pattern(pattern: Any) -> Optional[re.Pattern]:
+    """编译正则表达式，非法表达式返回None"""
+    if not isinstance(pattern, str):
+        return None
+    try:
+        return compile_pattern(pattern)
+    except re.error:
+        return None
+
 
-@dataclass(frozen=True)
+def _intern(value: Any) -> Any:
+    """驻留字符串，大量规则共享同一个字段名/操作符对象"""
+    return sys.intern(value) if type(value) is str else value
+
+
+def _freeze(value: Any) -> Any:
+    """将嵌套的参数值转换为可哈希的形式"""
+    if isinstance(value, dict):
+        items = [(_freeze(k), _freeze(v)) for k, v in value.items()]
+        try:
+            return tuple(sorted(items))
+        except TypeError:
+            return tuple(sorted(items, key=repr))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(v) for v in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class FrozenParameters(dict):
+    """不可变的动作参数（dict子类，保持原有的字典读取接口），哈希值在构造时计算一次"""
+    
+    __slots__ = ('_hash',)
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._hash = hash(_freeze(self))
+    
+    def __hash__(self):
+        return self._hash
+    
+    def __reduce__(self):
+        return (FrozenParameters, (dict(self),))
+    
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("动作参数不可修改")
+    
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+
+@dataclass(frozen=True, slots=True)
 class RuleCondition:
     """规则条件"""
     field: str
     operator: str  # 'eq', 'ne', 'gt', 'lt', 'gte', 'lte', 'in', 'contains', 'regex'
     value: Any
     weight: float = 1.0
+    compiled_pattern: Optional[re.Pattern] = field(default=None, init=False, repr=False, compare=False)
+    _hash: int = field(default=0, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, 'field', _intern(self.field))
+        object.__setattr__(self, 'operator', _intern(self.operator))
+        if self.operator == 'regex':
+            object.__setattr__(self, 'compiled_pattern', _try_compile_pattern(self.value))
+        # 使用不可变字段生成哈希值，构造时计算一次
+        object.__setattr__(self, '_hash', hash((self.field, self.operator, str(self.value), self.weight)))
     
     def __hash__(self):
-        # 使用不可变字段生成哈希值
-        return hash((self.field, self.operator, str(self.value), self.weight))
+        return self._hash
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RuleAction:
     """规则动作"""
     action_type: str  # 'extract', 'classify', 'process', 'transform', 'validate'
     parameters: Dict[str, Any]
     priority: float = 1.0
+    compiled_pattern: Optional[re.Pattern] = field(default=None, init=False, repr=False, compare=False)
+    _hash: int = field(default=0, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, 'action_type', _intern(self.action_type))
+        if not isinstance(self.parameters, FrozenParameters):
+            object.__setattr__(self, 'parameters', FrozenParameters(self.parameters))
+        if self.action_type == 'extract' and self.parameters.get('pattern'):
+            object.__setattr__(self, 'compiled_pattern', _try_compile_pattern(self.parameters['pattern']))
+        object.__setattr__(self, '_hash', hash((self.action_type, hash(self.parameters), self.priority)))
     
     def __hash__(self):
-        # 将 parameters 转换为可哈希的元组
-        params_tuple = tuple(sorted(self.parameters.items()))
-        return hash((self.action_type, params_tuple, self.priority))
+        return self._hash
 
 
-@dataclass
+@dataclass(slots=True)
 class EngineRule:
     """规则引擎规则"""
     rule_id: str
@@ -58,12 +168,15 @@ class EngineRule:
     tags: List[str] = field(default_factory=list)
     enabled: bool = True
     
+    def __post_init__(self):
+        self.rule_id = _intern(self.rule_id)
+    
     def __hash__(self):
         # 使用 rule_id 作为主要哈希值，因为它是唯一的
         return hash(self.rule_id)
 
 
-@dataclass
+@dataclass(slots=True)
 class RuleMatch:
     """规则匹配结果"""
     rule: EngineRule
@@ -73,7 +186,7 @@ class RuleMatch:
     timestamp: float
 
 
-@dataclass
+@dataclass(slots=True)
 class ExecutionResult:
     """执行结果"""
     rule_id: str
@@ -84,6 +197,203 @@ class ExecutionResult:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
+class ConditionStatistics:
+    """条件选择性统计，短路求值时自动收集，用于条件排序"""
+    
+    def __init__(self):
+        self.counts: Dict[Tuple, List[int]] = {}  # 条件键 -> [评估次数, 匹配次数]
+    
+    def record(self, key: Tuple, result: bool):
+        """记录一次条件评估"""
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = [0, 0]
+        counts[0] += 1
+        if result:
+            counts[1] += 1
+    
+    def pass_rate(self, key: Tuple) -> float:
+        """条件匹配率，无统计时按0.5估计"""
+        counts = self.counts.get(key)
+        if not counts or counts[0] == 0:
+            return 0.5
+        return counts[1] / counts[0]
+    
+    def discard(self, key: Tuple):
+        """删除条件统计"""
+        self.counts.pop(key, None)
+
+
+class _EvaluationPlan:
+    """规则的短路求值计划"""
+    
+    __slots__ = ('source', 'keys', 'weights', 'order', 'total_weight', 'remaining_uses')
+    
+    def __init__(self, source: List[Any], keys: List[Tuple], weights: List[float],
+                 order: List[int], total_weight: float):
+        self.source = source  # 生成计划时的条件列表，列表对象变化时重建计划
+        self.keys = keys
+        self.weights = weights
+        self.order = order
+        self.total_weight = total_weight
+        self.remaining_uses = PLAN_REFRESH_INTERVAL
+
+
+class LazyMatchedConditions(Sequence):
+    """惰性匹配条件列表
+    
+    短路求值提前结束时，未评估的条件在首次访问列表时才补齐，
+    补齐后的内容和顺序与完整匹配得到的 matched_conditions 相同。
+    """
+    
+    def __init__(self, conditions: List[RuleCondition], results: List[Optional[bool]],
+                 evaluate: Callable[[int], bool]):
+        self._conditions = conditions
+        self._results = results
+        self._evaluate: Optional[Callable[[int], bool]] = evaluate
+        self._items: Optional[List[RuleCondition]] = None
+    
+    def _materialize(self) -> List[RuleCondition]:
+        if self._items is None:
+            results = self._results
+            for index, result in enumerate(results):
+                if result is None:
+                    results[index] = self._evaluate(index)
+            self._items = [condition for condition, result in zip(self._conditions, results) if result]
+            self._evaluate = None  # 释放对输入数据的引用
+        return self._items
+    
+    @property
+    def match_score(self) -> float:
+        """完整的匹配得分（会补齐未评估的条件）"""
+        self._materialize()
+        total_score = 0.0
+        total_weight = 0.0
+        for condition, result in zip(self._conditions, self._results):
+            if result:
+                total_score += condition.weight
+            total_weight += condition.weight
+        return total_score / total_weight if total_weight != 0 else 0.0
+    
+    def __getitem__(self, index):
+        return self._materialize()[index]
+    
+    def __len__(self) -> int:
+        return len(self._materialize())
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, LazyMatchedConditions)):
+            return self._materialize() == list(other)
+        return NotImplemented
+    
+    def __repr__(self) -> str:
+        return repr(self._materialize())
+
+
+@dataclass(slots=True)
+class HistoryRecord:
+    """执行历史记录（查询时生成）"""
+    rule_id: str
+    match_score: float
+    execution_time: float
+    success: bool
+    timestamp: float
+
+
+class ExecutionHistory:
+    """执行历史环形缓冲区
+    
+    预分配定长的列式数组（规则ID以整数编号存储），写入槽位无需加锁也不会复制列表，
+    只在更新最新序号时短暂持锁；每个槽位额外记录写入序号，读取时据此丢弃正在被覆盖的记录。
+    清空时只推进起始序号，之前写入的记录（包括清空时尚未完成的写入）不再可见。
+    """
+    
+    def __init__(self, capacity: int = 1000):
+        if capacity < 1:
+            raise ValueError("历史容量必须大于0")
+        self.capacity = capacity
+        self._sequences = array('q', [-1]) * capacity
+        self._rule_indices = array('i', [0]) * capacity
+        self._match_scores = array('d', [0.0]) * capacity
+        self._execution_times = array('d', [0.0]) * capacity
+        self._timestamps = array('d', [0.0]) * capacity
+        self._successes = array('b', [0]) * capacity
+        self._rule_ids: List[str] = []
+        self._rule_index_map: Dict[str, int] = {}
+        self._counter = itertools.count()
+        self._next_sequence = 0  # 已写入的最大序号 + 1
+        self._first_sequence = 0  # 可见记录的最小序号，清空时推进
+        self.lock = Lock()  # 登记新规则ID、更新序号范围时使用
+    
+    def record(self, rule_id: str, match_score: float, execution_time: float,
+               success: bool, timestamp: float):
+        """写入一条匹配记录"""
+        rule_index = self._rule_index_map.get(rule_id)
+        if rule_index is None:
+            with self.lock:
+                rule_index = self._rule_index_map.get(rule_id)
+                if rule_index is None:
+                    rule_index = len(self._rule_ids)
+                    self._rule_ids.append(rule_id)
+                    self._rule_index_map[rule_id] = rule_index
+        
+        sequence = next(self._counter)
+        slot = sequence % self.capacity
+        self._sequences[slot] = -1
+        self._rule_indices[slot] = rule_index
+        self._match_scores[slot] = match_score
+        self._execution_times[slot] = execution_time
+        self._timestamps[slot] = timestamp
+        self._successes[slot] = 1 if success else 0
+        self._sequences[slot] = sequence
+        with self.lock:
+            if sequence >= self._next_sequence:
+                self._next_sequence = sequence + 1
+    
+    def __len__(self) -> int:
+        with self.lock:
+            return min(self._next_sequence - self._first_sequence, self.capacity)
+    
+    def recent(self, limit: int = 100) -> List[HistoryRecord]:
+        """最近的匹配记录（从新到旧）"""
+        return list(itertools.islice(self._iter_recent(None), limit))
+    
+    def recent_matches(self, rule_id: str, limit: int = 100) -> List[HistoryRecord]:
+        """某个规则最近的匹配记录（从新到旧）"""
+        rule_index = self._rule_index_map.get(rule_id)
+        if rule_index is None:
+            return []
+        return list(itertools.islice(self._iter_recent(rule_index), limit))
+    
+    def clear(self):
+        """清空历史"""
+        with self.lock:
+            # 之后写入的记录从计数器的下一个序号开始，已取得序号但尚未写完的记录序号都小于它
+            self._first_sequence = next(self._counter) + 1
+            self._next_sequence = self._first_sequence
+    
+    def _iter_recent(self, rule_index: Optional[int]) -> Iterator[HistoryRecord]:
+        with self.lock:
+            latest = self._next_sequence - 1
+            oldest = max(latest - self.capacity + 1, self._first_sequence)
+        for sequence in range(latest, oldest - 1, -1):
+            slot = sequence % self.capacity
+            if self._sequences[slot] != sequence:
+                continue
+            if rule_index is not None and self._rule_indices[slot] != rule_index:
+                continue
+            record = HistoryRecord(
+                rule_id=self._rule_ids[self._rule_indices[slot]],
+                match_score=self._match_scores[slot],
+                execution_time=self._execution_times[slot],
+                success=bool(self._successes[slot]),
+                timestamp=self._timestamps[slot]
+            )
+            # 读取期间槽位被覆盖则丢弃该记录
+            if self._sequences[slot] == sequence:
+                yield record
+
+
 class RuleMatcher:
     """规则匹配器"""
     
@@ -99,9 +409,24 @@ class RuleMatcher:
             'contains': self._contains_operator,
             'regex': self._regex_operator
         }
+        self.condition_stats = ConditionStatistics()
+        self._plans: Dict[str, _EvaluationPlan] = {}
     
-    def match_rule(self, rule: EngineRule, data: Dict[str, Any]) -> Tuple[bool, float, List[RuleCondition]]:
-        """匹配规则"""
+    def match_rule(self, rule: EngineRule, data: Dict[str, Any],
+                   short_circuit: bool = False) -> Tuple[bool, float, List[RuleCondition]]:
+        """匹配规则
+        
+        short_circuit 为 True 时按 权重×选择性 排序评估条件（regex/contains 最后评估），
+        剩余权重无法改变结果时立即返回。此时 match_score 为已评估条件的得分，
+        matched_conditions 为 LazyMatchedConditions，访问时才补齐剩余条件。
+        """
+        if short_circuit:
+            conditions = rule.conditions
+            return self.short_circuit_match(
+                rule.rule_id, conditions, conditions,
+                lambda index: self._evaluate_condition(conditions[index], data)
+            )
+        
         matched_conditions = []
         total_score = 0.0
         total_weight = 0.0
@@ -116,10 +441,99 @@ class RuleMatcher:
             return False, 0.0, []
         
         match_score = total_score / total_weight
-        is_matched = match_score >= 0.5  # 至少50%的条件匹配
+        is_matched = match_score >= MATCH_THRESHOLD  # 至少50%的条件匹配
         
         return is_matched, match_score, matched_conditions
     
+    def short_circuit_match(self, rule_id: str, source: List[Any], conditions: List[RuleCondition],
+                            evaluate: Callable[[int], bool]) -> Tuple[bool, float, LazyMatchedConditions]:
+        """按求值计划短路匹配，evaluate(i) 评估第 i 个条件"""
+        plan = self._get_plan(rule_id, source, conditions)
+        results: List[Optional[bool]] = [None] * len(conditions)
+        stats = self.condition_stats
+        keys = plan.keys
+        
+        def evaluate_and_record(index: int) -> bool:
+            result = evaluate(index)
+            stats.record(keys[index], result)
+            return result
+        
+        total_weight = plan.total_weight
+        if total_weight == 0:
+            return False, 0.0, []
+        
+        lazy_conditions = LazyMatchedConditions(conditions, results, evaluate_and_record)
+        if total_weight < 0:
+            # 总权重为负时无法界定剩余权重的影响，退化为完整求值
+            match_score = lazy_conditions.match_score
+            return match_score >= MATCH_THRESHOLD, match_score, lazy_conditions
+        
+        weights = plan.weights
+        remaining_positive = 0.0
+        remaining_negative = 0.0
+        for weight in weights:
+            if weight > 0:
+                remaining_positive += weight
+            else:
+                remaining_negative += weight
+        
+        threshold = MATCH_THRESHOLD * total_weight
+        tolerance = _SCORE_EPSILON * total_weight
+        matched_weight = 0.0
+        for index in plan.order:
+            result = evaluate_and_record(index)
+            results[index] = result
+            weight = weights[index]
+            if weight > 0:
+                remaining_positive -= weight
+            else:
+                remaining_negative -= weight
+            if result:
+                matched_weight += weight
+            
+            # 剩余条件全部不利时仍达到阈值，或全部有利时仍达不到阈值，即可确定结果
+            if matched_weight + remaining_negative >= threshold + tolerance:
+                return True, matched_weight / total_weight, lazy_conditions
+            if matched_weight + remaining_positive < threshold - tolerance:
+                return False, matched_weight / total_weight, lazy_conditions
+        
+        match_score = lazy_conditions.match_score
+        return match_score >= MATCH_THRESHOLD, match_score, lazy_conditions
+    
+    def _get_plan(self, rule_id: str, source: List[Any], conditions: List[RuleCondition]) -> _EvaluationPlan:
+        """获取规则的求值计划，条件列表变化或使用次数到期时按最新统计重建"""
+        plan = self._plans.get(rule_id)
+        if plan is not None and plan.source is source and len(plan.keys) == len(conditions):
+            plan.remaining_uses -= 1
+            if plan.remaining_uses > 0:
+                return plan
+            keys = plan.keys
+        else:
+            keys = [RuleNetwork.condition_key(condition) for condition in conditions]
+        
+        weights = [condition.weight for condition in conditions]
+        pass_rate = self.condition_stats.pass_rate
+        
+        def sort_key(index: int) -> Tuple[int, float]:
+            condition = conditions[index]
+            rate = pass_rate(keys[index])
+            tier = 1 if condition.operator in _EXPENSIVE_OPERATORS else 0
+            # 权重大且结果确定性高（匹配率接近0或1）的条件优先评估
+            return tier, -abs(condition.weight) * max(rate, 1.0 - rate)
+        
+        order = sorted(range(len(conditions)), key=sort_key)
+        total_weight = 0.0
+        for weight in weights:
+            total_weight += weight
+        
+        plan = _EvaluationPlan(source, keys, weights, order, total_weight)
+        self._plans[rule_id] = plan
+        return plan
+    
+    def discard_plan(self, rule_id: str):
+        """删除规则的求值计划"""
+        self._plans.pop(rule_id, None)
+    
     def _evaluate_condition(self, condition: RuleCondition, data: Dict[str, Any]) -> bool:
         """评估单个条件"""
         if condition.field not in data:
@@ -132,8 +546,11 @@ class RuleMatcher:
             logger.warning(f"未知的操作符: {condition.operator}")
             return False
         
+        # 正则条件使用加载时预编译的表达式
+        expected_value = condition.value if condition.compiled_pattern is None else condition.compiled_pattern
+        
         try:
-            return operator_func(field_value, condition.value)
+            return operator_func(field_value, expected_value)
         except Exception as e:
             logger.error(f"条件评估失败: {e}")
             return False
@@ -164,12 +581,13 @@ class RuleMatcher:
             return expected_value in field_value
         return False
     
-    def _regex_operator(self, field_value: Any, pattern: str) -> bool:
+    def _regex_operator(self, field_value: Any, pattern: Any) -> bool:
         if isinstance(field_value, str):
-            try:
-                return bool(re.search(pattern, field_value))
-            except re.error:
-                return False
+            if not isinstance(pattern, re.Pattern):
+                pattern = _try_compile_pattern(pattern)
+                if pattern is None:
+                    return False
+            return pattern.search(field_value) is not None
         return False
 
 
@@ -222,8 +640,8 @@ class RuleExecutor:
         if field in data:
             value = data[field]
             if pattern and isinstance(value, str):
-                import re
-                match = re.search(pattern, value)
+                compiled = action.compiled_pattern or compile_pattern(pattern)
+                match = compiled.search(value)
                 if match:
                     return {'extracted': match.group(1) if match.groups() else match.group(0)}
             return {'extracted': value}
@@ -297,12 +715,290 @@ class RuleExecutor:
         return True
 
 
+class ConditionNode:
+    """条件节点（判别网络中的alpha节点，在规则之间共享）"""
+    
+    __slots__ = ('key', 'condition', 'rule_refs')
+    
+    def __init__(self, key: Tuple, condition: RuleCondition):
+        self.key = key
+        self.condition = condition  # 代表条件，节点求值只依赖 field/operator/value
+        self.rule_refs: Dict[str, int] = {}  # rule_id -> 引用次数
+
+
+class RuleNetwork:
+    """规则判别网络
+    
+    按 (field, operator, value) 为条件建立共享节点，同一请求内每个节点最多求值一次；
+    只有条件字段出现在输入中的规则才会参与匹配。匹配得分与 RuleMatcher.match_rule 完全一致。
+    """
+    
+    def __init__(self, matcher: Optional[RuleMatcher] = None):
+        self.matcher = matcher or RuleMatcher()
+        self.nodes: Dict[Tuple, ConditionNode] = {}
+        self.rule_nodes: Dict[str, List[Tuple[ConditionNode, RuleCondition]]] = {}
+    
+    @staticmethod
+    def condition_key(condition: RuleCondition) -> Tuple:
+        """生成条件节点键"""
+        value = condition.value
+        # 值类型参与键计算，避免 1 / 1.0 / True 这类相等但语义不同的值共享节点
+        try:
+            hash(value)
+            return (condition.field, condition.operator, type(value), value)
+        except TypeError:
+            return (condition.field, condition.operator, type(value), repr(value))
+    
+    def add_rule(self, rule: EngineRule):
+        """将规则的条件编入网络"""
+        if rule.rule_id in self.rule_nodes:
+            self.remove_rule(rule.rule_id)
+        
+        entries = []
+        for condition in rule.conditions:
+            key = self.condition_key(condition)
+            node = self.nodes.get(key)
+            if node is None:
+                node = ConditionNode(key, condition)
+                self.nodes[key] = node
+            node.rule_refs[rule.rule_id] = node.rule_refs.get(rule.rule_id, 0) + 1
+            entries.append((node, condition))
+        
+        self.rule_nodes[rule.rule_id] = entries
+    
+    def update_rule(self, rule: EngineRule):
+        """重新编入已更新的规则"""
+        self.remove_rule(rule.rule_id)
+        self.add_rule(rule)
+    
+    def remove_rule(self, rule_id: str):
+        """从网络中移除规则，释放不再被引用的节点"""
+        entries = self.rule_nodes.pop(rule_id, None)
+        if entries is None:
+            return
+        
+        for node, condition in entries:
+            node.rule_refs[rule_id] -= 1
+            if node.rule_refs[rule_id] <= 0:
+                del node.rule_refs[rule_id]
+            if not node.rule_refs:
+                self.nodes.pop(node.key, None)
+                self.matcher.condition_stats.discard(node.key)
+        
+        self.matcher.discard_plan(rule_id)
+    
+    def evaluate_rule(self, rule_id: str, data: Dict[str, Any], memo: Dict[Tuple, bool],
+                      short_circuit: bool = False) -> Tuple[bool, float, List[RuleCondition]]:
+        """使用共享节点匹配单个规则，memo 为本次请求内的节点求值结果
+        
+        short_circuit 的语义与 RuleMatcher.match_rule 相同。
+        """
+        entries = self.rule_nodes.get(rule_id)
+        if not entries:
+            return False, 0.0, []
+        
+        if short_circuit:
+            def evaluate(index: int) -> bool:
+                node = entries[index][0]
+                result = memo.get(node.key)
+                if result is None:
+                    result = self.matcher._evaluate_condition(node.condition, data)
+                    memo[node.key] = result
+                return result
+            
+            return self.matcher.short_circuit_match(
+                rule_id, entries, [condition for _, condition in entries], evaluate
+            )
+        
+        matched_conditions = []
+        total_score = 0.0
+        total_weight = 0.0
+        
+        for node, condition in entries:
+            result = memo.get(node.key)
+            if result is None:
+                result = self.matcher._evaluate_condition(node.condition, data)
+                memo[node.key] = result
+            if result:
+                matched_conditions.append(condition)
+                total_score += condition.weight
+            total_weight += condition.weight
+        
+        if total_weight == 0:
+            return False, 0.0, []
+        
+        match_score = total_score / total_weight
+        return match_score >= MATCH_THRESHOLD, match_score, matched_conditions
+    
+    def match(self, data: Dict[str, Any], 
+              rule_ids: Iterable[str]) -> Dict[str, Tuple[float, List[RuleCondition]]]:
+        """匹配候选规则，返回 rule_id -> (match_score, matched_conditions)，仅包含匹配成功的规则"""
+        matches = {}
+        memo: Dict[Tuple, bool] = {}
+        
+        for rule_id in rule_ids:
+            is_matched, match_score, matched_conditions = self.evaluate_rule(rule_id, data, memo)
+            if is_matched:
+                matches[rule_id] = (match_score, matched_conditions)
+        
+        return matches
+
+
+# 编译规则中直接内联的比较操作符
+_COMPILED_COMPARISONS = {
+    'eq': '==',
+    'ne': '!=',
+    'gt': '>',
+    'lt': '<',
+    'gte': '>=',
+    'lte': '<=',
+    'in': 'in'
+}
+
+_MISSING = object()
+
+
+def _log_condition_error(error: Exception):
+    logger.error(f"条件评估失败: {error}")
+
+
+def _log_unknown_operator(operator: str) -> bool:
+    logger.warning(f"未知的操作符: {operator}")
+    return False
+
+
+class RuleCompiler:
+    """规则编译器
+    
+    将规则的条件列表生成为一个专用的Python函数，省去逐条件的操作符字典查找和方法调用。
+    生成函数签名为 predicate(data, memo) -> (is_matched, match_score, matched_mask)，
+    matched_mask 的第 i 位表示第 i 个条件匹配。regex/contains 条件的结果写入 memo，
+    在同一请求内与判别网络的共享节点复用。评估语义与 RuleMatcher.match_rule 完全一致。
+    """
+    
+    def __init__(self):
+        self._cache: Dict[str, Tuple[int, Callable]] = {}  # rule_id -> (规则版本, 编译函数)
+        self.lock = Lock()
+    
+    def get_predicate(self, rule_id: str, version: int,
+                      entries: List[Tuple['ConditionNode', RuleCondition]]) -> Callable:
+        """获取规则的编译函数，规则版本变化时重新编译"""
+        cached = self._cache.get(rule_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        
+        predicate = self.compile(rule_id, entries)
+        with self.lock:
+            self._cache[rule_id] = (version, predicate)
+        return predicate
+    
+    def invalidate(self, rule_id: str):
+        """使规则的编译函数失效"""
+        with self.lock:
+            self._cache.pop(rule_id, None)
+    
+    def compile(self, rule_id: str, entries: List[Tuple['ConditionNode', RuleCondition]]) -> Callable:
+        """编译规则条件"""
+        namespace: Dict[str, Any] = {
+            '_MISSING': _MISSING,
+            '_log_condition_error': _log_condition_error,
+            '_log_unknown_operator': _log_unknown_operator,
+        }
+        lines = [
+            "def predicate(data, memo):",
+            "    get = data.get",
+            "    score = 0.0",
+            "    mask = 0",
+        ]
+        
+        total_weight = 0.0
+        for index, (node, condition) in enumerate(entries):
+            total_weight += condition.weight
+            namespace[f'F{index}'] = condition.field
+            namespace[f'W{index}'] = condition.weight
+            expression = self._compile_expression(index, condition, namespace)
+            shared = condition.operator in _EXPENSIVE_OPERATORS
+            
+            lines.append(f"    value = get(F{index}, _MISSING)")
+            lines.append("    if value is not _MISSING:")
+            indent = "        "
+            if shared:
+                namespace[f'K{index}'] = node.key
+                lines.append(f"        result = memo.get(K{index})")
+                lines.append("        if result is None:")
+                indent = "            "
+            lines.append(f"{indent}try:")
+            lines.append(f"{indent}    result = {expression}")
+            lines.append(f"{indent}except Exception as error:")
+            lines.append(f"{indent}    _log_condition_error(error)")
+            lines.append(f"{indent}    result = False")
+            if shared:
+                lines.append(f"{indent}memo[K{index}] = result")
+            lines.append("        if result:")
+            lines.append(f"            score += W{index}")
+            lines.append(f"            mask |= {1 << index}")
+        
+        if total_weight == 0:
+            lines = ["def predicate(data, memo):", "    return False, 0.0, 0"]
+        else:
+            namespace['TOTAL_WEIGHT'] = total_weight
+            namespace['THRESHOLD'] = MATCH_THRESHOLD
+            lines.append("    score = score / TOTAL_WEIGHT")
+            lines.append("    return score >= THRESHOLD, score, mask")
+        
+        code = compile("\n".join(lines), f"<rule {rule_id}>", "exec")
+        exec(code, namespace)
+        return namespace['predicate']
+    
+    @staticmethod
+    def _compile_expression(index: int, condition: RuleCondition, namespace: Dict[str, Any]) -> str:
+        """生成单个条件的求值表达式"""
+        operator = condition.operator
+        namespace[f'C{index}'] = condition.value
+        
+        if operator in _COMPILED_COMPARISONS:
+            return f"value {_COMPILED_COMPARISONS[operator]} C{index}"
+        if operator == 'contains':
+            if isinstance(condition.value, str):
+                return f"isinstance(value, str) and C{index} in value"
+            return "False"
+        if operator == 'regex':
+            if condition.compiled_pattern is None:
+                return "False"
+            namespace[f'P{index}'] = condition.compiled_pattern
+            return f"isinstance(value, str) and P{index}.search(value) is not None"
+        
+        namespace[f'O{index}'] = operator
+        return f"_log_unknown_operator(O{index})"
+
+
 class RuleLibrary:
     """规则库管理器"""
     
-    def __init__(self):
+    def __init__(self, matcher: Optional[RuleMatcher] = None):
         self.rules: Dict[str, EngineRule] = {}
         self.rule_groups: Dict[str, List[str]] = defaultdict(list)
+        self.network = RuleNetwork(matcher)
+        # 字段倒排索引：field -> {rule_id: 该字段上条件的正权重之和}
+        self.field_index: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.rule_weights: Dict[str, float] = {}  # rule_id -> 条件总权重
+        # 启用规则的优先级有序视图，元素为 (-priority, seq, rule_id)；seq 保持同优先级规则的添加顺序
+        self.priority_index: List[Tuple[float, int, str]] = []
+        self.priority_keys: Dict[str, Tuple[float, int, str]] = {}
+        self._rule_seq: Dict[str, int] = {}
+        self._seq_counter = itertools.count()
+        # 规则版本号，更新规则时递增，用于编译函数缓存
+        self.rule_versions: Dict[str, int] = {}
+        # 规则库版本号，任何规则变更时递增，用于标记结果缓存
+        self.version = 0
+        # 规则库内容哈希：各规则内容摘要按位异或，与添加顺序和进程无关，用于标记持久化的缓存条目
+        self._rule_digests: Dict[str, int] = {}
+        self._content_digest = 0
+        self.content_hash = self._format_content_hash()
+        self.compiler = RuleCompiler()
+        # 变更监听器 listener(event, rule_id)，event 为 'add'/'update'/'remove'；
+        # 在持有规则库锁时按变更顺序调用，监听器内不得再调用规则库的修改方法
+        self.listeners: List[Callable[[str, str], None]] = []
         self.lock = Lock()
     
     def add_rule(self, rule: EngineRule) -> bool:
@@ -312,7 +1008,13 @@ class RuleLibrary:
                 logger.warning(f"规则已存在: {rule.rule_id}")
                 return False
             
+            if not self._validate_patterns(rule):
+                return False
+            
             self.rules[rule.rule_id] = rule
+            self._rule_seq[rule.rule_id] = next(self._seq_counter)
+            self._index_rule(rule)
+            self._notify('add', rule.rule_id)
             
             # 添加到分组
             for tag in rule.tags:
@@ -328,6 +1030,9 @@ class RuleLibrary:
                 logger.warning(f"规则不存在: {rule.rule_id}")
                 return False
             
+            if not self._validate_patterns(rule):
+                return False
+            
             old_rule = self.rules[rule.rule_id]
             
             # 更新分组
@@ -340,6 +1045,9 @@ class RuleLibrary:
             
             rule.updated_at = time.time()
             self.rules[rule.rule_id] = rule
+            self._unindex_rule(rule.rule_id)
+            self._index_rule(rule)
+            self._notify('update', rule.rule_id)
             
             logger.info(f"规则已更新: {rule.rule_id}")
             return True
@@ -358,9 +1066,237 @@ class RuleLibrary:
                     self.rule_groups[tag].remove(rule_id)
             
             del self.rules[rule_id]
+            self._unindex_rule(rule_id)
+            del self._rule_seq[rule_id]
+            del self.rule_versions[rule_id]
+            self._notify('remove', rule_id)
             logger.info(f"规则已删除: {rule_id}")
             return True
     
+    def _validate_patterns(self, rule: EngineRule) -> bool:
+        """校验规则中的正则表达式，非法表达式在加载时拒绝而不是在每次请求时失败"""
+        for condition in rule.conditions:
+            if condition.operator == 'regex' and condition.compiled_pattern is None:
+                logger.error(f"规则 {rule.rule_id} 的正则条件非法: {condition.value!r}")
+                return False
+        
+        for action in rule.actions:
+            if action.action_type == 'extract' and action.parameters.get('pattern') and action.compiled_pattern is None:
+                logger.error(f"规则 {rule.rule_id} 的提取表达式非法: {action.parameters['pattern']!r}")
+                return False
+        
+        return True
+    
+    def get_candidate_rule_ids(self, data: Dict[str, Any]) -> List[str]:
+        """获取在输入字段下仍可能达到匹配阈值的规则
+        
+        缺失字段上的条件必然不匹配，因此规则的可达得分上界为输入中出现字段的条件权重之和
+        除以总权重，上界低于阈值的规则无需评估任何操作符即可跳过。总权重为负的规则匹配负权重
+        条件反而提高得分，无法用该上界剪枝，只要输入中出现其任一字段就保留，由完整求值决定；
+        总权重为零的规则永远不匹配。
+        """
+        achievable: Dict[str, float] = {}
+        field_index = self.field_index
+        for field_name in data:
+            rule_refs = field_index.get(field_name)
+            if rule_refs:
+                for rule_id, weight in rule_refs.items():
+                    achievable[rule_id] = achievable.get(rule_id, 0.0) + weight
+        
+        rule_weights = self.rule_weights
+        candidates = []
+        for rule_id, max_score in achievable.items():
+            total_weight = rule_weights.get(rule_id, 0.0)
+            if total_weight > 0:
+                if max_score / total_weight >= MATCH_THRESHOLD - _SCORE_EPSILON:
+                    candidates.append(rule_id)
+            elif total_weight < 0:
+                candidates.append(rule_id)
+        return candidates
+    
+    def _index_rule(self, rule: EngineRule):
+        """将规则加入判别网络和字段索引（需持有锁）"""
+        self.network.add_rule(rule)
+        
+        total_weight = 0.0
+        for condition in rule.conditions:
+            total_weight += condition.weight
+            # 只有正权重能提高得分，上界只累加正权重
+            weight = max(condition.weight, 0.0)
+            rule_refs = self.field_index[condition.field]
+            rule_refs[rule.rule_id] = rule_refs.get(rule.rule_id, 0.0) + weight
+        self.rule_weights[rule.rule_id] = total_weight
+        
+        if rule.enabled:
+            self._add_priority_key(rule)
+        
+        self.rule_versions[rule.rule_id] = self.rule_versions.get(rule.rule_id, 0) + 1
+        self.compiler.invalidate(rule.rule_id)
+    
+    def _add_priority_key(self, rule: EngineRule):
+        """将规则加入优先级视图（需持有锁）"""
+        key = (-rule.priority, self._rule_seq[rule.rule_id], rule.rule_id)
+        insort(self.priority_index, key)
+        self.priority_keys[rule.rule_id] = key
+    
+    def _remove_priority_key(self, rule_id: str):
+        """从优先级视图中移除规则（需持有锁）"""
+        key = self.priority_keys.pop(rule_id, None)
+        if key is not None:
+            index = bisect_left(self.priority_index, key)
+            if index < len(self.priority_index) and self.priority_index[index] == key:
+                del self.priority_index[index]
+    
+    def _unindex_rule(self, rule_id: str):
+        """从判别网络和字段索引中移除规则（需持有锁）"""
+        entries = self.network.rule_nodes.get(rule_id, [])
+        for field_name in {condition.field for _, condition in entries}:
+            rule_refs = self.field_index.get(field_name)
+            if rule_refs is not None:
+                rule_refs.pop(rule_id, None)
+                if not rule_refs:
+                    del self.field_index[field_name]
+        
+        self.rule_weights.pop(rule_id, None)
+        self.network.remove_rule(rule_id)
+        self._remove_priority_key(rule_id)
+        self.compiler.invalidate(rule_id)
+    
+    def set_rule_priority(self, rule_id: str, priority: float) -> bool:
+        """调整规则优先级并维护优先级视图"""
+        with self.lock:
+            rule = self.rules.get(rule_id)
+            if rule is None:
+                return False
+            
+            self._remove_priority_key(rule_id)
+            rule.priority = priority
+            if rule.enabled:
+                self._add_priority_key(rule)
+            self._notify('update', rule_id)
+            return True
+    
+    def set_rule_enabled(self, rule_id: str, enabled: bool) -> bool:
+        """启用或禁用规则并维护优先级视图"""
+        with self.lock:
+            rule = self.rules.get(rule_id)
+            if rule is None:
+                return False
+            
+            self._remove_priority_key(rule_id)
+            rule.enabled = enabled
+            if enabled:
+                self._add_priority_key(rule)
+            self._notify('update', rule_id)
+            return True
+    
+    def add_listener(self, listener: Callable[[str, str], None], replay: bool = False):
+        """注册规则变更监听器，replay 为 True 时先按添加顺序为现有规则回放 'add' 事件"""
+        with self.lock:
+            if replay:
+                for rule_id in self.rules:
+                    listener('add', rule_id)
+            self.listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[[str, str], None]):
+        """移除规则变更监听器"""
+        with self.lock:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+    
+    def _notify(self, event: str, rule_id: str):
+        """通知规则变更（需持有锁）"""
+        self.version += 1
+        self._update_content_hash(rule_id)
+        for listener in self.listeners:
+            try:
+                listener(event, rule_id)
+            except Exception as e:
+                logger.error(f"规则变更监听器执行失败: {e}")
+    
+    def _update_content_hash(self, rule_id: str):
+        """更新规则库内容哈希（需持有锁）"""
+        old_digest = self._rule_digests.pop(rule_id, None)
+        if old_digest is not None:
+            self._content_digest ^= old_digest
+        rule = self.rules.get(rule_id)
+        if rule is not None:
+            content = (
+                rule.rule_id,
+                [(c.field, c.operator, c.value, c.weight) for c in rule.conditions],
+                [(a.action_type, dict(a.parameters)) for a in rule.actions],
+                rule.priority,
+                rule.confidence,
+                rule.enabled
+            )
+            try:
+                digest = int(compute_fingerprint(content), 16)
+            except TypeError as e:
+                # 条件值或动作参数含不支持的类型时退化为 repr，哈希可能随进程变化
+                logger.warning(f"规则 {rule_id} 的内容哈希退化为 repr: {e}")
+                digest = int(compute_fingerprint(repr(content)), 16)
+            self._rule_digests[rule_id] = digest
+            self._content_digest ^= digest
+        self.content_hash = self._format_content_hash()
+    
+    def _format_content_hash(self) -> str:
+        return f"{self._content_digest:032x}-{len(self._rule_digests)}"
+    
+    def get_compiled_predicate(self, rule_id: str) -> Optional[Callable]:
+        """获取规则的编译匹配函数（按规则版本缓存）"""
+        entries = self.network.rule_nodes.get(rule_id)
+        version = self.rule_versions.get(rule_id)
+        if entries is None or version is None:
+            return None
+        return self.compiler.get_predicate(rule_id, version, entries)
+    
+    def find_matches(self, data: Dict[str, Any], max_rules: int,
+                     short_circuit: bool = False) -> List[Tuple[EngineRule, float, List[RuleCondition]]]:
+        """按优先级顺序查找匹配的规则，返回最多 max_rules 个 (rule, match_score, matched_conditions)
+        
+        先用字段索引剪枝，再按优先级视图顺序惰性匹配，找满 max_rules 个即停止。
+        默认调用规则的编译函数，短路模式使用判别网络逐条件求值。
+        """
+        priority_keys = self.priority_keys
+        candidate_keys = [key for key in map(priority_keys.get, self.get_candidate_rule_ids(data))
+                          if key is not None]
+        heapq.heapify(candidate_keys)
+        memo: Dict[Tuple, bool] = {}
+        
+        matches = []
+        while candidate_keys and len(matches) < max_rules:
+            _, _, rule_id = heapq.heappop(candidate_keys)
+            rule = self.rules.get(rule_id)
+            if rule is None:
+                continue
+            
+            if short_circuit:
+                is_matched, match_score, matched_conditions = self.network.evaluate_rule(
+                    rule_id, data, memo, True
+                )
+            else:
+                predicate = self.get_compiled_predicate(rule_id)
+                if predicate is None:
+                    continue
+                is_matched, match_score, matched_mask = predicate(data, memo)
+                if is_matched:
+                    entries = self.network.rule_nodes.get(rule_id, ())
+                    matched_conditions = [condition for index, (_, condition) in enumerate(entries)
+                                          if matched_mask >> index & 1]
+            
+            if is_matched:
+                matches.append((rule, match_score, matched_conditions))
+        
+        return matches
+    
+    def iter_rules_by_priority(self) -> Iterator[EngineRule]:
+        """按优先级从高到低遍历启用的规则，无需排序和复制"""
+        rules = self.rules
+        for _, _, rule_id in self.priority_index:
+            rule = rules.get(rule_id)
+            if rule is not None:
+                yield rule
+    
     def get_rule(self, rule_id: str) -> Optional[EngineRule]:
         """获取规则"""
         return self.rules.get(rule_id)
@@ -392,14 +1328,67 @@ class RuleLibrary:
         return results
 
 
+# 可按列向量化求值的数值比较操作符
+_VECTOR_OPERATORS = {'eq', 'gt', 'lt', 'gte', 'lte', 'in'}
+
+# float64 可精确表示的整数范围，超出范围的整数不做向量化以保证与逐条比较一致
+_MAX_EXACT_INT = 2 ** 53
+
+
+def _is_exact_number(value: Any) -> bool:
+    """判断值是否为可无损转换为float64的数值（不含bool和NaN）"""
+    value_type = type(value)
+    if value_type is int:
+        return -_MAX_EXACT_INT <= value <= _MAX_EXACT_INT
+    if value_type is float:
+        return value == value
+    return False
+
+
+def _numeric_column(values: List[Any]) -> Optional[np.ndarray]:
+    """将一列值转换为float64数组，含非数值时返回None"""
+    for value in values:
+        if not _is_exact_number(value):
+            return None
+    return np.array(values, dtype=np.float64)
+
+
+def _compare_column(operator: str, column: np.ndarray, expected_value: Any) -> Optional[np.ndarray]:
+    """对数值列执行比较，无法向量化时返回None"""
+    if operator == 'in':
+        if not isinstance(expected_value, (list, tuple, set, frozenset)):
+            return None
+        if not all(_is_exact_number(v) for v in expected_value):
+            return None
+        return np.isin(column, np.array(list(expected_value), dtype=np.float64))
+    
+    if not _is_exact_number(expected_value):
+        return None
+    if operator == 'eq':
+        return column == expected_value
+    if operator == 'gt':
+        return column > expected_value
+    if operator == 'lt':
+        return column < expected_value
+    if operator == 'gte':
+        return column >= expected_value
+    if operator == 'lte':
+        return column <= expected_value
+    return None
+
+
 class RuleEngine:
     """规则引擎核心"""
     
-    def __init__(self):
-        self.rule_library = RuleLibrary()
+    def __init__(self, short_circuit: bool = False, history_size: int = 1000):
         self.matcher = RuleMatcher()
+        self.rule_library = RuleLibrary(self.matcher)
+        self.short_circuit = short_circuit  # 短路求值模式，匹配阶段的 match_score 为得分下界
+        self.parallel_matcher = None  # 并行匹配器，见 enable_parallel_matching
+        self.result_cache = None  # 结果缓存，见 enable_result_cache
+        self.result_cache_ttl = 1800.0
         self.executor = RuleExecutor()
-        self.execution_history: List[RuleMatch] = []
+        self.execution_history = ExecutionHistory(history_size)
         self.lock = Lock()
     
     def add_rule(self, rule: EngineRule) -> bool:
@@ -414,62 +1403,305 @@ class RuleEngine:
         """删除规则"""
         return self.rule_library.remove_rule(rule_id)
     
+    def enable_parallel_matching(self, num_partitions: int = 4, start_method: Optional[str] = None,
+                                 timeout: float = 5.0):
+        """启用并行匹配：规则库按分区常驻在工作进程中，请求时并发匹配各分区"""
+        from .parallel_rule_matcher import ParallelRuleMatcher
+        
+        self.disable_parallel_matching()
+        self.parallel_matcher = ParallelRuleMatcher(
+            self.rule_library, num_partitions, self.short_circuit, start_method, timeout
+        )
+    
+    def disable_parallel_matching(self):
+        """停用并行匹配并关闭工作进程"""
+        if self.parallel_matcher is not None:
+            parallel_matcher, self.parallel_matcher = self.parallel_matcher, None
+            parallel_matcher.close()
+    
+    def enable_result_cache(self, cache_manager, ttl: float = 1800.0):
+        """启用读穿透结果缓存
+        
+        cache_manager 需提供 get_result/cache_result/invalidate_rule_results/set_library_hash
+        （见 RuleCacheManager）。结果按输入指纹缓存，并标记参与的规则和输入字段；规则变更时只失效
+        依赖该规则的条目：该规则参与过的结果，以及按字段得分上界该规则（变更后）可能匹配的输入的结果。
+        规则库内容哈希同步给缓存管理器，磁盘二级缓存据此丢弃规则库变化前持久化的条目。
+        """
+        self.disable_result_cache()
+        self.result_cache = cache_manager
+        self.result_cache_ttl = ttl
+        self.rule_library.add_listener(self._invalidate_cached_results)
+        with self.rule_library.lock:
+            cache_manager.set_library_hash(self.rule_library.content_hash)
+    
+    def disable_result_cache(self):
+        """停用结果缓存"""
+        if self.result_cache is not None:
+            self.rule_library.remove_listener(self._invalidate_cached_results)
+            self.result_cache = None
+    
+    def _invalidate_cached_results(self, event: str, rule_id: str):
+        """规则变更监听器（持有规则库锁时调用）：清除依赖该规则的缓存结果"""
+        field_weights: Dict[str, float] = {}
+        min_weight = 0.0
+        rule = self.rule_library.rules.get(rule_id) if event != 'remove' else None
+        if rule is not None:
+            # 与 RuleLibrary.get_candidate_rule_ids 相同的候选条件：总权重为正时只有正权重字段能提高得分；
+            # 总权重为负时输入包含规则任一字段即可能匹配；总权重为零时规则永远不匹配
+            total_weight = 0.0
+            for condition in rule.conditions:
+                total_weight += condition.weight
+                field_weights[condition.field] = field_weights.get(condition.field, 0.0) + max(condition.weight, 0.0)
+            if total_weight > 0:
+                min_weight = (MATCH_THRESHOLD - _SCORE_EPSILON) * total_weight
+            elif total_weight < 0:
+                field_weights = {field_name: 1.0 for field_name in field_weights}
+                min_weight = 1.0
+            else:
+                field_weights = {}
+        # 先更新规则库哈希，使并发写回的共享缓存结果要么被随后的失效清除，要么因哈希变化而放弃写回
+        self.result_cache.set_library_hash(self.rule_library.content_hash)
+        self.result_cache.invalidate_rule_results(rule_id, field_weights, min_weight)
+    
     def execute_rules(self, data: Dict[str, Any], context: Optional[Dict[str, Any]] = None, 
                      max_rules: int = 10) -> List[ExecutionResult]:
-        """执行规则"""
+        """执行规则
+        
+        启用结果缓存时先按输入指纹查找；命中时直接返回缓存结果（只更新规则使用统计，
+        不重新执行动作、不写入执行历史）。
+        """
         start_time = time.time()
-        results = []
         
-        # 获取启用的规则
-        enabled_rules = self.rule_library.get_enabled_rules()
+        result_cache = self.result_cache
+        if result_cache is not None:
+            fingerprint_data = {
+                'data': data,
+                'context': context if context is not None else {},
+                'max_rules': max_rules
+            }
+            # 匹配前读取版本号：执行期间规则若有变更则不写入缓存
+            version = self.rule_library.version
+            cached_results = result_cache.get_result(fingerprint_data)
+            if cached_results is not None:
+                self._record_cached_usage(cached_results)
+                logger.info(f"规则执行命中结果缓存，返回 {len(cached_results)} 个结果")
+                return list(cached_results)
         
-        # 按优先级排序
-        sorted_rules = sorted(enabled_rules, key=lambda x: x.priority, reverse=True)
+        compute_start = time.perf_counter()
+        results = self._execute_rules(data, context, max_rules)
+        compute_cost = time.perf_counter() - compute_start
         
-        executed_count = 0
-        for rule in sorted_rules:
-            if executed_count >= max_rules:
-                break
-            
-            # 匹配规则
-            is_matched, match_score, matched_conditions = self.matcher.match_rule(rule, data)
-            
-            if is_matched:
-                # 记录匹配
-                match_record = RuleMatch(
-                    rule=rule,
-                    match_score=match_score,
-                    matched_conditions=matched_conditions,
-                    execution_time=0.0,
-                    timestamp=time.time()
-                )
-                
-                # 执行规则
-                execution_start = time.time()
-                result = self.executor.execute_rule(rule, data, context if context is not None else {})
-                execution_time = time.time() - execution_start
-                
-                match_record.execution_time = execution_time
-                results.append(result)
-                
-                # 更新使用统计
+        if result_cache is not None:
+            self._cache_results(fingerprint_data, data, results, version, compute_cost)
+        
+        total_time = time.time() - start_time
+        logger.info(f"规则执行完成，执行了 {len(results)} 个规则，耗时 {total_time:.3f}秒")
+        
+        return results
+    
+    def _record_cached_usage(self, cached_results: List[ExecutionResult]):
+        """命中结果缓存时只更新规则使用统计"""
+        for result in cached_results:
+            rule = self.rule_library.get_rule(result.rule_id)
+            if rule is not None:
                 rule.usage_count += 1
                 if result.success:
                     rule.success_count += 1
-                
-                executed_count += 1
+    
+    def _cache_results(self, fingerprint_data: Dict[str, Any], data: Dict[str, Any],
+                       results: List[ExecutionResult], version: int, compute_cost: float):
+        """写入结果缓存，version 为匹配前读取的规则库版本号"""
+        # 在规则库锁内写入，与变更监听器的失效操作互斥；计算耗时用于代价感知淘汰
+        with self.rule_library.lock:
+            if self.rule_library.version == version:
+                self.result_cache.cache_result(
+                    fingerprint_data, list(results), ttl=self.result_cache_ttl, version=version,
+                    rule_ids=[result.rule_id for result in results], fields=list(data),
+                    cost=compute_cost
+                )
+    
+    def _execute_rules(self, data: Dict[str, Any], context: Optional[Dict[str, Any]],
+                       max_rules: int) -> List[ExecutionResult]:
+        """匹配并执行规则"""
+        results = []
         
-        # 记录执行历史
-        with self.lock:
-            self.execution_history.extend([match for match in results if hasattr(match, 'rule')])
-            if len(self.execution_history) > 1000:  # 限制历史记录数量
-                self.execution_history = self.execution_history[-1000:]
+        parallel_matcher = self.parallel_matcher
+        if parallel_matcher is not None:
+            matches = parallel_matcher.match(data, max_rules)
+            if parallel_matcher.failed and self.parallel_matcher is parallel_matcher:
+                # 工作进程池已终止，移除匹配器，后续请求直接串行匹配
+                self.parallel_matcher = None
+                parallel_matcher.close()
+        else:
+            matches = self.rule_library.find_matches(data, max_rules, self.short_circuit)
         
-        total_time = time.time() - start_time
-        logger.info(f"规则执行完成，执行了 {len(results)} 个规则，耗时 {total_time:.3f}秒")
+        for rule, match_score, matched_conditions in matches:
+            results.append(self._execute_match(rule, match_score, matched_conditions, data, context))
         
         return results
     
+    def execute_rules_batch(self, records: List[Dict[str, Any]], context: Optional[Dict[str, Any]] = None,
+                            max_rules: int = 10) -> List[List[ExecutionResult]]:
+        """批量执行规则
+        
+        字段集合相同的输入归为一组，数值比较条件按列向量化求值，规则得分以矩阵形式计算，
+        只执行匹配成功的规则/输入组合。返回结果与逐条调用 execute_rules 一致。
+        
+        启用结果缓存时先按与 execute_rules 相同的输入指纹逐条查找，只向量化匹配未命中的输入，
+        其结果在规则库版本未变时写入缓存；批内重复的输入在前一条写入缓存后按命中处理。
+        """
+        start_time = time.time()
+        record_matches: List[List[Tuple[EngineRule, float, List[RuleCondition]]]] = [[] for _ in records]
+        batch_results: List[Optional[List[ExecutionResult]]] = [None] * len(records)
+        miss_indices = list(range(len(records)))
+        repeated = set()  # 与批内前面某条未命中输入相同的输入，执行时再查一次缓存
+        
+        result_cache = self.result_cache
+        if result_cache is not None:
+            fingerprints = [
+                {'data': record, 'context': context if context is not None else {}, 'max_rules': max_rules}
+                for record in records
+            ]
+            # 匹配前读取版本号：执行期间规则若有变更则不写入缓存
+            version = self.rule_library.version
+            miss_indices = []
+            seen_keys = set()
+            for index, fingerprint_data in enumerate(fingerprints):
+                cached_results = result_cache.get_result(fingerprint_data)
+                if cached_results is not None:
+                    self._record_cached_usage(cached_results)
+                    batch_results[index] = list(cached_results)
+                    continue
+                miss_indices.append(index)
+                try:
+                    key = compute_fingerprint(fingerprint_data)
+                except (TypeError, ValueError):
+                    continue
+                if key in seen_keys:
+                    repeated.add(index)
+                seen_keys.add(key)
+        
+        groups: Dict[frozenset, List[int]] = defaultdict(list)
+        for index in miss_indices:
+            groups[frozenset(records[index])].append(index)
+        
+        match_start = time.perf_counter()
+        for indices in groups.values():
+            self._match_batch_group(records, indices, max_rules, record_matches)
+        # 向量化匹配的耗时按未命中的输入均摊，加上各自执行动作的耗时作为计算代价
+        match_cost = (time.perf_counter() - match_start) / len(miss_indices) if miss_indices else 0.0
+        
+        # 按输入顺序执行，保证副作用顺序与逐条执行一致
+        for index in miss_indices:
+            record = records[index]
+            if index in repeated:
+                cached_results = result_cache.get_result(fingerprints[index])
+                if cached_results is not None:
+                    self._record_cached_usage(cached_results)
+                    batch_results[index] = list(cached_results)
+                    continue
+            execute_start = time.perf_counter()
+            results = [
+                self._execute_match(rule, match_score, matched_conditions, record, context)
+                for rule, match_score, matched_conditions in record_matches[index]
+            ]
+            batch_results[index] = results
+            if result_cache is not None:
+                self._cache_results(fingerprints[index], record, results, version,
+                                    match_cost + time.perf_counter() - execute_start)
+        
+        total_time = time.time() - start_time
+        logger.info(f"批量规则执行完成，处理了 {len(records)} 条输入，耗时 {total_time:.3f}秒")
+        
+        return batch_results
+    
+    def _match_batch_group(self, records: List[Dict[str, Any]], indices: List[int], max_rules: int,
+                           record_matches: List[List[Tuple[EngineRule, float, List[RuleCondition]]]]):
+        """按列匹配一组字段集合相同的输入"""
+        library = self.rule_library
+        group_records = [records[index] for index in indices]
+        row_count = len(group_records)
+        
+        # 同组输入字段相同，候选规则只需计算一次
+        priority_keys = library.priority_keys
+        candidate_keys = sorted(key for key in map(priority_keys.get, library.get_candidate_rule_ids(group_records[0]))
+                                if key is not None)
+        
+        columns: Dict[str, Optional[np.ndarray]] = {}
+        masks: Dict[Tuple, np.ndarray] = {}
+        remaining = np.full(row_count, max_rules, dtype=np.int64)
+        
+        for _, _, rule_id in candidate_keys:
+            if not (remaining > 0).any():
+                break
+            
+            rule = library.get_rule(rule_id)
+            entries = library.network.rule_nodes.get(rule_id)
+            if rule is None or not entries:
+                continue
+            
+            # 按条件顺序累加，保证浮点得分与逐条匹配完全一致
+            scores = np.zeros(row_count, dtype=np.float64)
+            total_weight = 0.0
+            condition_masks = []
+            for node, condition in entries:
+                mask = masks.get(node.key)
+                if mask is None:
+                    mask = self._evaluate_condition_column(node.condition, group_records, columns)
+                    masks[node.key] = mask
+                scores += mask * condition.weight
+                total_weight += condition.weight
+                condition_masks.append(mask)
+            
+            if total_weight == 0:
+                continue
+            
+            match_scores = scores / total_weight
+            rows = np.flatnonzero((match_scores >= MATCH_THRESHOLD) & (remaining > 0))
+            for row in rows:
+                matched_conditions = [condition for (_, condition), mask in zip(entries, condition_masks) if mask[row]]
+                record_matches[indices[row]].append((rule, float(match_scores[row]), matched_conditions))
+            remaining[rows] -= 1
+    
+    def _evaluate_condition_column(self, condition: RuleCondition, group_records: List[Dict[str, Any]],
+                                   columns: Dict[str, Optional[np.ndarray]]) -> np.ndarray:
+        """对一组输入求值单个条件，返回布尔向量"""
+        row_count = len(group_records)
+        if condition.field not in group_records[0]:
+            return np.zeros(row_count, dtype=bool)
+        
+        if condition.operator in _VECTOR_OPERATORS:
+            if condition.field not in columns:
+                columns[condition.field] = _numeric_column([record[condition.field] for record in group_records])
+            column = columns[condition.field]
+            if column is not None:
+                mask = _compare_column(condition.operator, column, condition.value)
+                if mask is not None:
+                    return mask
+        
+        evaluate = self.matcher._evaluate_condition
+        return np.fromiter((evaluate(condition, record) for record in group_records), dtype=bool, count=row_count)
+    
+    def _execute_match(self, rule: EngineRule, match_score: float, matched_conditions: List[RuleCondition],
+                       data: Dict[str, Any], context: Optional[Dict[str, Any]]) -> ExecutionResult:
+        """执行已匹配的规则，更新使用统计并记录执行历史
+        
+        短路匹配的 match_score 只是得分下界，记录前由惰性条件列表补齐为完整得分。
+        """
+        if isinstance(matched_conditions, LazyMatchedConditions):
+            match_score = matched_conditions.match_score
+        timestamp = time.time()
+        result = self.executor.execute_rule(rule, data, context if context is not None else {})
+        execution_time = time.time() - timestamp
+        
+        # 更新使用统计
+        rule.usage_count += 1
+        if result.success:
+            rule.success_count += 1
+        
+        self.execution_history.record(rule.rule_id, match_score, execution_time, result.success, timestamp)
+        return result
+    
     def get_rule_stats(self) -> Dict[str, Any]:
         """获取规则统计信息"""
         rules = self.rule_library.get_all_rules()
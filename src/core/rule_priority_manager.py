@@ -3,12 +3,16 @@
 实现规则优先级计算、排序优化、使用统计和上下文相关性评估
 """
 
+import os
 import time
+import json
 import math
+import heapq
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, field
-from collections import defaultdict, deque
+from collections import defaultdict
 import logging
+import numpy as np
 from threading import Lock
 
 logger = logging.getLogger(__name__)
@@ -60,11 +64,345 @@ class ContextProfile:
     relevance_scores: Dict[str, float] = field(default_factory=dict)  # rule_id -> relevance_score
 
 
+class UsageAggregateTable:
+    """所有规则的增量使用统计（按行存储）
+    
+    每个规则占一行：计数、成功数以及执行时间的均值和方差（Welford 算法）随记录加入和移出
+    保留缓冲区同步更新；时间窗口内的使用次数由环形桶计数：最近一小时按分钟，更早按小时
+    （最多 HOUR_BUCKETS 小时），窗口边界精确到桶的粒度。
+    各列均为 NumPy 数组，可对任意一组规则向量化查询。
+    """
+    
+    MINUTE_BUCKETS = 60
+    HOUR_BUCKETS = 48
+    INITIAL_ROWS = 64
+    
+    def __init__(self):
+        self.rows: Dict[str, int] = {}  # rule_id -> 行号
+        capacity = self.INITIAL_ROWS
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.success_count = np.zeros(capacity, dtype=np.int64)
+        self.mean_time = np.zeros(capacity, dtype=np.float64)
+        self.m2_time = np.zeros(capacity, dtype=np.float64)  # 执行时间与均值之差的平方和
+        # 桶对应的分钟/小时序号，与当前序号不一致的桶已过期
+        self.minute_counts = np.zeros((capacity, self.MINUTE_BUCKETS), dtype=np.int32)
+        self.minute_ids = np.full((capacity, self.MINUTE_BUCKETS), -1, dtype=np.int32)
+        self.hour_counts = np.zeros((capacity, self.HOUR_BUCKETS), dtype=np.int32)
+        self.hour_ids = np.full((capacity, self.HOUR_BUCKETS), -1, dtype=np.int32)
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def row(self, rule_id: str) -> int:
+        """获取规则所在行，不存在时分配新行"""
+        row = self.rows.get(rule_id)
+        if row is None:
+            row = self.rows[rule_id] = len(self.rows)
+            if row >= len(self.count):
+                self._grow(len(self.count) * 2)
+        return row
+    
+    def lookup(self, rule_ids: List[str]) -> np.ndarray:
+        """批量获取规则所在行，未记录的规则为 -1"""
+        rows = self.rows
+        return np.fromiter((rows.get(rule_id, -1) for rule_id in rule_ids),
+                           dtype=np.int64, count=len(rule_ids))
+    
+    def add(self, row: int, timestamp: float, success: bool, execution_time: float):
+        """加入一条记录"""
+        count = int(self.count[row]) + 1
+        mean = float(self.mean_time[row])
+        delta = execution_time - mean
+        mean += delta / count
+        self.count[row] = count
+        if success:
+            self.success_count[row] += 1
+        self.mean_time[row] = mean
+        self.m2_time[row] += delta * (execution_time - mean)
+        
+        minute = int(timestamp // 60)
+        self._increment(self.minute_counts, self.minute_ids, row, minute)
+        self._increment(self.hour_counts, self.hour_ids, row, minute // 60)
+    
+    def remove(self, row: int, success: bool, execution_time: float):
+        """移出一条记录（保留缓冲区已满时的最旧记录），时间桶计数不变"""
+        count = int(self.count[row])
+        if count <= 1:
+            self.count[row] = 0
+            self.success_count[row] = 0
+            self.mean_time[row] = 0.0
+            self.m2_time[row] = 0.0
+            return
+        if success:
+            self.success_count[row] -= 1
+        old_mean = float(self.mean_time[row])
+        count -= 1
+        mean = (old_mean * (count + 1) - execution_time) / count
+        self.count[row] = count
+        self.mean_time[row] = mean
+        self.m2_time[row] = max(0.0, float(self.m2_time[row]) - (execution_time - old_mean) * (execution_time - mean))
+    
+    def window_counts(self, rows: np.ndarray, time_window: float, current_time: float) -> np.ndarray:
+        """批量统计最近 time_window 秒内的使用次数"""
+        if time_window <= 0 or len(rows) == 0:
+            return np.zeros(len(rows), dtype=np.int64)
+        minute = int(current_time // 60)
+        if time_window <= self.MINUTE_BUCKETS * 60:
+            counts, ids = self.minute_counts, self.minute_ids
+            current_id, bucket_count = minute, math.ceil(time_window / 60)
+        else:
+            counts, ids = self.hour_counts, self.hour_ids
+            current_id, bucket_count = minute // 60, min(math.ceil(time_window / 3600), self.HOUR_BUCKETS)
+        row_ids = ids[rows]
+        valid = (row_ids > current_id - bucket_count) & (row_ids <= current_id)
+        return np.where(valid, counts[rows], 0).sum(axis=1, dtype=np.int64)
+    
+    @staticmethod
+    def _increment(counts: np.ndarray, ids: np.ndarray, row: int, bucket_id: int):
+        slot = bucket_id % counts.shape[1]
+        if ids[row, slot] != bucket_id:
+            ids[row, slot] = bucket_id
+            counts[row, slot] = 0
+        counts[row, slot] += 1
+    
+    def _grow(self, capacity: int):
+        size = len(self.count)
+        for name in ('count', 'success_count', 'mean_time', 'm2_time',
+                     'minute_counts', 'minute_ids', 'hour_counts', 'hour_ids'):
+            values = getattr(self, name)
+            fill = -1 if name.endswith('_ids') else 0
+            grown = np.full((capacity,) + values.shape[1:], fill, dtype=values.dtype)
+            grown[:size] = values
+            setattr(self, name, grown)
+
+
+class _RuleUsageColumns:
+    """单个规则的列式环形缓冲区
+    
+    容量从 INITIAL_CAPACITY 起按需倍增至 max_records，之后循环覆盖最旧的记录。
+    缓冲区未满时 start 为 0，记录位于 [0, size)；满后 start 指向最旧的记录。
+    """
+    
+    INITIAL_CAPACITY = 16
+    
+    __slots__ = ('max_records', 'start', 'size', 'timestamp', 'success',
+                 'execution_time', 'input_size', 'output_size', 'context_id')
+    
+    def __init__(self, max_records: int):
+        self.max_records = max_records
+        self.start = 0
+        self.size = 0
+        capacity = min(self.INITIAL_CAPACITY, max_records)
+        self.timestamp = np.empty(capacity, dtype=np.float64)
+        self.success = np.empty(capacity, dtype=np.bool_)
+        self.execution_time = np.empty(capacity, dtype=np.float64)
+        self.input_size = np.empty(capacity, dtype=np.int64)
+        self.output_size = np.empty(capacity, dtype=np.int64)
+        self.context_id = np.empty(capacity, dtype=np.int32)
+    
+    @property
+    def capacity(self) -> int:
+        return len(self.timestamp)
+    
+    def append(self, timestamp: float, success: bool, execution_time: float,
+               input_size: int, output_size: int, context_id: int) -> Optional[Tuple[bool, float]]:
+        """追加一条记录，缓冲区已满时覆盖最旧的记录并返回其 (success, execution_time)"""
+        evicted = None
+        if self.size < self.capacity:
+            index = self.size
+            self.size += 1
+        elif self.capacity < self.max_records:
+            self._grow(min(self.capacity * 2, self.max_records))
+            index = self.size
+            self.size += 1
+        else:
+            index = self.start
+            evicted = (bool(self.success[index]), float(self.execution_time[index]))
+            self.start = (self.start + 1) % self.capacity
+        
+        self.timestamp[index] = timestamp
+        self.success[index] = success
+        self.execution_time[index] = execution_time
+        self.input_size[index] = input_size
+        self.output_size[index] = output_size
+        self.context_id[index] = context_id
+        return evicted
+    
+    def column(self, name: str) -> np.ndarray:
+        """按时间顺序返回一列（副本）"""
+        values = getattr(self, name)
+        if self.start == 0:
+            return values[:self.size].copy()
+        return np.concatenate((values[self.start:], values[:self.start]))
+    
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in UsageRecordStore.COLUMNS)
+    
+    def _grow(self, capacity: int):
+        # 仅在未满 max_records 时扩容，此时 start 恒为 0
+        for name in UsageRecordStore.COLUMNS:
+            values = getattr(self, name)
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[:self.size] = values[:self.size]
+            setattr(self, name, grown)
+
+
+class UsageRecordStore:
+    """列式使用记录存储
+    
+    每个规则的记录保存在 NumPy 环形缓冲区中（每条约 37 字节），上下文键集合驻留为整数 ID，
+    多条记录共享同一份键列表。窗口统计用向量化运算计算，可导出为 npz 或 Parquet 文件供离线分析。
+    本类不加锁，由调用方（UsageTracker）保证互斥。
+    """
+    
+    COLUMNS = ('timestamp', 'success', 'execution_time', 'input_size', 'output_size', 'context_id')
+    
+    def __init__(self, max_records: int = 10000):
+        self.max_records = max_records
+        self.rules: Dict[str, _RuleUsageColumns] = {}
+        self.context_ids: Dict[Tuple[str, ...], int] = {}
+        self.context_key_sets: List[Tuple[str, ...]] = []
+    
+    def __len__(self) -> int:
+        return len(self.rules)
+    
+    def __contains__(self, rule_id: str) -> bool:
+        return rule_id in self.rules
+    
+    def __iter__(self):
+        return iter(self.rules)
+    
+    def append(self, record: RuleUsageRecord) -> Optional[Tuple[bool, float]]:
+        """追加一条记录，返回被覆盖记录的 (success, execution_time)"""
+        columns = self.rules.get(record.rule_id)
+        if columns is None:
+            columns = self.rules[record.rule_id] = _RuleUsageColumns(self.max_records)
+        return columns.append(record.timestamp, record.success, record.execution_time,
+                              record.input_size, record.output_size,
+                              self.intern_context(record.context_keys))
+    
+    def intern_context(self, context_keys: List[str]) -> int:
+        """获取上下文键集合的 ID"""
+        key_set = tuple(context_keys)
+        context_id = self.context_ids.get(key_set)
+        if context_id is None:
+            context_id = self.context_ids[key_set] = len(self.context_key_sets)
+            self.context_key_sets.append(key_set)
+        return context_id
+    
+    def count(self, rule_id: str) -> int:
+        columns = self.rules.get(rule_id)
+        return columns.size if columns is not None else 0
+    
+    def get_columns(self, rule_id: str) -> Dict[str, np.ndarray]:
+        """按时间顺序获取规则的所有列"""
+        columns = self.rules.get(rule_id)
+        if columns is None:
+            return {name: np.empty(0) for name in self.COLUMNS}
+        return {name: columns.column(name) for name in self.COLUMNS}
+    
+    def get_records(self, rule_id: str) -> List[RuleUsageRecord]:
+        """按时间顺序还原规则的使用记录"""
+        data = self.get_columns(rule_id)
+        return [
+            RuleUsageRecord(
+                rule_id=rule_id,
+                timestamp=float(data['timestamp'][i]),
+                success=bool(data['success'][i]),
+                execution_time=float(data['execution_time'][i]),
+                context_keys=list(self.context_key_sets[data['context_id'][i]]),
+                input_size=int(data['input_size'][i]),
+                output_size=int(data['output_size'][i])
+            )
+            for i in range(len(data['timestamp']))
+        ]
+    
+    def window_stats(self, rule_id: str, since: float) -> Dict[str, Any]:
+        """统计 since 之后的记录（精确窗口，向量化计算）"""
+        columns = self.rules.get(rule_id)
+        if columns is None or columns.size == 0:
+            return {'count': 0, 'success_count': 0, 'avg_execution_time': 0.0,
+                    'execution_time_variance': 0.0, 'avg_input_size': 0.0, 'avg_output_size': 0.0}
+        # 统计与顺序无关，直接使用有效区间
+        size = columns.size
+        mask = columns.timestamp[:size] >= since
+        count = int(np.count_nonzero(mask))
+        if count == 0:
+            return {'count': 0, 'success_count': 0, 'avg_execution_time': 0.0,
+                    'execution_time_variance': 0.0, 'avg_input_size': 0.0, 'avg_output_size': 0.0}
+        times = columns.execution_time[:size][mask]
+        return {
+            'count': count,
+            'success_count': int(np.count_nonzero(columns.success[:size] & mask)),
+            'avg_execution_time': float(times.mean()),
+            'execution_time_variance': float(times.var()),
+            'avg_input_size': float(columns.input_size[:size][mask].mean()),
+            'avg_output_size': float(columns.output_size[:size][mask].mean())
+        }
+    
+    def memory_usage(self) -> Dict[str, Any]:
+        """获取内存占用"""
+        allocated = sum(columns.nbytes() for columns in self.rules.values())
+        records = sum(columns.size for columns in self.rules.values())
+        return {
+            'records': records,
+            'allocated_bytes': allocated,
+            'bytes_per_record': allocated / records if records > 0 else 0.0,
+            'context_key_sets': len(self.context_key_sets)
+        }
+    
+    def export(self, path: str) -> bool:
+        """导出所有记录，.parquet 后缀使用 pandas（需要 pyarrow），其他后缀保存为 npz"""
+        try:
+            rule_ids = list(self.rules)
+            parts = [self.get_columns(rule_id) for rule_id in rule_ids]
+            data = {
+                name: np.concatenate([part[name] for part in parts]) if parts else np.empty(0)
+                for name in self.COLUMNS
+            }
+            rule_index = np.repeat(np.arange(len(rule_ids), dtype=np.int32),
+                                   [len(part['timestamp']) for part in parts])
+            
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            
+            if path.endswith('.parquet'):
+                import pandas as pd
+                frame = pd.DataFrame(data)
+                frame.insert(0, 'rule_id', pd.Categorical.from_codes(rule_index, categories=rule_ids))
+                frame['context_keys'] = [list(self.context_key_sets[i]) for i in data['context_id']]
+                frame.drop(columns='context_id').to_parquet(path, index=False)
+            else:
+                np.savez_compressed(
+                    path,
+                    rule_ids=np.array(rule_ids, dtype=str),
+                    rule_index=rule_index,
+                    context_key_sets=np.array([json.dumps(key_set) for key_set in self.context_key_sets], dtype=str),
+                    **data
+                )
+            logger.info(f"使用记录已导出: {path}")
+            return True
+            
+        except ImportError:
+            logger.warning("pandas或pyarrow未安装，无法导出Parquet文件")
+            return False
+        except Exception as e:
+            logger.error(f"导出使用记录失败: {e}")
+            return False
+
+
 class UsageTracker:
-    """使用跟踪器"""
+    """使用跟踪器
+    
+    每个规则在 UsageRecordStore 中保留最近 max_records 条记录，
+    常用统计由 UsageAggregateTable 增量维护，单个或批量查询均不扫描记录。
+    """
     
     def __init__(self, max_records: int = 10000):
-        self.usage_records: Dict[str, deque] = defaultdict(lambda: deque(maxlen=max_records))
+        self.max_records = max_records
+        self.usage_records = UsageRecordStore(max_records)
+        self.aggregates = UsageAggregateTable()
         self.lock = Lock()
     
     def record_usage(self, rule_id: str, success: bool, execution_time: float, 
@@ -81,50 +419,81 @@ class UsageTracker:
         )
         
         with self.lock:
-            self.usage_records[rule_id].append(record)
+            row = self.aggregates.row(rule_id)
+            # 缓冲区已满时最旧的记录被覆盖，从统计中移出
+            evicted = self.usage_records.append(record)
+            if evicted is not None:
+                self.aggregates.remove(row, *evicted)
+            self.aggregates.add(row, record.timestamp, success, execution_time)
     
     def get_usage_stats(self, rule_id: str, time_window: float = 3600) -> Dict[str, Any]:
         """获取使用统计"""
         with self.lock:
-            records = self.usage_records.get(rule_id, [])
-        
-        if not records:
-            return {
-                'total_usage': 0,
-                'success_count': 0,
-                'success_rate': 0.0,
-                'avg_execution_time': 0.0,
-                'recent_usage': 0,
-                'usage_frequency': 0.0
-            }
-        
-        # 过滤时间窗口内的记录
-        current_time = time.time()
-        recent_records = [r for r in records if current_time - r.timestamp <= time_window]
+            arrays = self._collect_stats(self.aggregates.lookup([rule_id]), time_window, time.time())
+        return {name: values[0].item() for name, values in arrays.items()}
+    
+    def get_all_usage_stats(self, time_window: float = 3600) -> Dict[str, Dict[str, Any]]:
+        """获取所有规则的使用统计"""
+        with self.lock:
+            rule_ids = list(self.aggregates.rows)
+            arrays = self._collect_stats(self.aggregates.lookup(rule_ids), time_window, time.time())
         
-        total_usage = len(records)
-        success_count = sum(1 for r in records if r.success)
-        success_rate = success_count / total_usage if total_usage > 0 else 0.0
-        avg_execution_time = sum(r.execution_time for r in records) / total_usage if total_usage > 0 else 0.0
-        recent_usage = len(recent_records)
-        usage_frequency = recent_usage / (time_window / 3600) if time_window > 0 else 0.0  # 每小时使用次数
+        all_stats = {}
+        for i, rule_id in enumerate(rule_ids):
+            if arrays['total_usage'][i] > 0:
+                all_stats[rule_id] = {name: values[i].item() for name, values in arrays.items()}
+        return all_stats
+    
+    def get_usage_arrays(self, rule_ids: List[str], time_window: float = 3600) -> Dict[str, np.ndarray]:
+        """批量获取使用统计，每项为与 rule_ids 对齐的数组，未记录的规则为 0"""
+        with self.lock:
+            return self._collect_stats(self.aggregates.lookup(rule_ids), time_window, time.time())
+    
+    def get_window_stats(self, rule_id: str, time_window: float = 3600) -> Dict[str, Any]:
+        """获取精确时间窗口内的统计（扫描列式记录）"""
+        since = time.time() - time_window
+        with self.lock:
+            return self.usage_records.window_stats(rule_id, since)
+    
+    def get_records(self, rule_id: str) -> List[RuleUsageRecord]:
+        """获取规则保留的使用记录"""
+        with self.lock:
+            return self.usage_records.get_records(rule_id)
+    
+    def export_records(self, path: str) -> bool:
+        """导出使用记录供离线分析"""
+        with self.lock:
+            return self.usage_records.export(path)
+    
+    def get_memory_usage(self) -> Dict[str, Any]:
+        """获取使用记录的内存占用"""
+        with self.lock:
+            return self.usage_records.memory_usage()
+    
+    def _collect_stats(self, rows: np.ndarray, time_window: float, current_time: float) -> Dict[str, np.ndarray]:
+        """由聚合统计生成统计数组（需持有锁），rows 中 -1 表示未记录的规则"""
+        table = self.aggregates
+        known = rows >= 0
+        safe_rows = np.where(known, rows, 0)
+        total_usage = np.where(known, table.count[safe_rows], 0)
+        success_count = np.where(known, table.success_count[safe_rows], 0)
+        has_usage = total_usage > 0
         
+        # 窗口计数不超过保留的记录数
+        recent_usage = np.minimum(np.where(known, table.window_counts(safe_rows, time_window, current_time), 0),
+                                  total_usage)
+        success_rate = np.divide(success_count, total_usage, out=np.zeros(len(rows)), where=has_usage)
+        variance = np.divide(table.m2_time[safe_rows], total_usage, out=np.zeros(len(rows)), where=has_usage)
+        usage_frequency = recent_usage / (time_window / 3600) if time_window > 0 else np.zeros(len(rows))
         return {
             'total_usage': total_usage,
             'success_count': success_count,
             'success_rate': success_rate,
-            'avg_execution_time': avg_execution_time,
+            'avg_execution_time': np.where(has_usage, table.mean_time[safe_rows], 0.0),
+            'execution_time_variance': variance,
             'recent_usage': recent_usage,
-            'usage_frequency': usage_frequency
+            'usage_frequency': usage_frequency.astype(np.float64)  # 每小时使用次数
         }
-    
-    def get_all_usage_stats(self, time_window: float = 3600) -> Dict[str, Dict[str, Any]]:
-        """获取所有规则的使用统计"""
-        stats = {}
-        with self.lock:
-            for rule_id in self.usage_records:
-                stats[rule_id] = self.get_usage_stats(rule_id, time_window)
-        return stats
 
 
 class ComplexityAnalyzer:
@@ -175,6 +544,40 @@ class ComplexityAnalyzer:
             logger.error(f"复杂度分析失败: {e}")
             return 0.5  # 默认中等复杂度
     
+    def analyze_complexity_batch(self, rules: List[Any]) -> np.ndarray:
+        """批量分析规则复杂度，各项得分组成矩阵后与权重做点积"""
+        rows = []
+        failed = []
+        for i, rule in enumerate(rules):
+            try:
+                rows.append((
+                    len(rule.conditions) if hasattr(rule, 'conditions') else 0,
+                    len(rule.actions) if hasattr(rule, 'actions') else 0,
+                    self._calculate_nested_depth(rule),
+                    self._analyze_pattern_complexity(rule),
+                    self._analyze_data_dependencies(rule)
+                ))
+            except Exception as e:
+                logger.error(f"复杂度分析失败: {e}")
+                rows.append((0, 0, 0, 0.0, 0.0))
+                failed.append(i)
+        scores = np.array(rows, dtype=np.float64).reshape(len(rules), 5)
+        
+        # 与 analyze_complexity 相同的归一化
+        scores[:, 0] = np.minimum(scores[:, 0] / 10.0, 1.0)
+        scores[:, 1] = np.minimum(scores[:, 1] / 5.0, 1.0)
+        scores[:, 2] = np.minimum(scores[:, 2] / 5.0, 1.0)
+        weights = np.array([
+            self.complexity_factors['condition_count'],
+            self.complexity_factors['action_count'],
+            self.complexity_factors['nested_depth'],
+            self.complexity_factors['pattern_complexity'],
+            self.complexity_factors['data_dependencies']
+        ])
+        complexity = np.minimum(scores @ weights, 1.0)
+        complexity[failed] = 0.5  # 默认中等复杂度
+        return complexity
+    
     def _calculate_nested_depth(self, rule: Any) -> int:
         """计算嵌套深度"""
         # 简化实现，实际应该分析规则结构
@@ -192,10 +595,20 @@ class ComplexityAnalyzer:
 
 
 class ContextRelevanceAnalyzer:
-    """上下文相关性分析器"""
+    """上下文相关性分析器
+    
+    维护上下文键到配置文件的倒排索引和规则到配置文件的索引，并预存每个配置文件的键集合。
+    相似度（Jaccard）只对与查询至少共享一个键的配置文件计算，并集大小为两侧键数之和减去重叠数；
+    其余配置文件相似度为 0，只计入规则的配置文件数。批量查询和建议由倒排索引累加重叠数，
+    单个规则只与其所在的配置文件比较。
+    """
     
     def __init__(self):
         self.context_profiles: Dict[str, ContextProfile] = {}
+        self.key_index: Dict[str, set] = defaultdict(set)  # context_key -> {context_id}
+        self.rule_profiles: Dict[str, set] = defaultdict(set)  # rule_id -> {context_id}
+        self.profile_key_sets: Dict[str, frozenset] = {}  # context_id -> 去重后的键集合
+        self.profile_order: Dict[str, int] = {}  # context_id -> 创建顺序
         self.lock = Lock()
     
     def update_context_profile(self, context_id: str, context_keys: List[str], 
@@ -209,52 +622,86 @@ class ContextRelevanceAnalyzer:
                     rule_usage={},
                     last_updated=time.time()
                 )
+                key_set = frozenset(context_keys)
+                for key in key_set:
+                    self.key_index[key].add(context_id)
+                self.profile_key_sets[context_id] = key_set
+                self.profile_order[context_id] = len(self.profile_order)
             
             profile = self.context_profiles[context_id]
+            if rule_id not in profile.rule_usage:
+                self.rule_profiles[rule_id].add(context_id)
             profile.rule_usage[rule_id] = profile.rule_usage.get(rule_id, 0) + 1
             profile.last_updated = time.time()
     
     def calculate_relevance(self, rule_id: str, context_keys: List[str]) -> float:
         """计算上下文相关性"""
+        context_set = set(context_keys)
         with self.lock:
-            total_relevance = 0.0
-            profile_count = 0
-            
-            for profile in self.context_profiles.values():
-                if rule_id in profile.rule_usage:
-                    # 计算上下文键的重叠度
-                    overlap = len(set(context_keys) & set(profile.context_keys))
-                    total_keys = len(set(context_keys) | set(profile.context_keys))
-                    
-                    if total_keys > 0:
-                        similarity = overlap / total_keys
-                        usage_weight = min(profile.rule_usage[rule_id] / 10.0, 1.0)  # 归一化使用次数
-                        relevance = similarity * usage_weight
-                        total_relevance += relevance
-                        profile_count += 1
-            
-            if profile_count > 0:
-                return total_relevance / profile_count
-            else:
+            profiles = self.rule_profiles.get(rule_id)
+            # 查询键为空时所有相似度均为 0
+            if not profiles or not context_set:
                 return 0.0
+            
+            # 单个规则只需与其所在的配置文件比较
+            query_size = len(context_set)
+            total_relevance = 0.0
+            for context_id in profiles:
+                key_set = self.profile_key_sets[context_id]
+                overlap = len(context_set & key_set)
+                if overlap:
+                    similarity = overlap / (query_size + len(key_set) - overlap)
+                    usage_weight = min(self.context_profiles[context_id].rule_usage[rule_id] / 10.0, 1.0)  # 归一化使用次数
+                    total_relevance += similarity * usage_weight
+            
+            # 查询键非空时每个包含该规则的配置文件都参与平均
+            return total_relevance / len(profiles)
+    
+    def calculate_relevance_batch(self, rule_ids: List[str], context_keys: List[str]) -> np.ndarray:
+        """批量计算上下文相关性，只遍历与查询共享键的配置文件"""
+        total_relevance = np.zeros(len(rule_ids), dtype=np.float64)
+        context_set = set(context_keys)
+        if not context_set:
+            return total_relevance
+        positions = {rule_id: i for i, rule_id in enumerate(rule_ids)}
+        
+        with self.lock:
+            profile_count = np.fromiter((len(self.rule_profiles.get(rule_id, ())) for rule_id in rule_ids),
+                                        dtype=np.int64, count=len(rule_ids))
+            for context_id, similarity in self._calculate_similarities(context_set).items():
+                for rule_id, usage_count in self.context_profiles[context_id].rule_usage.items():
+                    i = positions.get(rule_id)
+                    if i is not None:
+                        total_relevance[i] += similarity * min(usage_count / 10.0, 1.0)
+        
+        return np.divide(total_relevance, profile_count, out=total_relevance, where=profile_count > 0)
     
     def get_context_suggestions(self, context_keys: List[str], top_k: int = 5) -> List[Tuple[str, float]]:
         """获取上下文建议"""
-        suggestions = []
-        
         with self.lock:
-            for profile in self.context_profiles.values():
-                overlap = len(set(context_keys) & set(profile.context_keys))
-                if overlap > 0:
-                    similarity = overlap / len(set(context_keys) | set(profile.context_keys))
-                    
-                    for rule_id, usage_count in profile.rule_usage.items():
-                        score = similarity * min(usage_count / 10.0, 1.0)
-                        suggestions.append((rule_id, score))
+            similarities = self._calculate_similarities(set(context_keys))
+            # 按配置文件创建顺序遍历，同分时的先后与全量排序一致
+            candidates = sorted(similarities, key=self.profile_order.__getitem__)
+            suggestions = (
+                (rule_id, similarities[context_id] * min(usage_count / 10.0, 1.0))
+                for context_id in candidates
+                for rule_id, usage_count in self.context_profiles[context_id].rule_usage.items()
+            )
+            # 有界堆选出top_k
+            return heapq.nlargest(top_k, suggestions, key=lambda x: x[1])
+    
+    def _calculate_similarities(self, context_set: set) -> Dict[str, float]:
+        """计算与查询共享键的配置文件的 Jaccard 相似度（需持有锁）"""
+        overlaps: Dict[str, int] = defaultdict(int)
+        for key in context_set:
+            for context_id in self.key_index.get(key, ()):
+                overlaps[context_id] += 1
         
-        # 按分数排序并返回top_k
-        suggestions.sort(key=lambda x: x[1], reverse=True)
-        return suggestions[:top_k]
+        query_size = len(context_set)
+        return {
+            context_id: overlap / (query_size + len(self.profile_key_sets[context_id]) - overlap)
+            for context_id, overlap in overlaps.items()
+        }
 
 
 class PerformanceScorer:
@@ -288,6 +735,14 @@ class PerformanceScorer:
         except Exception as e:
             logger.error(f"性能评分计算失败: {e}")
             return 0.5  # 默认中等性能
+    
+    def calculate_performance_scores(self, execution_times: np.ndarray, memory_usage: float = 0,
+                                     throughput: float = 0) -> np.ndarray:
+        """批量计算性能评分"""
+        time_scores = np.maximum(0.0, 1 - execution_times / self.performance_thresholds['execution_time'])
+        memory_score = max(0, 1 - memory_usage / self.performance_thresholds['memory_usage'])
+        throughput_score = min(1, throughput / self.performance_thresholds['throughput'])
+        return np.minimum(time_scores * 0.5 + memory_score * 0.3 + throughput_score * 0.2, 1.0)
 
 
 class RulePriorityManager:
@@ -369,20 +824,64 @@ class RulePriorityManager:
         with self.lock:
             self.user_feedback[rule_id] = max(0.0, min(1.0, feedback_score))
     
-    def optimize_rule_order(self, rules: List[Any], context_keys: List[str] = None) -> List[Any]:
-        """优化规则顺序"""
+    def calculate_priorities(self, rules: List[Any], context_keys: List[str] = None) -> np.ndarray:
+        """批量计算规则优先级
+        
+        七个优先级因子按规则组成矩阵（列顺序同 PriorityFactors），与权重向量做点积，
+        结果与逐条调用 calculate_priority 一致。
+        """
+        context_keys = context_keys or []
+        rule_ids = [getattr(rule, 'rule_id', str(id(rule))) for rule in rules]
+        usage = self.usage_tracker.get_usage_arrays(rule_ids)
+        recent_usage = self.usage_tracker.get_usage_arrays(rule_ids, 86400)['recent_usage']
+        with self.lock:
+            feedback = np.fromiter((self.user_feedback.get(rule_id, 0.5) for rule_id in rule_ids),
+                                   dtype=np.float64, count=len(rule_ids))
+        
+        factors = np.column_stack((
+            np.minimum(usage['usage_frequency'] / 10.0, 1.0),
+            usage['success_rate'],
+            np.minimum(np.log(recent_usage + 1) / math.log(10), 1.0),
+            1.0 - self.complexity_analyzer.analyze_complexity_batch(rules),
+            self.context_analyzer.calculate_relevance_batch(rule_ids, context_keys),
+            feedback,
+            self.performance_scorer.calculate_performance_scores(usage['avg_execution_time'])
+        ))
+        weights = np.array([
+            self.weights.usage_frequency_weight,
+            self.weights.success_rate_weight,
+            self.weights.recency_weight,
+            self.weights.complexity_weight,
+            self.weights.context_relevance_weight,
+            self.weights.user_feedback_weight,
+            self.weights.performance_score_weight
+        ])
+        return np.minimum(factors @ weights, 1.0)
+    
+    def optimize_rule_order(self, rules: List[Any], context_keys: List[str] = None,
+                            top_k: Optional[int] = None) -> List[Any]:
+        """优化规则顺序，指定 top_k 时只返回优先级最高的 top_k 个规则"""
         try:
-            # 计算每个规则的优先级
-            rule_priorities = []
-            for rule in rules:
-                priority = self.calculate_priority(rule, context_keys)
-                rule_priorities.append((rule, priority))
-            
-            # 按优先级排序
-            rule_priorities.sort(key=lambda x: x[1], reverse=True)
+            if not rules:
+                return []
+            
+            # 批量计算优先级，取负值升序排列；稳定排序使同优先级的规则保持原顺序
+            scores = -self.calculate_priorities(rules, context_keys)
+            
+            if top_k is not None and top_k < len(rules):
+                if top_k <= 0:
+                    return []
+                threshold = scores[np.argpartition(scores, top_k - 1)[top_k - 1]]
+                # 与阈值相等的规则按原顺序补足，结果与完整排序的前 top_k 个一致
+                better = np.flatnonzero(scores < threshold)
+                tied = np.flatnonzero(scores == threshold)[:top_k - len(better)]
+                candidates = np.concatenate((better, tied))
+                order = candidates[np.lexsort((candidates, scores[candidates]))]
+            else:
+                order = np.argsort(scores, kind='stable')
             
             # 返回排序后的规则
-            return [rule for rule, priority in rule_priorities]
+            return [rules[i] for i in order]
             
         except Exception as e:
             logger.error(f"规则顺序优化失败: {e}")
@@ -473,5 +972,6 @@ class RulePriorityManager:
                 'total_tracked_rules': total_rules,
                 'total_context_profiles': total_contexts,
                 'total_user_feedback': total_feedback,
-                'usage_tracker_stats': self.usage_tracker.get_all_usage_stats()
+                'usage_tracker_stats': self.usage_tracker.get_all_usage_stats(),
+                'usage_record_memory': self.usage_tracker.get_memory_usage()
             } 
\ No newline at end of file
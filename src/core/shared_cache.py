@@ -0,0 +1,297 @@
+"""
+跨进程共享缓存模块
+基于 multiprocessing.shared_memory 的定长槽位哈希表，同一节点上的多个工作进程共享一份结果缓存；
+读取使用顺序锁（seqlock）无锁校验，写入按桶分段加锁（进程内线程锁 + fcntl 文件区间锁）
+"""
+
+import os
+import time
+import struct
+import pickle
+import hashlib
+import tempfile
+from typing import Dict, List, Any, Optional, Tuple
+from multiprocessing import shared_memory, resource_tracker
+from threading import Lock
+import logging
+
+try:
+    import fcntl
+except ImportError:  # 非 POSIX 平台只能在进程内互斥
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'RCSHM001'
+# 表头：标识, 槽位数, 槽位大小
+_TABLE_HEADER = struct.Struct('<8sII')
+# 槽位头：顺序号（奇数表示正在写入）, 键摘要, 过期时间（0 表示不过期）, 值长度
+_SLOT_HEADER = struct.Struct('<Q16sdI')
+_SEQ = struct.Struct('<Q')
+_EMPTY_DIGEST = bytes(16)
+
+
+class SharedMemoryCache:
+    """共享内存缓存
+    
+    表由 num_slots 个 slot_size 字节的槽位组成，按 WAYS 个槽位一组分桶（组相联），
+    键的 blake2b-128 摘要决定所在桶；桶满时替换最早过期的槽位。值序列化后超过槽位容量时不缓存。
+    
+    读取：读顺序号 → 复制槽位内容 → 再读顺序号，两次一致且为偶数才采用，否则重试，不加锁。
+    写入：持有桶所在分段的锁，顺序号加一（奇数）后写入，完成后再加一。
+    
+    同名的表在各进程中只创建一次，其他进程按名称挂载；表不随进程退出而删除，需显式调用 unlink。
+    """
+    
+    WAYS = 4
+    READ_RETRIES = 8
+    
+    def __init__(self, name: str = 'whotomaens_result_cache', num_slots: int = 4096,
+                 slot_size: int = 4096, num_stripes: int = 64):
+        self.name = name
+        self.num_slots = max(self.WAYS, num_slots - num_slots % self.WAYS)
+        self.slot_size = slot_size
+        self.capacity = slot_size - _SLOT_HEADER.size  # 单个值的最大字节数
+        self.num_buckets = self.num_slots // self.WAYS
+        self.num_stripes = max(1, min(num_stripes, self.num_buckets))
+        self.stripe_locks = [Lock() for _ in range(self.num_stripes)]
+        self.hit_count = 0
+        self.miss_count = 0
+        self.retry_count = 0
+        self.created = False
+        
+        self.shm = self._open_shared_memory()
+        self.buffer = self.shm.buf
+        self.lock_file = None
+        if fcntl is not None:
+            lock_path = os.path.join(tempfile.gettempdir(), f"{name}.lock")
+            self.lock_file = open(lock_path, 'a+b')
+        else:
+            logger.warning("fcntl不可用，共享缓存写入只在进程内互斥")
+    
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存值，未命中或已过期时返回 None"""
+        digest = self._digest(key)
+        buffer = self.buffer
+        slot_header_size = _SLOT_HEADER.size
+        now = time.time()
+        
+        for offset in self._bucket_offsets(digest):
+            for _ in range(self.READ_RETRIES):
+                seq, slot_digest, expire_at, length = _SLOT_HEADER.unpack_from(buffer, offset)
+                if seq & 1:
+                    self.retry_count += 1
+                    continue
+                if slot_digest != digest:
+                    break
+                data = bytes(buffer[offset + slot_header_size:offset + slot_header_size + min(length, self.capacity)])
+                if _SEQ.unpack_from(buffer, offset)[0] != seq:
+                    self.retry_count += 1
+                    continue
+                
+                if expire_at and expire_at <= now:
+                    self.miss_count += 1
+                    return None
+                try:
+                    value = pickle.loads(data)
+                except Exception as e:
+                    logger.warning(f"共享缓存值反序列化失败: {e}")
+                    self.miss_count += 1
+                    return None
+                self.hit_count += 1
+                return value
+        
+        self.miss_count += 1
+        return None
+    
+    def put(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """写入缓存值，值序列化后超过槽位容量时返回 False"""
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.warning(f"共享缓存序列化失败: {e}")
+            return False
+        if len(data) > self.capacity:
+            return False
+        
+        digest = self._digest(key)
+        expire_at = time.time() + ttl if ttl else 0.0
+        bucket = self._bucket(digest)
+        with self._stripe_lock(bucket):
+            offset = self._choose_slot(bucket, digest)
+            self._write_slot(offset, digest, expire_at, data)
+        return True
+    
+    def delete(self, key: str) -> bool:
+        """删除缓存值"""
+        digest = self._digest(key)
+        bucket = self._bucket(digest)
+        with self._stripe_lock(bucket):
+            for offset in self._bucket_offsets(digest):
+                if _SLOT_HEADER.unpack_from(self.buffer, offset)[1] == digest:
+                    self._write_slot(offset, _EMPTY_DIGEST, 0.0, b'')
+                    return True
+        return False
+    
+    def clear(self):
+        """清空所有槽位"""
+        for bucket in range(self.num_buckets):
+            with self._stripe_lock(bucket):
+                for way in range(self.WAYS):
+                    offset = self._slot_offset(bucket * self.WAYS + way)
+                    if _SLOT_HEADER.unpack_from(self.buffer, offset)[1] != _EMPTY_DIGEST:
+                        self._write_slot(offset, _EMPTY_DIGEST, 0.0, b'')
+    
+    def close(self):
+        """解除当前进程的映射（表仍保留）"""
+        self.buffer = None
+        self.shm.close()
+        if self.lock_file is not None:
+            self.lock_file.close()
+            self.lock_file = None
+    
+    def unlink(self):
+        """删除共享内存表，所有进程关闭后释放"""
+        # SharedMemory.unlink 会向 resource_tracker 注销，先重新登记以配对（见 _untrack）
+        self._track(self.shm)
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息（命中计数为当前进程的）"""
+        used_slots = 0
+        now = time.time()
+        for slot in range(self.num_slots):
+            _, digest, expire_at, _ = _SLOT_HEADER.unpack_from(self.buffer, self._slot_offset(slot))
+            if digest != _EMPTY_DIGEST and not (expire_at and expire_at <= now):
+                used_slots += 1
+        total = self.hit_count + self.miss_count
+        return {
+            'name': self.name,
+            'num_slots': self.num_slots,
+            'slot_size': self.slot_size,
+            'used_slots': used_slots,
+            'hit_count': self.hit_count,
+            'miss_count': self.miss_count,
+            'retry_count': self.retry_count,
+            'hit_rate': self.hit_count / total if total > 0 else 0.0
+        }
+    
+    def _open_shared_memory(self) -> shared_memory.SharedMemory:
+        """创建或按名称挂载共享内存表，并校验布局"""
+        size = _TABLE_HEADER.size + self.num_slots * self.slot_size
+        try:
+            shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+            self.created = True
+        except FileExistsError:
+            shm = shared_memory.SharedMemory(name=self.name)
+        # 表由 unlink 显式删除，不交给 resource_tracker 在某个进程退出时删除
+        self._untrack(shm)
+        
+        if self.created:
+            _TABLE_HEADER.pack_into(shm.buf, 0, _MAGIC, self.num_slots, self.slot_size)
+            logger.info(f"共享缓存已创建: {self.name}，{self.num_slots} 个槽位")
+            return shm
+        
+        # 创建方可能尚未写完表头
+        for _ in range(100):
+            magic, num_slots, slot_size = _TABLE_HEADER.unpack_from(shm.buf, 0)
+            if magic == _MAGIC:
+                break
+            time.sleep(0.01)
+        if magic != _MAGIC or num_slots != self.num_slots or slot_size != self.slot_size:
+            shm.close()
+            raise ValueError(f"共享缓存 {self.name} 已存在且布局不一致")
+        return shm
+    
+    @staticmethod
+    def _track(shm: shared_memory.SharedMemory):
+        try:
+            resource_tracker.register(shm._name, 'shared_memory')
+        except Exception:
+            pass
+    
+    @staticmethod
+    def _untrack(shm: shared_memory.SharedMemory):
+        try:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+    
+    @staticmethod
+    def _digest(key: str) -> bytes:
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        # 全零摘要保留给空槽位
+        return digest if digest != _EMPTY_DIGEST else b'\x01' + digest[1:]
+    
+    def _bucket(self, digest: bytes) -> int:
+        return int.from_bytes(digest[:8], 'little') % self.num_buckets
+    
+    def _slot_offset(self, slot: int) -> int:
+        return _TABLE_HEADER.size + slot * self.slot_size
+    
+    def _bucket_offsets(self, digest: bytes) -> List[int]:
+        first_slot = self._bucket(digest) * self.WAYS
+        return [self._slot_offset(first_slot + way) for way in range(self.WAYS)]
+    
+    def _choose_slot(self, bucket: int, digest: bytes) -> int:
+        """选择写入槽位（需持有分段锁）：同键槽位 > 空槽位/已过期槽位 > 最早过期的槽位"""
+        now = time.time()
+        candidate: Optional[Tuple[float, int]] = None
+        for way in range(self.WAYS):
+            offset = self._slot_offset(bucket * self.WAYS + way)
+            _, slot_digest, expire_at, _ = _SLOT_HEADER.unpack_from(self.buffer, offset)
+            if slot_digest == digest:
+                return offset
+            if slot_digest == _EMPTY_DIGEST or (expire_at and expire_at <= now):
+                rank = -1.0
+            else:
+                # 不过期的槽位最后替换
+                rank = expire_at if expire_at else float('inf')
+            if candidate is None or rank < candidate[0]:
+                candidate = (rank, offset)
+        return candidate[1]
+    
+    def _write_slot(self, offset: int, digest: bytes, expire_at: float, data: bytes):
+        """按顺序锁协议写入槽位（需持有分段锁）"""
+        buffer = self.buffer
+        seq = _SEQ.unpack_from(buffer, offset)[0]
+        _SEQ.pack_into(buffer, offset, seq + 1)
+        start = offset + _SLOT_HEADER.size
+        buffer[start:start + len(data)] = data
+        _SLOT_HEADER.pack_into(buffer, offset, seq + 1, digest, expire_at, len(data))
+        _SEQ.pack_into(buffer, offset, seq + 2)
+    
+    def _stripe_lock(self, bucket: int) -> '_StripeLock':
+        stripe = bucket % self.num_stripes
+        return _StripeLock(self.stripe_locks[stripe], self.lock_file, stripe)
+
+
+class _StripeLock:
+    """分段锁：进程内线程锁加上锁文件中第 stripe 个字节的 fcntl 区间锁"""
+    
+    __slots__ = ('thread_lock', 'lock_file', 'stripe')
+    
+    def __init__(self, thread_lock: Lock, lock_file, stripe: int):
+        self.thread_lock = thread_lock
+        self.lock_file = lock_file
+        self.stripe = stripe
+    
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if self.lock_file is not None:
+            try:
+                fcntl.lockf(self.lock_file, fcntl.LOCK_EX, 1, self.stripe)
+            except BaseException:
+                self.thread_lock.release()
+                raise
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if self.lock_file is not None:
+                fcntl.lockf(self.lock_file, fcntl.LOCK_UN, 1, self.stripe)
+        finally:
+            self.thread_lock.release()
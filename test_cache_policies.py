@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+缓存淘汰策略测试
+验证各淘汰策略的抗扫描能力和接纳行为
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from src.core.rule_cache_manager import LRUCache, ShardedLRUCache, CountMinSketch, LFUPolicy
+
+
+def _fill_then_scan(policy: str, hot_requests: int = 10, scan_length: int = 200):
+    """热点键先被多次请求后写入，缓存填满后执行一次性扫描，返回扫描后热点键是否仍在缓存中"""
+    cache = LRUCache(max_size=100, max_memory_mb=1, eviction_policy=policy)
+    for _ in range(hot_requests):
+        assert cache.get('hot') is None
+    cache.put('hot', 'value', size=10)
+    for i in range(99):
+        cache.put(f"filler_{i}", i, size=10)
+
+    for i in range(scan_length):
+        assert cache.get(f"scan_{i}") is None
+        cache.put(f"scan_{i}", i, size=10)
+
+    return cache.get('hot') is not None
+
+
+def test_tinylfu_scan_cannot_displace_hot_key():
+    """一次性扫描的键频率低于热点键，W-TinyLFU 淘汰扫描键而保留热点键"""
+    assert _fill_then_scan('tinylfu')
+    # 作为对照，LRU 会被扫描冲刷
+    assert not _fill_then_scan('lru')
+
+
+def test_tinylfu_consults_sketch_on_eviction():
+    """缓存满后的每次淘汰都比较窗口候选与主区候选的草图频率"""
+    calls = []
+    original_frequency = CountMinSketch.frequency
+
+    def counting_frequency(sketch, key):
+        calls.append(key)
+        return original_frequency(sketch, key)
+
+    CountMinSketch.frequency = counting_frequency
+    try:
+        cache = LRUCache(max_size=50, max_memory_mb=1, eviction_policy='tinylfu')
+        for i in range(200):
+            cache.put(f"key_{i}", i, size=10)
+    finally:
+        CountMinSketch.frequency = original_frequency
+
+    assert len(calls) >= 2 * (200 - 50)
+    assert len(cache.cache) == 50
+
+
+def test_frequency_aware_policies_resist_scan():
+    """缓存中被反复命中的键在一次性扫描后仍保留，LRU 则被扫描冲刷"""
+    survivors = {}
+    for policy in ('lru', 'lfu', 'arc', 'tinylfu', 'gdsf'):
+        cache = LRUCache(max_size=100, max_memory_mb=1, eviction_policy=policy)
+        for i in range(100):
+            cache.put(f"hot_{i}", i, size=10)
+        for _ in range(5):
+            for i in range(10):
+                assert cache.get(f"hot_{i}") == i
+
+        for i in range(300):
+            assert cache.get(f"scan_{i}") is None
+            cache.put(f"scan_{i}", i, size=10)
+
+        assert len(cache.cache) == 100
+        survivors[policy] = sum(cache.get(f"hot_{i}") is not None for i in range(10))
+
+    assert survivors == {'lru': 0, 'lfu': 10, 'arc': 10, 'tinylfu': 10, 'gdsf': 10}
+
+
+def test_gdsf_rejects_cheap_large_entries():
+    """缓存已满时，GDSF 拒绝代价/大小比低于现有条目的新键，接纳比值更高的新键"""
+    cache = LRUCache(max_size=10, max_memory_mb=1, eviction_policy='gdsf')
+    for i in range(10):
+        cache.put(f"key_{i}", i, size=100, cost=1.0)
+
+    assert not cache.put('cheap', 'value', size=100000, cost=0.001)
+    assert 'cheap' not in cache.cache
+    assert cache.get_stats().rejected_count == 1
+    assert all(f"key_{i}" in cache.cache for i in range(10))
+
+    assert cache.put('expensive', 'value', size=10, cost=10.0)
+    assert 'expensive' in cache.cache
+    assert len(cache.cache) == 10
+
+
+def test_sharded_cache_creates_policy_per_shard():
+    """分片缓存按名称或工厂函数为每个分片各创建一个策略，拒绝共享策略实例"""
+    cache = ShardedLRUCache(max_size=100, max_memory_mb=1, eviction_policy=LFUPolicy, num_shards=4)
+    policies = [shard.policy for shard in cache.shards]
+    assert all(isinstance(policy, LFUPolicy) for policy in policies)
+    assert len({id(policy) for policy in policies}) == 4
+    assert all(policy.capacity == 25 for policy in policies)
+
+    cache = ShardedLRUCache(max_size=100, max_memory_mb=1, eviction_policy='tinylfu', num_shards=4)
+    assert len({id(shard.policy) for shard in cache.shards}) == 4
+
+    with pytest.raises(ValueError):
+        ShardedLRUCache(max_size=100, max_memory_mb=1, eviction_policy=LFUPolicy(100), num_shards=4)
+    single = ShardedLRUCache(max_size=100, max_memory_mb=1, eviction_policy=LFUPolicy(100), num_shards=1)
+    assert isinstance(single.shards[0].policy, LFUPolicy)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+缓存存储测试
+验证磁盘缓存的崩溃恢复与压缩，以及共享内存缓存的跨进程读写
+"""
+
+import sys
+import os
+import multiprocessing
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.disk_cache import DiskCache
+from src.core.shared_cache import SharedMemoryCache
+from src.core.rule_cache_manager import LRUCache
+
+
+def test_disk_cache_recovers_from_torn_tail(tmp_path):
+    """日志尾部的残缺记录在重新打开时被截断，之前的记录完整保留"""
+    path = str(tmp_path / 'cache.log')
+    cache = DiskCache(path)
+    for i in range(50):
+        cache.put(f"key_{i}", {'value': i}, 'v1', tags=[f"tag_{i % 3}"])
+    cache.put('last', 'torn', 'v1')
+    cache.close()
+
+    size = os.path.getsize(path)
+    with open(path, 'r+b') as f:
+        f.truncate(size - 3)
+
+    cache = DiskCache(path)
+    assert cache.get('last') is None
+    assert len(cache) == 50
+    assert all(cache.get(f"key_{i}")[0] == {'value': i} for i in range(50))
+    assert os.path.getsize(path) < size - 3
+    # 截断后继续追加的记录可以正常读回
+    cache.put('after', 'ok', 'v1')
+    cache.close()
+    cache = DiskCache(path)
+    assert cache.get('after')[0] == 'ok'
+    cache.close()
+
+
+def test_disk_cache_ignores_garbage_tail(tmp_path):
+    """尾部的随机字节校验失败，视为残缺写入"""
+    path = str(tmp_path / 'cache.log')
+    cache = DiskCache(path)
+    cache.put('key', 'value', 'v1')
+    cache.close()
+    with open(path, 'ab') as f:
+        f.write(os.urandom(100))
+
+    cache = DiskCache(path)
+    assert len(cache) == 1
+    assert cache.get('key')[0] == 'value'
+    cache.close()
+
+
+def test_disk_cache_compaction(tmp_path):
+    """压缩只保留存活记录，文件变小，重新打开后内容不变"""
+    path = str(tmp_path / 'cache.log')
+    cache = DiskCache(path, min_compaction_bytes=1 << 30)
+    for round_index in range(5):
+        for i in range(100):
+            cache.put(f"key_{i}", 'x' * 100 + str(round_index), 'v1')
+    for i in range(0, 100, 2):
+        cache.delete(f"key_{i}")
+    size_before = os.path.getsize(path)
+
+    cache.compact('v2')
+    assert os.path.getsize(path) < size_before / 5
+    assert cache.get_stats()['file_bytes'] == os.path.getsize(path)
+    cache.close()
+
+    cache = DiskCache(path)
+    assert len(cache) == 50
+    assert cache.get('key_1', 'v2')[0] == 'x' * 100 + '4'
+    assert cache.get('key_0') is None
+    # 压缩时改写了版本，旧版本的读取不命中
+    assert cache.get('key_3', 'v1') is None
+    cache.close()
+
+
+def test_disk_cache_automatic_compaction(tmp_path):
+    """失效字节超过比例后自动压缩"""
+    path = str(tmp_path / 'cache.log')
+    cache = DiskCache(path, min_compaction_bytes=0)
+    for i in range(1000):
+        cache.put('key', 'x' * 100, 'v1')
+    assert os.path.getsize(path) < 10 * 200
+    assert cache.get('key')[0] == 'x' * 100
+    cache.close()
+
+
+def test_l2_writes_are_queued_until_flush(tmp_path):
+    """驱逐写入和删除标记先排队，读取先查队列；flush_l2 落盘后才写入日志，之后才压缩"""
+    l2 = DiskCache(str(tmp_path / 'cache.log'), min_compaction_bytes=0, auto_compact=False)
+    cache = LRUCache(max_size=2)
+    cache.attach_l2(l2, 'v1')
+    for i in range(4):
+        cache.put(f"key_{i}", i)
+    assert len(l2) == 0
+    # 新键排队删除标记（二级中可能有旧值），被驱逐的键排队写入
+    assert {key: record is not None for key, record in cache.l2_pending.items()} == \
+        {'key_0': True, 'key_1': True, 'key_2': False, 'key_3': False}
+
+    # 排队中的写入可以直接提升回一级，并为二级副本排队删除标记
+    assert cache.get('key_0') == 0
+    assert cache.l2_pending['key_0'] is None
+    cache.remove('key_1')
+    assert cache.get('key_1') is None
+
+    cache.flush_l2()
+    assert not cache.l2_pending
+    assert sorted(l2.index) == ['key_2']
+    assert l2.get_stats()['file_bytes'] < 200
+    assert cache.get('key_2') == 2
+    l2.close()
+
+
+def _shared_cache_worker(name: str, worker_id: int, queue):
+    cache = SharedMemoryCache(name, num_slots=256, slot_size=512)
+    for i in range(200):
+        cache.put(f"worker_{worker_id}_{i}", (worker_id, i))
+    mismatches = 0
+    for other in range(4):
+        for i in range(200):
+            value = cache.get(f"worker_{other}_{i}")
+            if value is not None and value != (other, i):
+                mismatches += 1
+    queue.put(mismatches)
+    cache.close()
+
+
+def test_shared_memory_cache_across_processes():
+    """多个进程写入同一张共享内存表，各进程读到的值与键对应，主进程能读到子进程写入的值"""
+    name = f"whotomaens_test_{os.getpid()}"
+    cache = SharedMemoryCache(name, num_slots=256, slot_size=512)
+    try:
+        assert cache.created
+
+        queue = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_shared_cache_worker, args=(name, worker_id, queue))
+                     for worker_id in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+            assert process.exitcode == 0
+        assert [queue.get(timeout=5) for _ in processes] == [0, 0, 0, 0]
+
+        found = 0
+        for worker_id in range(4):
+            for i in range(200):
+                value = cache.get(f"worker_{worker_id}_{i}")
+                if value is not None:
+                    assert value == (worker_id, i)
+                    found += 1
+        assert found > 0
+
+        attached = SharedMemoryCache(name, num_slots=256, slot_size=512)
+        assert not attached.created
+        attached.close()
+    finally:
+        cache.close()
+        cache.unlink()
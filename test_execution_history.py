@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+执行历史测试
+验证环形缓冲区写满后循环覆盖最旧的记录，以及清空后的序号范围
+"""
+
+import sys
+import os
+import threading
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from src.core.rule_engine import ExecutionHistory
+
+
+def _fill(history: ExecutionHistory, count: int):
+    for i in range(count):
+        history.record(f"rule_{i % 3}", i / 100, i * 0.001, i % 2 == 0, float(i))
+
+
+def test_history_before_wraparound():
+    """未写满时按从新到旧返回全部记录"""
+    history = ExecutionHistory(capacity=10)
+    _fill(history, 4)
+    assert len(history) == 4
+    assert [record.timestamp for record in history.recent()] == [3.0, 2.0, 1.0, 0.0]
+
+
+def test_history_wraparound_keeps_latest_records():
+    """写满后覆盖最旧的记录，只保留最近 capacity 条"""
+    history = ExecutionHistory(capacity=10)
+    _fill(history, 25)
+    assert len(history) == 10
+
+    records = history.recent(100)
+    assert [record.timestamp for record in records] == [float(i) for i in range(24, 14, -1)]
+    latest = records[0]
+    assert latest.rule_id == 'rule_0'
+    assert latest.match_score == 0.24
+    assert latest.execution_time == 0.024
+    assert latest.success
+
+    assert [record.timestamp for record in history.recent(3)] == [24.0, 23.0, 22.0]
+    assert [record.timestamp for record in history.recent_matches('rule_1')] == [22.0, 19.0, 16.0]
+    assert history.recent_matches('missing') == []
+
+
+def test_history_concurrent_writers():
+    """多线程并发写入后，保留的记录是最近写入的 capacity 条且互不重复"""
+    history = ExecutionHistory(capacity=100)
+
+    def writer(worker_id: int):
+        for i in range(1000):
+            history.record(f"rule_{worker_id}", 0.5, 0.0, True, float(worker_id * 1000 + i))
+
+    threads = [threading.Thread(target=writer, args=(worker_id,)) for worker_id in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    records = history.recent(1000)
+    assert len(history) == 100
+    assert len(records) == 100
+    assert len({record.timestamp for record in records}) == 100
+    # 同一线程的记录按写入顺序从新到旧排列
+    for worker_id in range(4):
+        own = [record.timestamp for record in records if record.rule_id == f"rule_{worker_id}"]
+        assert own == sorted(own, reverse=True)
+
+
+def test_history_clear_resets_length():
+    """清空后长度归零，之后只返回清空后写入的记录"""
+    history = ExecutionHistory(capacity=10)
+    _fill(history, 25)
+    history.clear()
+    assert len(history) == 0
+    assert history.recent() == []
+    assert history.recent_matches('rule_0') == []
+
+    history.record('rule_new', 0.9, 0.01, True, 100.0)
+    assert len(history) == 1
+    assert [record.rule_id for record in history.recent()] == ['rule_new']
+
+    _fill(history, 12)
+    assert len(history) == 10
+    assert [record.timestamp for record in history.recent()] == [float(i) for i in range(11, 1, -1)]
+
+
+def test_history_capacity_must_be_positive():
+    """容量必须大于0"""
+    with pytest.raises(ValueError):
+        ExecutionHistory(capacity=0)
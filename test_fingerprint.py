@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+输入指纹测试
+验证指纹区分值的类型、不受字典键顺序影响、支持非连续数组、跨进程稳定，不支持的类型不生成指纹
+"""
+
+import sys
+import os
+import subprocess
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pytest
+
+from src.core.rule_cache_manager import compute_fingerprint, RuleCacheManager
+
+SAMPLE = {
+    'name': 'abc',
+    'values': [1, 2.5, None, True],
+    'nested': {'b': (1, 2), 'a': {'x': b'bytes'}},
+    'tags': {'t1', 't2'},
+    'array': np.arange(6, dtype=np.int64).reshape(2, 3),
+    'scalar': np.float32(1.5),
+}
+
+
+def test_numbers_bools_and_strings_differ():
+    """1、1.0、True 和 '1' 的指纹互不相同"""
+    keys = [compute_fingerprint(value) for value in (1, 1.0, True, '1')]
+    assert len(set(keys)) == 4
+    keys = [compute_fingerprint({'x': value}) for value in (1, 1.0, True, '1')]
+    assert len(set(keys)) == 4
+
+
+def test_list_and_tuple_differ():
+    """列表和元组的指纹不同"""
+    assert compute_fingerprint([1, 2]) != compute_fingerprint((1, 2))
+    assert compute_fingerprint({'x': [1, [2]]}) != compute_fingerprint({'x': [1, (2,)]})
+
+
+def test_dict_key_order_is_ignored():
+    """字典键的插入顺序不影响指纹，键值不同时指纹不同"""
+    first = {'a': 1, 'b': [1, {'c': 2, 'd': 3}]}
+    second = {'b': [1, {'d': 3, 'c': 2}], 'a': 1}
+    assert compute_fingerprint(first) == compute_fingerprint(second)
+    assert compute_fingerprint(first) != compute_fingerprint({'a': 1, 'b': [1, {'c': 3, 'd': 2}]})
+
+
+def test_non_contiguous_arrays():
+    """非连续数组按值计算指纹，与同值的连续数组一致，与形状或类型不同的数组不同"""
+    base = np.arange(24, dtype=np.float64).reshape(4, 6)
+    view = base[:, ::2]
+    assert not view.flags.c_contiguous
+    assert compute_fingerprint(view) == compute_fingerprint(np.ascontiguousarray(view))
+    assert compute_fingerprint(base.T) == compute_fingerprint(base.T.copy())
+    assert compute_fingerprint(view) != compute_fingerprint(base[:, 1::2])
+    assert compute_fingerprint(view) != compute_fingerprint(view.reshape(-1))
+    assert compute_fingerprint(view) != compute_fingerprint(view.astype(np.float32))
+
+
+def test_fingerprint_is_stable_across_processes():
+    """子进程中计算的指纹与本进程一致（不依赖哈希随机化和对象地址）"""
+    script = (
+        "import sys; sys.path.insert(0, sys.argv[1]); "
+        "from test_fingerprint import SAMPLE; "
+        "from src.core.rule_cache_manager import compute_fingerprint; "
+        "print(compute_fingerprint(SAMPLE))"
+    )
+    root = os.path.dirname(os.path.abspath(__file__))
+    environment = dict(os.environ, PYTHONHASHSEED='12345')
+    output = subprocess.run([sys.executable, '-c', script, root], capture_output=True, text=True,
+                            env=environment, check=True).stdout
+    assert output.strip() == compute_fingerprint(SAMPLE)
+
+
+def test_unsupported_types_are_not_cached():
+    """不支持的类型抛出 TypeError，结果缓存不缓存此类输入"""
+    class Custom:
+        pass
+
+    with pytest.raises(TypeError):
+        compute_fingerprint({'x': Custom()})
+    assert compute_fingerprint(...) != compute_fingerprint('...')
+
+    cache_manager = RuleCacheManager()
+    data = {'x': Custom()}
+    cache_manager.cache_result(data, ['result'])
+    assert cache_manager.get_result(data) is None
+    assert cache_manager.get_cache_stats()['result_cache']['total_entries'] == 0
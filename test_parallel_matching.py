@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+并行匹配测试
+验证规则增删改、调整优先级和启停后，分区并行匹配与串行匹配结果一致，分区增量失败后回退到串行匹配
+"""
+
+import sys
+import os
+import random
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.rule_engine import RuleEngine
+
+from test_rule_matching import _random_rule, _random_data, _copy_rule
+
+
+def _matches(matches):
+    return [(rule.rule_id, match_score, list(conditions)) for rule, match_score, conditions in matches]
+
+
+def test_parallel_matching_equals_serial_under_rule_changes():
+    """随机增删改、调整优先级和启停规则后，并行匹配的规则、得分和条件与串行匹配一致"""
+    rnd = random.Random(21)
+    for short_circuit in (False, True):
+        serial = RuleEngine(short_circuit=short_circuit)
+        parallel = RuleEngine(short_circuit=short_circuit)
+        for i in range(120):
+            rule = _random_rule(i, rnd)
+            serial.add_rule(rule)
+            parallel.add_rule(_copy_rule(rule))
+        parallel.enable_parallel_matching(3)
+        matcher = parallel.parallel_matcher
+        try:
+            next_index = 120
+            for step in range(300):
+                rule_id = f"rule_{rnd.randrange(next_index)}"
+                action = rnd.choice(['update', 'remove', 'add', 'priority', 'enable', 'match', 'match'])
+                if action == 'update' and rule_id in serial.rule_library.rules:
+                    rule = _random_rule(int(rule_id.split('_')[1]), rnd)
+                    serial.update_rule(rule)
+                    parallel.update_rule(_copy_rule(rule))
+                elif action == 'remove':
+                    assert serial.remove_rule(rule_id) == parallel.remove_rule(rule_id)
+                elif action == 'add':
+                    rule = _random_rule(next_index, rnd)
+                    next_index += 1
+                    serial.add_rule(rule)
+                    parallel.add_rule(_copy_rule(rule))
+                elif action == 'priority' and rule_id in serial.rule_library.rules:
+                    priority = rnd.choice([0.1, 0.5, 0.7, 0.9])
+                    serial.rule_library.set_rule_priority(rule_id, priority)
+                    parallel.rule_library.set_rule_priority(rule_id, priority)
+                elif action == 'enable' and rule_id in serial.rule_library.rules:
+                    enabled = not serial.rule_library.rules[rule_id].enabled
+                    serial.rule_library.set_rule_enabled(rule_id, enabled)
+                    parallel.rule_library.set_rule_enabled(rule_id, enabled)
+
+                data = _random_data(rnd)
+                max_rules = rnd.choice([1, 5, 50])
+                expected = _matches(serial.rule_library.find_matches(data, max_rules, short_circuit))
+                if short_circuit:
+                    # 工作进程补齐了完整得分，与串行短路匹配只比较规则和条件
+                    expected = [(rule_id, conditions) for rule_id, _, conditions in expected]
+                    actual = [(rule_id, conditions) for rule_id, _, conditions in _matches(matcher.match(data, max_rules))]
+                else:
+                    actual = _matches(matcher.match(data, max_rules))
+                assert actual == expected, (short_circuit, step)
+            assert not matcher.failed
+        finally:
+            parallel.disable_parallel_matching()
+
+
+def test_partition_update_failure_falls_back_to_serial():
+    """分区处理增量失败后，下一次匹配回复错误，匹配器停用工作进程池并回退到串行匹配"""
+    rnd = random.Random(3)
+    engine = RuleEngine()
+    for i in range(60):
+        engine.add_rule(_random_rule(i, rnd))
+    engine.enable_parallel_matching(2)
+    matcher = engine.parallel_matcher
+    try:
+        # 分区无法应用的增量：副本与规则库不再一致
+        with matcher.lock:
+            matcher.connections[0].send(('update', None))
+
+        data = _random_data(rnd)
+        expected = _matches(engine.rule_library.find_matches(data, 50))
+        assert _matches(matcher.match(data, 50)) == expected
+        assert matcher.failed
+        assert matcher.processes == []
+
+        engine.execute_rules(data, {}, 50)
+        assert engine.parallel_matcher is None
+    finally:
+        engine.disable_parallel_matching()
+        matcher.close()
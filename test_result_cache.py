@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+结果缓存测试
+验证规则更新、启停和优先级调整后缓存结果失效，带缓存的引擎与无缓存引擎结果一致
+"""
+
+import sys
+import os
+import random
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.rule_engine import RuleEngine, EngineRule, RuleCondition, RuleAction
+from src.core.rule_cache_manager import RuleCacheManager
+
+from test_rule_matching import _random_rule, _random_data, _copy_rule
+
+
+def _rule(rule_id: str, conditions, priority: float = 0.5) -> EngineRule:
+    return EngineRule(
+        rule_id=rule_id, name=rule_id, description='',
+        conditions=[RuleCondition(field=field_name, operator=operator, value=value, weight=weight)
+                    for field_name, operator, value, weight in conditions],
+        actions=[RuleAction(action_type='classify', parameters={'category': rule_id})],
+        priority=priority, confidence=0.8, created_at=0.0, updated_at=0.0
+    )
+
+
+def _cached_engine():
+    engine = RuleEngine()
+    cache_manager = RuleCacheManager()
+    engine.enable_result_cache(cache_manager)
+    return engine, cache_manager
+
+
+def _matched(engine: RuleEngine, data, max_rules: int = 10):
+    return [result.rule_id for result in engine.execute_rules(data, {}, max_rules)]
+
+
+def test_cached_result_is_reused():
+    """相同输入第二次执行命中缓存"""
+    engine, cache_manager = _cached_engine()
+    engine.add_rule(_rule('a', [('x', 'gt', 0, 1.0)]))
+    assert _matched(engine, {'x': 1}) == ['a']
+    assert _matched(engine, {'x': 1}) == ['a']
+    assert cache_manager.get_cache_stats()['result_cache']['hit_count'] == 1
+
+
+def test_rule_update_invalidates_results():
+    """更新规则后，依赖该规则的缓存结果和该规则新可能匹配的输入的结果都失效"""
+    engine, _ = _cached_engine()
+    engine.add_rule(_rule('a', [('x', 'gt', 0, 1.0)]))
+    engine.add_rule(_rule('b', [('y', 'gt', 0, 1.0)]))
+    assert _matched(engine, {'x': 1}) == ['a']
+    assert _matched(engine, {'y': 1}) == ['b']
+
+    # 规则 a 不再匹配原输入
+    engine.update_rule(_rule('a', [('x', 'gt', 5, 1.0)]))
+    assert _matched(engine, {'x': 1}) == []
+    # 规则 a 改为也能匹配只含 y 的输入，该输入的结果此前没有 a 参与
+    engine.update_rule(_rule('a', [('y', 'gt', 0, 1.0)]))
+    assert _matched(engine, {'y': 1}) == ['a', 'b']
+
+
+def test_negative_weight_rule_update_invalidates_results():
+    """总权重为负的规则更新后，包含其字段的输入的缓存结果失效"""
+    engine, _ = _cached_engine()
+    engine.add_rule(_rule('a', [('x', 'gt', 0, 1.0)]))
+    engine.add_rule(_rule('negative', [('x', 'gt', 5, 1.0)]))
+    assert _matched(engine, {'x': 2, 'z': 1}) == ['a']
+
+    engine.update_rule(_rule('negative', [('x', 'gt', 5, 1.0), ('z', 'gt', 0, -3.0)]))
+    assert _matched(engine, {'x': 2, 'z': 1}) == ['a', 'negative']
+
+
+def test_enable_and_disable_invalidate_results():
+    """停用规则后缓存结果不再包含它，重新启用后恢复"""
+    engine, _ = _cached_engine()
+    engine.add_rule(_rule('a', [('x', 'gt', 0, 1.0)]))
+    assert _matched(engine, {'x': 1}) == ['a']
+
+    engine.rule_library.set_rule_enabled('a', False)
+    assert _matched(engine, {'x': 1}) == []
+    engine.rule_library.set_rule_enabled('a', True)
+    assert _matched(engine, {'x': 1}) == ['a']
+
+
+def test_priority_change_invalidates_results():
+    """调整优先级后，max_rules 截断的结果按新的优先级顺序重新计算"""
+    engine, _ = _cached_engine()
+    engine.add_rule(_rule('low', [('x', 'gt', 0, 1.0)], priority=0.1))
+    engine.add_rule(_rule('high', [('x', 'gt', 0, 1.0)], priority=0.9))
+    assert _matched(engine, {'x': 1}, max_rules=1) == ['high']
+
+    engine.rule_library.set_rule_priority('low', 1.0)
+    assert _matched(engine, {'x': 1}, max_rules=1) == ['low']
+
+
+def test_cached_engine_equals_uncached_under_rule_changes():
+    """随机规则变更下，带缓存引擎的结果与无缓存引擎一致"""
+    rnd = random.Random(11)
+    plain = RuleEngine()
+    cached, _ = _cached_engine()
+    for i in range(120):
+        rule = _random_rule(i, rnd)
+        plain.add_rule(rule)
+        cached.add_rule(_copy_rule(rule))
+    pool = [_random_data(rnd) for _ in range(30)]
+    next_index = 120
+
+    for step in range(1500):
+        choice = rnd.random()
+        rule_id = f"rule_{rnd.randrange(next_index)}"
+        if choice < 0.03 and rule_id in plain.rule_library.rules:
+            rule = _random_rule(int(rule_id.split('_')[1]), rnd)
+            plain.update_rule(rule)
+            cached.update_rule(_copy_rule(rule))
+        elif choice < 0.05:
+            plain.remove_rule(rule_id)
+            cached.remove_rule(rule_id)
+        elif choice < 0.07:
+            rule = _random_rule(next_index, rnd)
+            next_index += 1
+            plain.add_rule(rule)
+            cached.add_rule(_copy_rule(rule))
+        elif choice < 0.08:
+            priority = rnd.random()
+            plain.rule_library.set_rule_priority(rule_id, priority)
+            cached.rule_library.set_rule_priority(rule_id, priority)
+        elif choice < 0.09:
+            enabled = rnd.random() > 0.5
+            plain.rule_library.set_rule_enabled(rule_id, enabled)
+            cached.rule_library.set_rule_enabled(rule_id, enabled)
+        else:
+            data = rnd.choice(pool)
+            max_rules = rnd.choice([1, 3, 10])
+            assert _matched(plain, data, max_rules) == _matched(cached, data, max_rules), step
+
+
+def test_batch_execution_uses_result_cache():
+    """批量执行命中逐条执行写入的缓存结果，未命中的结果写入缓存，批内重复输入只执行一次"""
+    rnd = random.Random(5)
+    sequential, _ = _cached_engine()
+    batched, cache_manager = _cached_engine()
+    for i in range(120):
+        rule = _random_rule(i, rnd)
+        sequential.add_rule(rule)
+        batched.add_rule(_copy_rule(rule))
+    pool = [_random_data(rnd) for _ in range(20)]
+
+    for round_index in range(5):
+        records = [rnd.choice(pool) for _ in range(30)]
+        expected = [_matched(sequential, record, 3) for record in records]
+        results = batched.execute_rules_batch(records, {}, 3)
+        assert [[result.rule_id for result in batch] for batch in results] == expected, round_index
+        if round_index == 2:
+            rule = _random_rule(rnd.randrange(120), rnd)
+            sequential.update_rule(rule)
+            batched.update_rule(_copy_rule(rule))
+
+    # 命中时不执行动作、不写入执行历史，使用统计照常更新
+    assert len(batched.execution_history) == len(sequential.execution_history)
+    assert [(rule.usage_count, rule.success_count) for rule in batched.rule_library.rules.values()] == \
+        [(rule.usage_count, rule.success_count) for rule in sequential.rule_library.rules.values()]
+    assert cache_manager.get_cache_stats()['result_cache']['hit_count'] > 0
+    assert _matched(batched, pool[0], 3) == _matched(sequential, pool[0], 3)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+规则匹配测试
+验证字段索引剪枝、编译函数、短路求值和批量匹配与逐条线性扫描的结果一致
+"""
+
+import sys
+import os
+import random
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.rule_engine import RuleEngine, EngineRule, RuleCondition, RuleAction
+
+FIELDS = [f"f{i}" for i in range(12)]
+OPERATORS = ['eq', 'ne', 'gt', 'lt', 'gte', 'lte', 'in', 'contains', 'regex']
+# 包含负权重和零权重，总权重可能为正、为零或为负
+WEIGHTS = [0.5, 1.0, 2.0, 0.0, -0.5, -1.0, -3.0]
+
+
+def _random_value(operator: str, rnd: random.Random):
+    if operator == 'in':
+        return [rnd.randint(0, 5) for _ in range(3)]
+    if operator == 'contains':
+        return rnd.choice(['a', 'b', 'ab'])
+    if operator == 'regex':
+        return rnd.choice(['^a', 'b$', 'a.b'])
+    return rnd.choice([rnd.randint(0, 5), 2.5, 'a'])
+
+
+def _random_rule(index: int, rnd: random.Random) -> EngineRule:
+    conditions = []
+    for _ in range(rnd.randint(1, 4)):
+        operator = rnd.choice(OPERATORS)
+        conditions.append(RuleCondition(field=rnd.choice(FIELDS), operator=operator,
+                                        value=_random_value(operator, rnd), weight=rnd.choice(WEIGHTS)))
+    return EngineRule(
+        rule_id=f"rule_{index}", name=f"规则{index}", description="随机规则",
+        conditions=conditions,
+        actions=[RuleAction(action_type='classify', parameters={'category': f"c{index}"})],
+        priority=rnd.choice([0.1, 0.5, 0.9]), confidence=0.8,
+        created_at=0.0, updated_at=0.0, enabled=rnd.random() > 0.1
+    )
+
+
+def _random_data(rnd: random.Random):
+    return {
+        field_name: rnd.choice([rnd.randint(0, 5), 2.5, 'ab', 'xab', 'b', None])
+        for field_name in rnd.sample(FIELDS, rnd.randint(1, 8))
+    }
+
+
+def _linear_scan(engine: RuleEngine, data, max_rules: int):
+    """基准：按优先级遍历所有启用的规则，逐条完整求值"""
+    rules = sorted(engine.rule_library.get_enabled_rules(), key=lambda rule: rule.priority, reverse=True)
+    matches = []
+    for rule in rules:
+        if len(matches) >= max_rules:
+            break
+        is_matched, match_score, matched_conditions = engine.matcher.match_rule(rule, data)
+        if is_matched:
+            matches.append((rule.rule_id, match_score, list(matched_conditions)))
+    return matches
+
+
+def _build_engines(seed: int):
+    rnd = random.Random(seed)
+    rules = [_random_rule(i, rnd) for i in range(150)]
+    engines = []
+    for short_circuit in (False, True):
+        engine = RuleEngine(short_circuit=short_circuit)
+        for rule in rules:
+            engine.add_rule(_copy_rule(rule))
+        engines.append(engine)
+    return rnd, engines
+
+
+def _copy_rule(rule: EngineRule) -> EngineRule:
+    return EngineRule(
+        rule_id=rule.rule_id, name=rule.name, description=rule.description,
+        conditions=list(rule.conditions), actions=list(rule.actions),
+        priority=rule.priority, confidence=rule.confidence,
+        created_at=rule.created_at, updated_at=rule.updated_at, enabled=rule.enabled
+    )
+
+
+def test_negative_total_weight_rule_matches():
+    """总权重为负的规则匹配负权重条件时得分升高，不能被字段索引剪枝"""
+    rule = EngineRule(
+        rule_id='negative', name='负权重', description='',
+        conditions=[
+            RuleCondition(field='a', operator='gt', value=0, weight=1.0),
+            RuleCondition(field='b', operator='gt', value=0, weight=-3.0),
+        ],
+        actions=[RuleAction(action_type='classify', parameters={'category': 'x'})],
+        priority=0.5, confidence=0.8, created_at=0.0, updated_at=0.0
+    )
+    data = {'a': 2, 'b': 1}
+    engine = RuleEngine()
+    engine.add_rule(rule)
+    assert engine.matcher.match_rule(rule, data)[0]
+
+    assert [match[0].rule_id for match in engine.rule_library.find_matches(data, 10)] == ['negative']
+    assert [match[0].rule_id for match in engine.rule_library.find_matches(data, 10, short_circuit=True)] == ['negative']
+    assert [result.rule_id for result in engine.execute_rules_batch([data])[0]] == ['negative']
+
+
+def test_zero_total_weight_rule_never_matches():
+    """总权重为零的规则不匹配"""
+    rule = EngineRule(
+        rule_id='zero', name='零权重', description='',
+        conditions=[
+            RuleCondition(field='a', operator='gt', value=0, weight=1.0),
+            RuleCondition(field='b', operator='gt', value=0, weight=-1.0),
+        ],
+        actions=[RuleAction(action_type='classify', parameters={'category': 'x'})],
+        priority=0.5, confidence=0.8, created_at=0.0, updated_at=0.0
+    )
+    engine = RuleEngine()
+    engine.add_rule(rule)
+    assert engine.rule_library.find_matches({'a': 1, 'b': 1}, 10) == []
+    assert engine.rule_library.find_matches({'a': 1}, 10, short_circuit=True) == []
+
+
+def test_indexed_matching_equals_linear_scan():
+    """编译函数与短路求值的匹配结果、得分和匹配条件与线性扫描一致"""
+    for seed in range(3):
+        rnd, (engine, short_circuit_engine) = _build_engines(seed)
+        for _ in range(200):
+            data = _random_data(rnd)
+            max_rules = rnd.choice([1, 3, 50])
+            expected = _linear_scan(engine, data, max_rules)
+
+            matches = engine.rule_library.find_matches(data, max_rules)
+            assert [(rule.rule_id, score, list(conditions)) for rule, score, conditions in matches] == expected
+
+            # 短路模式的得分为下界，只比较匹配到的规则和条件
+            matches = short_circuit_engine.rule_library.find_matches(data, max_rules, short_circuit=True)
+            assert [(rule.rule_id, list(conditions)) for rule, _, conditions in matches] == \
+                [(rule_id, conditions) for rule_id, _, conditions in expected]
+
+
+def test_matching_after_rule_changes_equals_linear_scan():
+    """规则更新、删除、停用和调整优先级后，索引结果仍与线性扫描一致"""
+    rnd, (engine, _) = _build_engines(7)
+    next_index = 150
+    for step in range(300):
+        rule_id = f"rule_{rnd.randrange(next_index)}"
+        action = rnd.choice(['update', 'remove', 'add', 'priority', 'enable'])
+        if action == 'update' and rule_id in engine.rule_library.rules:
+            engine.update_rule(_random_rule(int(rule_id.split('_')[1]), rnd))
+        elif action == 'remove':
+            engine.remove_rule(rule_id)
+        elif action == 'add':
+            engine.add_rule(_random_rule(next_index, rnd))
+            next_index += 1
+        elif action == 'priority' and rule_id in engine.rule_library.rules:
+            engine.rule_library.set_rule_priority(rule_id, rnd.choice([0.1, 0.5, 0.7, 0.9]))
+        elif action == 'enable' and rule_id in engine.rule_library.rules:
+            engine.rule_library.set_rule_enabled(rule_id, not engine.rule_library.rules[rule_id].enabled)
+
+        data = _random_data(rnd)
+        matches = engine.rule_library.find_matches(data, 5)
+        assert [rule.rule_id for rule, _, _ in matches] == \
+            [rule_id for rule_id, _, _ in _linear_scan(engine, data, 5)], step
+
+
+def test_batch_matching_equals_single_execution():
+    """批量执行与线性扫描的结果一致"""
+    rnd, (engine, _) = _build_engines(3)
+    schemas = [rnd.sample(FIELDS, rnd.randint(3, 8)) for _ in range(3)]
+    records = [
+        {field_name: rnd.choice([rnd.randint(0, 5), 2.5, 'ab']) for field_name in rnd.choice(schemas)}
+        for _ in range(100)
+    ]
+    expected = [[rule_id for rule_id, _, _ in _linear_scan(engine, record, 3)] for record in records]
+    results = engine.execute_rules_batch(records, {}, 3)
+    assert [[result.rule_id for result in batch] for batch in results] == expected
+
+
+def test_short_circuit_history_records_full_score():
+    """短路匹配提前结束时得分为下界，执行历史记录的是完整得分"""
+    rule = EngineRule(
+        rule_id='weighted', name='加权', description='',
+        conditions=[
+            RuleCondition(field='a', operator='gt', value=0, weight=3.0),
+            RuleCondition(field='b', operator='gt', value=0, weight=1.0),
+        ],
+        actions=[RuleAction(action_type='classify', parameters={'category': 'x'})],
+        priority=0.5, confidence=0.8, created_at=0.0, updated_at=0.0
+    )
+    data = {'a': 1, 'b': 1}
+    engine = RuleEngine(short_circuit=True)
+    engine.add_rule(rule)
+    assert engine.rule_library.find_matches(data, 10, short_circuit=True)[0][1] == 0.75
+
+    engine.execute_rules(data)
+    engine.execute_rules_batch([data])
+    assert [record.match_score for record in engine.execution_history.recent()] == [1.0, 1.0]
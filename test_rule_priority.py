@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+规则优先级测试
+验证批量优先级计算与逐条计算一致，top_k 排序与完整排序的前 k 个一致（包括截断处的并列），
+以及索引化的上下文相关性和上下文建议与逐个配置文件计算的结果一致
+"""
+
+import sys
+import os
+import math
+import random
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from src.core.rule_engine import EngineRule, RuleCondition, RuleAction
+from src.core.rule_priority_manager import RulePriorityManager, ContextRelevanceAnalyzer
+
+CONTEXT_KEYS = [[], ['a'], ['a', 'b'], ['c']]
+KEYS = ['a', 'b', 'c', 'd', 'e', 'f']
+
+
+def _rule(index: int, condition_count: int, action_count: int) -> EngineRule:
+    return EngineRule(
+        rule_id=f"rule_{index}", name=f"规则{index}", description='',
+        conditions=[RuleCondition(field=f"f{i}", operator='eq', value=i, weight=1.0)
+                    for i in range(condition_count)],
+        actions=[RuleAction(action_type='classify', parameters={'category': str(i)})
+                 for i in range(action_count)],
+        priority=0.5, confidence=0.8, created_at=0.0, updated_at=0.0
+    )
+
+
+def _build_manager(seed: int, rule_count: int = 300):
+    """约一半规则有使用记录和反馈，其余规则只由结构决定优先级，相同结构的规则优先级并列"""
+    rnd = random.Random(seed)
+    manager = RulePriorityManager()
+    rules = [_rule(i, rnd.randint(1, 4), rnd.randint(0, 2)) for i in range(rule_count)]
+    for _ in range(3000):
+        manager.record_rule_execution(f"rule_{rnd.randrange(rule_count // 2)}", rnd.random() < 0.7,
+                                      rnd.random(), rnd.choice(CONTEXT_KEYS), 1, 1)
+    for i in range(0, rule_count // 2, 5):
+        manager.update_user_feedback(f"rule_{i}", rnd.random())
+    return manager, rules
+
+
+def test_batch_priorities_match_single_calculation():
+    """批量计算的优先级与逐条 calculate_priority 一致"""
+    for seed in range(3):
+        manager, rules = _build_manager(seed)
+        for context_keys in CONTEXT_KEYS:
+            expected = np.array([manager.calculate_priority(rule, context_keys) for rule in rules])
+            actual = manager.calculate_priorities(rules, context_keys)
+            assert np.abs(actual - expected).max() <= 1e-15
+
+
+def test_top_k_equals_prefix_of_full_order():
+    """top_k 的结果与完整排序的前 k 个一致，截断处并列的规则按原顺序选取"""
+    manager, rules = _build_manager(4)
+    rnd = random.Random(4)
+    rnd.shuffle(rules)
+    context_keys = ['a', 'b']
+    full = [rule.rule_id for rule in manager.optimize_rule_order(rules, context_keys)]
+
+    priorities = dict(zip((rule.rule_id for rule in rules), manager.calculate_priorities(rules, context_keys)))
+    assert full == [rule.rule_id for rule in sorted(rules, key=lambda rule: -priorities[rule.rule_id])]
+
+    # 截断位置落在并列区间内部的 k
+    tied_cutoffs = [k for k in range(1, len(rules)) if priorities[full[k - 1]] == priorities[full[k]]]
+    assert tied_cutoffs
+    for k in tied_cutoffs[:20] + [0, 1, 10, len(rules) - 1, len(rules), len(rules) + 5]:
+        top = manager.optimize_rule_order(rules, context_keys, top_k=k)
+        assert [rule.rule_id for rule in top] == full[:max(k, 0)], k
+
+
+def _brute_force_relevance(analyzer: ContextRelevanceAnalyzer, rule_id: str, context_keys):
+    """基准：遍历全部配置文件计算规则的平均相关性"""
+    total_relevance = 0.0
+    profile_count = 0
+    for profile in analyzer.context_profiles.values():
+        if rule_id in profile.rule_usage:
+            overlap = len(set(context_keys) & set(profile.context_keys))
+            total_keys = len(set(context_keys) | set(profile.context_keys))
+            if total_keys > 0:
+                total_relevance += overlap / total_keys * min(profile.rule_usage[rule_id] / 10.0, 1.0)
+                profile_count += 1
+    return total_relevance / profile_count if profile_count else 0.0
+
+
+def _brute_force_suggestions(analyzer: ContextRelevanceAnalyzer, context_keys, top_k: int):
+    """基准：遍历全部配置文件收集建议后稳定排序"""
+    suggestions = []
+    for profile in analyzer.context_profiles.values():
+        overlap = len(set(context_keys) & set(profile.context_keys))
+        if overlap > 0:
+            similarity = overlap / len(set(context_keys) | set(profile.context_keys))
+            for rule_id, usage_count in profile.rule_usage.items():
+                suggestions.append((rule_id, similarity * min(usage_count / 10.0, 1.0)))
+    suggestions.sort(key=lambda item: item[1], reverse=True)
+    return suggestions[:top_k]
+
+
+def test_context_relevance_matches_brute_force():
+    """随机配置文件下，单个/批量相关性和建议（包括同分时的先后顺序）与遍历全部配置文件的结果一致"""
+    for seed in range(5):
+        rnd = random.Random(seed)
+        analyzer = ContextRelevanceAnalyzer()
+        rule_ids = [f"rule_{i}" for i in range(40)]
+        for step in range(1500):
+            # 键列表可能为空或含重复键；使用次数达到 10 后权重封顶，制造大量同分
+            context_keys = [rnd.choice(KEYS) for _ in range(rnd.randint(0, 4))]
+            context_id = f"ctx_{rnd.randrange(60)}"
+            analyzer.update_context_profile(context_id, context_keys, rnd.choice(rule_ids), rnd.random() < 0.7)
+
+            if step % 100 == 99:
+                for _ in range(10):
+                    query = rnd.sample(KEYS + ['missing'], rnd.randint(0, 4))
+                    expected = [_brute_force_relevance(analyzer, rule_id, query) for rule_id in rule_ids + ['unknown']]
+                    single = [analyzer.calculate_relevance(rule_id, query) for rule_id in rule_ids + ['unknown']]
+                    batch = analyzer.calculate_relevance_batch(rule_ids + ['unknown'], query)
+                    for value, single_value, batch_value in zip(expected, single, batch):
+                        assert math.isclose(single_value, value, rel_tol=1e-12, abs_tol=1e-15)
+                        assert math.isclose(batch_value, value, rel_tol=1e-12, abs_tol=1e-15)
+
+                    for top_k in (1, 5, 50, 1000):
+                        assert analyzer.get_context_suggestions(query, top_k) == \
+                            _brute_force_suggestions(analyzer, query, top_k), (seed, step, query, top_k)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+时间轮测试
+验证分层时间轮的级联下放、溢出表和取消
+"""
+
+import sys
+import os
+import math
+import random
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.core.rule_cache_manager import TimingWheel
+
+
+def test_keys_expire_after_cascading():
+    """超出第0层范围的键在上层槽下放后按时到期，不会提前"""
+    # 每层 8 个槽，三层共覆盖 512 个刻度
+    wheel = TimingWheel(1.0, wheel_bits=3, levels=3, start_time=0)
+    wheel.schedule('level0', 5)
+    wheel.schedule('level1', 40)
+    wheel.schedule('level2', 300)
+    wheel.schedule('overflow', 2000)
+    assert len(wheel) == 4
+
+    assert sorted(wheel.advance(5)) == ['level0']
+    assert wheel.advance(39) == []
+    assert wheel.advance(40) == ['level1']
+    assert wheel.advance(299) == []
+    assert wheel.advance(300) == ['level2']
+    assert wheel.advance(1999) == []
+    assert wheel.advance(2000) == ['overflow']
+    assert len(wheel) == 0
+
+
+def test_cancel_and_reschedule():
+    """取消的键不再到期，重新安排以最后一次为准"""
+    wheel = TimingWheel(1.0, wheel_bits=3, levels=3, start_time=0)
+    wheel.schedule('cancelled', 100)
+    wheel.schedule('moved', 100)
+    assert wheel.cancel('cancelled')
+    assert not wheel.cancel('cancelled')
+    wheel.schedule('moved', 3)
+
+    assert wheel.advance(3) == ['moved']
+    assert wheel.advance(1000) == []
+    assert len(wheel) == 0
+
+
+def test_past_expiry_fires_on_next_tick():
+    """到期时间已过的键在下一个刻度到期"""
+    wheel = TimingWheel(1.0, wheel_bits=3, levels=3, start_time=10)
+    wheel.schedule('late', 2)
+    assert wheel.advance(10.5) == []
+    assert wheel.advance(11) == ['late']
+
+
+def test_matches_sorted_reference_model():
+    """随机调度、取消和推进下，到期的键与按到期刻度筛选的参照模型一致"""
+    for seed in range(3):
+        rnd = random.Random(seed)
+        wheel = TimingWheel(1.0, wheel_bits=3, levels=3, start_time=rnd.randrange(10000))
+        now = float(wheel.current_tick)
+        expected_ticks = {}
+        for _ in range(5000):
+            choice = rnd.random()
+            key = f"key_{rnd.randrange(200)}"
+            if choice < 0.5:
+                expire_at = now + rnd.choice([rnd.random() * 5, rnd.random() * 100, rnd.random() * 2000, -3])
+                wheel.schedule(key, expire_at)
+                expected_ticks[key] = max(math.ceil(expire_at), wheel.current_tick + 1)
+            elif choice < 0.6:
+                assert wheel.cancel(key) == (key in expected_ticks)
+                expected_ticks.pop(key, None)
+            else:
+                now += rnd.choice([0.3, 1, 7, 60, 700])
+                expired = sorted(wheel.advance(now))
+                tick = int(now)
+                assert expired == sorted(k for k, expire_tick in expected_ticks.items() if expire_tick <= tick)
+                for k in expired:
+                    del expected_ticks[k]
+            assert len(wheel) == len(expected_ticks)
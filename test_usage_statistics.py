@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+使用统计测试
+验证列式使用记录和增量统计表与基于列表的直接计算结果一致
+"""
+
+import sys
+import os
+import math
+import random
+import statistics
+from collections import deque
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from src.core.rule_priority_manager import (
+    RuleUsageRecord, UsageRecordStore, UsageAggregateTable, UsageTracker
+)
+
+MAX_RECORDS = 50
+
+
+def _random_records(seed: int, count: int = 2000):
+    """生成约 10 小时内按时间递增的随机使用记录"""
+    rnd = random.Random(seed)
+    timestamp = 1_700_000_000.0
+    records = []
+    for _ in range(count):
+        timestamp += rnd.random() * 36
+        records.append(RuleUsageRecord(
+            rule_id=f"rule_{rnd.randrange(5)}",
+            timestamp=timestamp,
+            success=rnd.random() < 0.7,
+            execution_time=rnd.random(),
+            context_keys=rnd.choice([[], ['a'], ['a', 'b']]),
+            input_size=rnd.randrange(100),
+            output_size=rnd.randrange(100)
+        ))
+    return records
+
+
+def _fill(records):
+    """写入列式存储和增量统计表，同时维护基于列表的参照数据"""
+    store = UsageRecordStore(max_records=MAX_RECORDS)
+    table = UsageAggregateTable()
+    retained = {}  # rule_id -> 保留的最近 MAX_RECORDS 条记录
+    history = {}  # rule_id -> 全部记录，用于时间桶计数
+    for record in records:
+        row = table.row(record.rule_id)
+        evicted = store.append(record)
+        if evicted is not None:
+            table.remove(row, *evicted)
+        table.add(row, record.timestamp, record.success, record.execution_time)
+        retained.setdefault(record.rule_id, deque(maxlen=MAX_RECORDS)).append(record)
+        history.setdefault(record.rule_id, []).append(record)
+    return store, table, retained, history
+
+
+def test_record_store_keeps_latest_records_in_order():
+    """环形缓冲区按时间顺序保留每个规则最近的记录"""
+    store, _, retained, _ = _fill(_random_records(0))
+    assert sorted(store) == sorted(retained)
+    for rule_id, records in retained.items():
+        assert store.get_records(rule_id) == list(records)
+        assert store.count(rule_id) == MAX_RECORDS
+
+
+def test_record_store_window_stats_match_lists():
+    """精确窗口统计与按时间筛选的列表计算一致"""
+    records = _random_records(1)
+    store, _, retained, _ = _fill(records)
+    now = records[-1].timestamp
+    for rule_id, rule_records in retained.items():
+        for window in (60, 600, 3600):
+            since = now - window
+            selected = [record for record in rule_records if record.timestamp >= since]
+            stats = store.window_stats(rule_id, since)
+            assert stats['count'] == len(selected)
+            if not selected:
+                continue
+            times = [record.execution_time for record in selected]
+            assert stats['success_count'] == sum(record.success for record in selected)
+            assert math.isclose(stats['avg_execution_time'], statistics.fmean(times))
+            assert math.isclose(stats['execution_time_variance'], statistics.pvariance(times), abs_tol=1e-12)
+            assert math.isclose(stats['avg_input_size'], statistics.fmean(r.input_size for r in selected))
+            assert math.isclose(stats['avg_output_size'], statistics.fmean(r.output_size for r in selected))
+
+
+def test_aggregate_table_matches_retained_records():
+    """增量统计的计数、成功数、均值和方差与保留记录直接计算的结果一致"""
+    _, table, retained, _ = _fill(_random_records(2))
+    for rule_id, records in retained.items():
+        row = table.rows[rule_id]
+        times = [record.execution_time for record in records]
+        assert table.count[row] == len(records)
+        assert table.success_count[row] == sum(record.success for record in records)
+        assert math.isclose(table.mean_time[row], statistics.fmean(times), rel_tol=1e-9)
+        assert math.isclose(table.m2_time[row] / table.count[row], statistics.pvariance(times),
+                            rel_tol=1e-6, abs_tol=1e-9)
+
+
+def test_aggregate_table_window_counts_match_buckets():
+    """时间窗口计数与按分钟/小时桶筛选全部记录的结果一致"""
+    records = _random_records(3)
+    _, table, _, history = _fill(records)
+    now = records[-1].timestamp
+    rule_ids = sorted(history)
+    rows = table.lookup(rule_ids)
+    minute = int(now // 60)
+    for window in (60, 600, 3600, 4 * 3600):
+        if window <= UsageAggregateTable.MINUTE_BUCKETS * 60:
+            bucket_of, current, buckets = (lambda t: int(t // 60)), minute, math.ceil(window / 60)
+        else:
+            bucket_of, current, buckets = (lambda t: int(t // 3600)), minute // 60, math.ceil(window / 3600)
+        expected = [
+            sum(1 for record in history[rule_id] if current - buckets < bucket_of(record.timestamp) <= current)
+            for rule_id in rule_ids
+        ]
+        assert table.window_counts(rows, window, now).tolist() == expected
+
+
+def test_tracker_usage_arrays_align_with_rule_ids():
+    """批量统计与规则ID对齐，未记录的规则为 0"""
+    tracker = UsageTracker(max_records=10)
+    for i in range(15):
+        tracker.record_usage('a', i % 3 != 0, 0.1 * i, ['key'], 1, 1)
+    tracker.record_usage('b', True, 1.0, [], 1, 1)
+
+    arrays = tracker.get_usage_arrays(['b', 'missing', 'a'])
+    assert arrays['total_usage'].tolist() == [1, 0, 10]
+    # 窗口计数不超过保留的记录数
+    assert arrays['recent_usage'].tolist() == [1, 0, 10]
+    kept = [0.1 * i for i in range(5, 15)]
+    assert np.isclose(arrays['avg_execution_time'][2], statistics.fmean(kept))
+    assert tracker.get_usage_stats('a')['success_count'] == sum(1 for i in range(5, 15) if i % 3 != 0)